@@ -0,0 +1,268 @@
+"""Stand-in for conda, git, pip and cmake used by the benchmarks.
+
+Each tool is invoked through a shim as `fake_tool.py <tool> <args...>`. Every
+invocation is appended to $FAKE_LOG, and sleeps for $FAKE_LATENCY_<TOOL> (or
+$FAKE_LATENCY) seconds to model the cost of the real tool. The tools only do
+as much as the installer needs to observe: environments are directories with
+a conda-meta folder, and installing the PyMOL wheel creates a synthetic PyMOL
+package with the menu files the installer patches.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import zipfile
+
+PYTHON_VERSION = os.environ.get("FAKE_PYTHON_VERSION", "3.11")
+
+EXTERNAL_GUI = """# Synthetic pymol/_gui.py
+menus = [
+    ('menu', 'Wizard', [
+        ('command', 'Appearance', 'wizard appearance'),
+    ]),
+]
+"""
+
+INTERNAL_GUI = """# Synthetic pymol/wizard/openvr.py
+menu = [
+    [2, 'Wizard Menu', ''],
+    [1, 'Measurement', 'wizard measurement'],
+]
+"""
+
+
+def log_invocation(tool, args, start):
+    record = {
+        "tool": tool,
+        "args": args,
+        "cwd": os.getcwd(),
+        "duration": time.perf_counter() - start,
+    }
+    with open(os.environ["FAKE_LOG"], "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def get_option(args, *names):
+    for name in names:
+        if name in args:
+            return args[args.index(name) + 1]
+        for arg in args:
+            if arg.startswith(f"{name}="):
+                return arg.split("=", 1)[1]
+    return None
+
+
+def get_base():
+    return os.environ["FAKE_CONDA_BASE"]
+
+
+def get_prefix(args):
+    prefix = get_option(args, "--prefix", "-p")
+    if prefix is not None:
+        return prefix
+
+    name = get_option(args, "--name", "-n")
+    if name in (None, "base"):
+        return get_base()
+    return os.path.join(get_base(), "envs", name)
+
+
+def get_site_packages(prefix):
+    return os.path.join(prefix, "lib", f"python{PYTHON_VERSION}", "site-packages")
+
+
+def append_history(prefix, command):
+    with open(os.path.join(prefix, "conda-meta", "history"), "a") as f:
+        f.write(f"==> {time.strftime('%Y-%m-%d %H:%M:%S')} <==\n# cmd: {command}\n")
+
+
+def create_prefix(prefix, command):
+    os.makedirs(os.path.join(prefix, "conda-meta"), exist_ok=True)
+    os.makedirs(get_site_packages(prefix), exist_ok=True)
+    os.makedirs(os.path.join(prefix, "bin"), exist_ok=True)
+    with open(os.path.join(prefix, "conda-meta", "python-3.11.0-0.json"), "w") as f:
+        json.dump({"name": "python", "version": "3.11.0"}, f)
+    append_history(prefix, command)
+
+
+def conda(args):
+    command = "conda " + " ".join(args)
+    if args[:2] == ["info", "--base"]:
+        print(get_base())
+    elif args[:1] == ["run"]:
+        # run --no-capture-output --name NAME command...
+        rest = [arg for arg in args[1:] if arg != "--no-capture-output"]
+        prefix = get_prefix(rest)
+        rest = rest[2:]
+        environ = dict(os.environ)
+        environ["CONDA_PREFIX"] = prefix
+        environ["CONDA_DEFAULT_ENV"] = os.path.basename(prefix)
+        environ["PYTHONPATH"] = get_site_packages(prefix)
+        if rest[0] == "python":
+            rest[0] = sys.executable
+        sys.stdout.flush()
+        os.execvpe(rest[0], rest, environ)
+    elif args[:2] in (["env", "create"], ["create", "--yes"]):
+        prefix = get_prefix(args)
+        clone = get_option(args, "--clone")
+        if clone is not None:
+            shutil.copytree(get_prefix(["--name", clone]), prefix, symlinks=True)
+            append_history(prefix, command)
+        else:
+            create_prefix(prefix, command)
+    elif args[:2] == ["env", "update"]:
+        append_history(get_prefix(args), command)
+    elif args[:2] == ["env", "remove"]:
+        shutil.rmtree(get_prefix(args), ignore_errors=True)
+    elif args[:2] == ["env", "config"]:
+        prefix = get_prefix(args)
+        with open(os.path.join(prefix, "conda-meta", "state"), "w") as f:
+            json.dump({"env_vars": {}}, f)
+    elif args[:1] == ["list"]:
+        print("# platform: linux-64\n@EXPLICIT")
+        print("https://conda.anaconda.org/conda-forge/linux-64/python-3.11.0-0.conda#0")
+    else:
+        print(f"fake conda: unsupported command {command}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def git(args):
+    if args[0] == "-C":
+        repo, args = args[1], args[2:]
+    else:
+        repo = os.getcwd()
+
+    if args[0] == "init":
+        os.makedirs(args[-1], exist_ok=True)
+        with open(os.path.join(args[-1], "HEAD"), "w") as f:
+            f.write("ref: refs/heads/master\n")
+    elif args[0] == "rev-parse":
+        ref = args[-1].split("^")[0]
+        return 0 if os.path.exists(os.path.join(repo, ref)) else 1
+    elif args[0] == "fetch":
+        ref = args[-1].split(":")[-1]
+        os.makedirs(os.path.dirname(os.path.join(repo, ref)), exist_ok=True)
+        with open(os.path.join(repo, ref), "w") as f:
+            f.write("0" * 40 + "\n")
+    elif args[:2] == ["worktree", "add"]:
+        dest = args[-2]
+        os.makedirs(dest, exist_ok=True)
+        if os.path.basename(dest) == "openvr":
+            os.makedirs(os.path.join(dest, "headers"), exist_ok=True)
+            with open(os.path.join(dest, "headers", "openvr.h"), "w") as f:
+                f.write("// synthetic openvr.h\n" * 200)
+        else:
+            with open(os.path.join(dest, "setup.py"), "w") as f:
+                f.write("# synthetic PyMOL sources\n")
+    return 0
+
+
+def cmake(args):
+    build_dir = os.path.join(os.getcwd(), "build")
+    if "-S" in args:
+        os.makedirs(build_dir, exist_ok=True)
+        with open(os.path.join(build_dir, "install_prefix"), "w") as f:
+            f.write(get_option(args, "-DCMAKE_INSTALL_PREFIX") or "")
+    elif "--build" in args:
+        with open(os.path.join(build_dir, "install_prefix"), "r") as f:
+            install_dir = f.read()
+        os.makedirs(os.path.join(install_dir, "lib"), exist_ok=True)
+        with open(os.path.join(install_dir, "lib", "libopenvr_api.so"), "wb") as f:
+            f.write(os.urandom(64 * 1024))
+    return 0
+
+
+def write_wheel(wheel_dir, name, tag):
+    os.makedirs(wheel_dir, exist_ok=True)
+    wheel = os.path.join(wheel_dir, f"{name}-0.1.0-{tag}.whl")
+    with zipfile.ZipFile(wheel, "w") as f:
+        f.writestr(f"{name}-0.1.0.dist-info/METADATA", f"Name: {name}\n")
+    return wheel
+
+
+def get_project_name(source_dir):
+    try:
+        with open(os.path.join(source_dir, "pyproject.toml"), "r") as f:
+            match = re.search(r'^name\s*=\s*"([^"]+)"', f.read(), re.MULTILINE)
+    except FileNotFoundError:
+        return "pymol"
+    return match.group(1).replace("-", "_") if match else "unknown"
+
+
+def install_pymol(site_packages):
+    pymol_dir = os.path.join(site_packages, "pymol")
+    os.makedirs(os.path.join(pymol_dir, "wizard"), exist_ok=True)
+    with open(os.path.join(pymol_dir, "__init__.py"), "w") as f:
+        f.write("# synthetic PyMOL\n")
+    with open(os.path.join(pymol_dir, "_gui.py"), "w") as f:
+        f.write(EXTERNAL_GUI)
+    with open(os.path.join(pymol_dir, "wizard", "__init__.py"), "w") as f:
+        f.write("")
+    with open(os.path.join(pymol_dir, "wizard", "openvr.py"), "w") as f:
+        f.write(INTERNAL_GUI)
+
+
+def pip(args):
+    site_packages = get_site_packages(os.environ["CONDA_PREFIX"])
+    if args[0] == "wheel":
+        wheel_dir = get_option(args, "--wheel-dir")
+        source_dir = args[-1]
+        name = get_project_name(source_dir)
+        tag = "cp311-cp311-linux_x86_64" if name == "pymol" else "py3-none-any"
+        write_wheel(wheel_dir, name, tag)
+    elif args[0] == "install":
+        for arg in args[1:]:
+            if arg.startswith("-") or not os.path.exists(arg):
+                continue
+            name = (
+                os.path.basename(arg).split("-")[0]
+                if arg.endswith(".whl")
+                else get_project_name(arg)
+            )
+            if name == "pymol":
+                install_pymol(site_packages)
+            else:
+                dist_info = os.path.join(site_packages, f"{name}-0.1.0.dist-info")
+                os.makedirs(dist_info, exist_ok=True)
+                with open(os.path.join(dist_info, "METADATA"), "w") as f:
+                    f.write(f"Name: {name}\n")
+    elif args[0] == "uninstall":
+        for name in args[1:]:
+            if not name.startswith("-"):
+                shutil.rmtree(
+                    os.path.join(
+                        site_packages, f"{name.replace('-', '_')}-0.1.0.dist-info"
+                    ),
+                    ignore_errors=True,
+                )
+    return 0
+
+
+TOOLS = {"conda": conda, "git": git, "cmake": cmake, "pip": pip}
+
+
+def main():
+    tool, args = sys.argv[1], sys.argv[2:]
+    start = time.perf_counter()
+    latency = os.environ.get(
+        f"FAKE_LATENCY_{tool.upper()}", os.environ.get("FAKE_LATENCY", "0")
+    )
+    time.sleep(float(latency))
+
+    # `conda run` replaces this process, so it is logged beforehand
+    if tool == "conda" and args[:1] == ["run"]:
+        log_invocation(tool, args, start)
+        return TOOLS[tool](args)
+
+    try:
+        return TOOLS[tool](args)
+    finally:
+        log_invocation(tool, args, start)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
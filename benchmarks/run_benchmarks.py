@@ -0,0 +1,378 @@
+"""Offline benchmarks of install_wizard and uninstall_wizard.
+
+The real entry points of the checked out sources are run against the stand-in
+tools in fake_tool.py, inside a throwaway sandbox with its own conda base,
+cache and home directory. For each scenario the wall time, the number of
+spawned tools and the bytes of files written in the sandbox are reported.
+Results can be saved as JSON and compared with those of another commit.
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --compare results.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+from collections import Counter
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+FAKE_TOOL = os.path.join(BENCHMARKS_DIR, "fake_tool.py")
+TOOLS = ["conda", "git", "pip", "cmake"]
+
+WIZARDS = ["alpha", "beta", "gamma"]
+
+ENV_FILE = """channels:
+  - conda-forge
+dependencies:
+  - python=3.11
+  - cmake
+"""
+
+METADATA = """name: {name}
+menu_entry: "{title} wizard"
+default_env: bench
+use_vr: true
+
+python_version: "3.11"
+pymol_version: v3.1.0
+openvr_version: 1.0.17
+
+pre_script: ""
+post_script: ""
+"""
+
+PYPROJECT = """[build-system]
+requires = ["setuptools"]
+build-backend = "setuptools.build_meta"
+
+[project]
+name = "{name}-wizard"
+version = "0.1.0"
+"""
+
+# Scenarios run in order in the same sandbox, each starting from the state
+# left by the previous ones: (name, entry point, arguments)
+SCENARIOS = [
+    ("fresh", "install_wizard", ["--env_name", "bench", "{wizards}/alpha"]),
+    ("reuse", "install_wizard", ["--env_name", "bench", "{wizards}/alpha"]),
+    ("fast", "install_wizard", ["--env_name", "bench", "--fast", "{wizards}/alpha"]),
+    (
+        "batch",
+        "install_wizard",
+        [
+            "--env_name",
+            "bench-batch",
+            "{wizards}/alpha",
+            "{wizards}/beta",
+            "{wizards}/gamma",
+        ],
+    ),
+    (
+        "uninstall",
+        "uninstall_wizard",
+        [
+            "--env_name",
+            "bench",
+            "--env_name",
+            "bench-batch",
+            "{wizards}/alpha",
+            "{wizards}/beta",
+            "{wizards}/gamma",
+        ],
+    ),
+]
+
+
+def create_sandbox(root: str) -> dict:
+    """Create the conda base, the tool shims and the synthetic wizards."""
+
+    paths = {
+        "root": root,
+        "bin": os.path.join(root, "bin"),
+        "base": os.path.join(root, "conda"),
+        "wizards": os.path.join(root, "wizards"),
+        "work": os.path.join(root, "work"),
+        "home": os.path.join(root, "home"),
+        "cache": os.path.join(root, "cache"),
+        "log": os.path.join(root, "invocations.jsonl"),
+    }
+    for key in ["bin", "wizards", "work", "home", "cache"]:
+        os.makedirs(paths[key])
+    os.makedirs(os.path.join(paths["base"], "conda-meta"))
+    os.makedirs(os.path.join(paths["base"], "envs"))
+    os.makedirs(os.path.join(paths["base"], "bin"))
+
+    for tool in TOOLS:
+        shim = os.path.join(paths["bin"], tool)
+        with open(shim, "w") as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_TOOL}" {tool} "$@"\n')
+        os.chmod(shim, 0o755)
+    shutil.copy(
+        os.path.join(paths["bin"], "conda"), os.path.join(paths["base"], "bin", "conda")
+    )
+
+    for name in WIZARDS:
+        wizard_root = os.path.join(paths["wizards"], name)
+        os.makedirs(os.path.join(wizard_root, "envs"))
+        os.makedirs(os.path.join(wizard_root, "src", f"{name}_wizard"))
+        with open(os.path.join(wizard_root, "envs", "environment.yaml"), "w") as f:
+            f.write(ENV_FILE)
+        with open(os.path.join(wizard_root, "metadata.yaml"), "w") as f:
+            f.write(METADATA.format(name=name, title=name.capitalize()))
+        with open(os.path.join(wizard_root, "pyproject.toml"), "w") as f:
+            f.write(PYPROJECT.format(name=name))
+        with open(os.path.join(wizard_root, f"{name}.py"), "w") as f:
+            f.write(
+                f"from pymol.wizard import Wizard\n\n\nclass {name.capitalize()}(Wizard):\n    pass\n"
+            )
+        with open(
+            os.path.join(wizard_root, "src", f"{name}_wizard", "__init__.py"), "w"
+        ) as f:
+            f.write("")
+
+    return paths
+
+
+def get_environ(paths: dict, latency: dict) -> dict:
+    environ = {
+        "PATH": os.pathsep.join([paths["bin"], os.environ.get("PATH", "")]),
+        "HOME": paths["home"],
+        "PYTHONPATH": os.path.join(REPO_DIR, "src"),
+        "CONDA_EXE": os.path.join(paths["base"], "bin", "conda"),
+        "CONDA_DEFAULT_ENV": "base",
+        "CONDA_PREFIX": paths["base"],
+        "PYMOL_WIZARD_INSTALLER_CACHE": paths["cache"],
+        "PYMOL_WIZARD_INSTALLER_PACKAGE_MANAGER": "conda",
+        "FAKE_CONDA_BASE": paths["base"],
+        "FAKE_LOG": paths["log"],
+    }
+    for tool, seconds in latency.items():
+        key = "FAKE_LATENCY" if tool == "*" else f"FAKE_LATENCY_{tool.upper()}"
+        environ[key] = str(seconds)
+    return environ
+
+
+def snapshot(root: str) -> dict:
+    """Map every file in the sandbox to its size and modification time."""
+
+    files = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                stat = os.lstat(path)
+            except FileNotFoundError:
+                continue
+            files[path] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def get_bytes_written(before: dict, after: dict, ignored: str) -> int:
+    return sum(
+        size
+        for path, (size, mtime) in after.items()
+        if path != ignored and before.get(path) != (size, mtime)
+    )
+
+
+def read_invocations(log_file: str) -> list[dict]:
+    try:
+        with open(log_file, "r") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def run_scenarios(latency: dict, verbose: bool) -> dict:
+    """Run every scenario once in a fresh sandbox."""
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="wizard-bench-") as root:
+        paths = create_sandbox(root)
+        environ = get_environ(paths, latency)
+        for name, entry_point, args in SCENARIOS:
+            args = [arg.format(wizards=paths["wizards"]) for arg in args]
+            before = snapshot(root)
+            spawned_before = len(read_invocations(paths["log"]))
+
+            start = time.perf_counter()
+            process = subprocess.run(
+                [sys.executable, "-m", f"pymol_wizard_installer.{entry_point}", *args],
+                cwd=paths["work"],
+                env=environ,
+                input="\n" * 50,
+                capture_output=True,
+                text=True,
+            )
+            wall = time.perf_counter() - start
+
+            invocations = read_invocations(paths["log"])[spawned_before:]
+            results[name] = {
+                "exit_code": process.returncode,
+                "wall_s": wall,
+                "spawns": len(invocations),
+                "spawns_by_tool": dict(
+                    Counter(record["tool"] for record in invocations)
+                ),
+                "bytes_written": get_bytes_written(
+                    before, snapshot(root), paths["log"]
+                ),
+            }
+            if verbose or process.returncode != 0:
+                print(f"--- {name} (exit code {process.returncode})")
+                print(process.stdout[-4000:])
+                print(process.stderr[-4000:], file=sys.stderr)
+
+    return results
+
+
+def aggregate(runs: list[dict]) -> dict:
+    """Take the median of each metric over the repeated runs."""
+
+    aggregated = {}
+    for name, _, _ in SCENARIOS:
+        samples = [run[name] for run in runs]
+        aggregated[name] = {
+            "exit_code": max(sample["exit_code"] for sample in samples),
+            "wall_s": round(statistics.median(s["wall_s"] for s in samples), 4),
+            "wall_s_min": round(min(s["wall_s"] for s in samples), 4),
+            "spawns": int(statistics.median(s["spawns"] for s in samples)),
+            "spawns_by_tool": samples[0]["spawns_by_tool"],
+            "bytes_written": int(
+                statistics.median(s["bytes_written"] for s in samples)
+            ),
+        }
+    return aggregated
+
+
+def get_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "-C", REPO_DIR, "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+def print_results(results: dict, baseline: dict | None) -> list[str]:
+    """Print the results, next to the baseline if given, and return the regressions."""
+
+    regressions = []
+    print(
+        f"{'Scenario':<10} {'Exit':>4} {'Wall (s)':>9} {'Spawns':>7} {'Written':>12}  Tools"
+    )
+    for name, result in results["scenarios"].items():
+        tools = ", ".join(
+            f"{tool}={count}"
+            for tool, count in sorted(result["spawns_by_tool"].items())
+        )
+        print(
+            f"{name:<10} {result['exit_code']:>4} {result['wall_s']:>9.3f} {result['spawns']:>7} {result['bytes_written']:>12}  {tools}"
+        )
+
+        previous = (baseline or {}).get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+
+        wall_change = result["wall_s"] / previous["wall_s"] - 1
+        print(
+            f"{'':<10} {'':>4} {wall_change:>+9.1%} {result['spawns'] - previous['spawns']:>+7} {result['bytes_written'] - previous['bytes_written']:>+12}  vs {baseline.get('commit')}"
+        )
+        if wall_change > results["threshold"]:
+            regressions.append(f"{name}: wall time {wall_change:+.1%}")
+        if result["spawns"] > previous["spawns"]:
+            regressions.append(
+                f"{name}: {result['spawns'] - previous['spawns']} more spawns"
+            )
+        if result["exit_code"] != 0 and previous["exit_code"] == 0:
+            regressions.append(f"{name}: now fails")
+
+    return regressions
+
+
+def parse_latency(value: str) -> dict:
+    """Parse a latency specification like `0.05` or `conda=0.5,pip=0.2`."""
+
+    latency = {}
+    for item in value.split(","):
+        if "=" in item:
+            tool, seconds = item.split("=", 1)
+            latency[tool.strip()] = float(seconds)
+        elif item.strip():
+            latency["*"] = float(item)
+    return latency
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark install_wizard and uninstall_wizard offline."
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Number of runs of each scenario."
+    )
+    parser.add_argument(
+        "--latency",
+        type=parse_latency,
+        default={},
+        help="Simulated latency of the tools in seconds, e.g. `0.05` or `conda=0.5,pip=0.2`.",
+    )
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument(
+        "--compare", help="JSON results of a previous run to compare against."
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Relative increase in wall time reported as a regression.",
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", help="Print the output of every run."
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if os.name != "posix":
+        print("The benchmarks use shell shims and only run on POSIX systems.")
+        return 1
+
+    runs = [run_scenarios(args.latency, args.verbose) for _ in range(args.repeat)]
+    results = {
+        "commit": get_commit(),
+        "python": sys.version.split()[0],
+        "latency": args.latency,
+        "repeat": args.repeat,
+        "threshold": args.threshold,
+        "scenarios": aggregate(runs),
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+
+    regressions = print_results(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if regressions:
+        print("Regressions:\n  " + "\n  ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""Startup time benchmark of the installer's commands.
+
+Each command is run several times and its best wall time is compared with
+that of a bare interpreter. The commands fail the benchmark when their
+overhead exceeds the startup budget: `--help` must not import anything
+beyond argparse, and metadata-only commands must not pay for the modules
+that drive conda, git or pip.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --importtime
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+
+HELP_COMMANDS = [
+    "install_wizard",
+    "uninstall_wizard",
+    "wizard_cache",
+    "wizard_lock",
+    "provision_wizard",
+    "wizard_registry",
+    "export_bundle",
+    "install_bundle",
+]
+
+# Commands that only read metadata: (name, arguments)
+METADATA_COMMANDS = [
+    ("wizard_cache size", ["wizard_cache", "size"]),
+    ("wizard_lock check", ["wizard_lock", "check", "{env_file}"]),
+    (
+        "wizard_registry list",
+        ["wizard_registry", "--wizards-dir", "{wizards_dir}", "list"],
+    ),
+]
+
+
+def create_wizard(wizard_root: str) -> None:
+    os.makedirs(os.path.join(wizard_root, "envs"))
+    with open(os.path.join(wizard_root, "envs", "environment.yaml"), "w") as f:
+        f.write("dependencies:\n  - python=3.11\n")
+    with open(os.path.join(wizard_root, "metadata.yaml"), "w") as f:
+        f.write(
+            "name: example\nmenu_entry: Example\ndefault_env: example\n"
+            'python_version: "3.11"\npymol_version: v3.1.0\nopenvr_version: 1.0.17\n'
+        )
+    with open(os.path.join(wizard_root, "pyproject.toml"), "w") as f:
+        f.write('[project]\nname = "example-wizard"\n')
+
+
+def get_command(args: list[str]) -> list[str]:
+    return [sys.executable, "-m", f"pymol_wizard_installer.{args[0]}", *args[1:]]
+
+
+def measure(command: list[str], environ: dict, repeat: int) -> float:
+    """Get the best wall time of a command, in milliseconds."""
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            command,
+            env=environ,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def print_slowest_imports(command: list[str], environ: dict, count: int = 8) -> None:
+    """Print the modules that took the longest to import, including their imports."""
+
+    stderr = subprocess.run(
+        [command[0], "-X", "importtime", *command[1:]],
+        env=environ,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    ).stderr
+
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if not name.startswith("   "):
+            imports.append((int(cumulative), name.strip()))
+
+    for cumulative, name in sorted(imports, reverse=True)[:count]:
+        print(f"    {cumulative / 1000:>7.1f} ms  {name}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Measure the startup time of the installer's commands."
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=10, help="Number of runs of each command."
+    )
+    parser.add_argument(
+        "--help-budget",
+        type=float,
+        default=40,
+        metavar="MS",
+        help="Maximum overhead of `--help` over a bare interpreter, in milliseconds.",
+    )
+    parser.add_argument(
+        "--metadata-budget",
+        type=float,
+        default=100,
+        metavar="MS",
+        help="Maximum overhead of metadata-only commands over a bare interpreter, in milliseconds.",
+    )
+    parser.add_argument(
+        "--importtime",
+        action="store_true",
+        help="Also print the slowest top-level imports of each command.",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="wizard-startup-") as root:
+        env_file = os.path.join(root, "environment.yaml")
+        with open(env_file, "w") as f:
+            f.write("dependencies:\n  - python=3.11\n")
+        wizards_dir = os.path.join(root, "wizards")
+        create_wizard(os.path.join(wizards_dir, "example"))
+
+        environ = {
+            **os.environ,
+            "PYTHONPATH": os.path.join(REPO_DIR, "src"),
+            "PYMOL_WIZARD_INSTALLER_CACHE": os.path.join(root, "cache"),
+        }
+
+        baseline = measure([sys.executable, "-c", "pass"], environ, args.repeat)
+        print(f"Bare interpreter: {baseline:.1f} ms\n")
+        print(f"{'Command':<30} {'Wall (ms)':>10} {'Overhead':>10} {'Budget':>8}")
+
+        runs = [
+            (f"{name} --help", [name, "--help"], args.help_budget)
+            for name in HELP_COMMANDS
+        ] + [
+            (
+                name,
+                [
+                    arg.format(env_file=env_file, wizards_dir=wizards_dir)
+                    for arg in command
+                ],
+                args.metadata_budget,
+            )
+            for name, command in METADATA_COMMANDS
+        ]
+
+        over_budget = []
+        for name, command_args, budget in runs:
+            command = get_command(command_args)
+            wall = measure(command, environ, args.repeat)
+            overhead = wall - baseline
+            flag = "" if overhead <= budget else "  OVER BUDGET"
+            print(f"{name:<30} {wall:>10.1f} {overhead:>10.1f} {budget:>8.0f}{flag}")
+            if overhead > budget:
+                over_budget.append(name)
+            if args.importtime:
+                print_slowest_imports(command, environ)
+
+    if over_budget:
+        print(f"\nOver the startup budget: {', '.join(over_budget)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
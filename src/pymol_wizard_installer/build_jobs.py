@@ -0,0 +1,113 @@
+import os
+import math
+
+# Where the cgroups of this process are listed, and where the hierarchies are mounted
+PROC_CGROUP = "/proc/self/cgroup"
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+# Number of parallel jobs of the native builds, or None for one per available CPU
+_build_jobs = None
+
+
+def _read_cgroup_paths() -> dict[str, str]:
+    """Map the cgroup controllers of this process to its cgroup in each of them."""
+
+    paths = {}
+    try:
+        with open(PROC_CGROUP, "r") as f:
+            for line in f:
+                _, controllers, path = line.rstrip("\n").split(":", 2)
+                for controller in controllers.split(","):
+                    paths[controller] = path
+    except (OSError, ValueError):
+        pass
+    return paths
+
+
+def _read_quota(quota_file: str, period_file: str | None = None) -> float | None:
+    """Read a CFS quota as a number of CPUs, or None if there is no limit.
+
+    cgroup v2 keeps the quota and the period in a single file, cgroup v1 in two.
+    """
+
+    try:
+        with open(quota_file, "r") as f:
+            fields = f.read().split()
+        if period_file is not None:
+            with open(period_file, "r") as f:
+                fields.append(f.read().strip())
+        quota, period = fields[0], fields[1]
+    except (OSError, IndexError):
+        return None
+
+    if quota in ("max", "-1") or int(period) <= 0:
+        return None
+    return int(quota) / int(period)
+
+
+def get_cgroup_cpu_limit() -> float | None:
+    """Get the CPU bandwidth limit of this process's cgroup and its parents, in CPUs."""
+
+    cgroup_paths = _read_cgroup_paths()
+    limits = []
+    if "cpu" in cgroup_paths:
+        # cgroup v1, possibly alongside an empty v2 hierarchy on hybrid hosts
+        for mount in ["cpu,cpuacct", "cpu"]:
+            # The controller is mounted at the process's own cgroup in containers
+            for path in [cgroup_paths["cpu"].lstrip("/"), ""]:
+                directory = os.path.join(CGROUP_ROOT, mount, path)
+                limits.append(
+                    _read_quota(
+                        os.path.join(directory, "cpu.cfs_quota_us"),
+                        os.path.join(directory, "cpu.cfs_period_us"),
+                    )
+                )
+    elif "" in cgroup_paths:
+        # cgroup v2: a limit on any ancestor applies to the whole subtree
+        path = cgroup_paths[""]
+        while True:
+            directory = os.path.join(CGROUP_ROOT, path.lstrip("/"))
+            limits.append(_read_quota(os.path.join(directory, "cpu.max")))
+            if path in ("", "/"):
+                break
+            path = os.path.dirname(path)
+
+    limits = [limit for limit in limits if limit is not None]
+    return min(limits) if limits else None
+
+
+def get_available_cpus() -> int:
+    """Count the CPUs this process can use, within its affinity mask and cgroup CPU quota."""
+
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    limit = get_cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(1, cpus)
+
+
+def set_build_jobs(jobs: int | None) -> None:
+    """Set the number of parallel jobs of the native builds, or None for one per available CPU."""
+
+    global _build_jobs
+    _build_jobs = jobs
+
+
+def get_build_jobs() -> int:
+    return _build_jobs or get_available_cpus()
+
+
+def get_build_environ() -> dict[str, str]:
+    """Variables that make the native builds started by CMake and PyMOL's setup run in parallel.
+
+    CMAKE_BUILD_PARALLEL_LEVEL covers every `cmake --build`, including those
+    started by setup scripts, whatever the generator: with Ninja it is passed
+    on as `-j`. JOBS is read by PyMOL's setup script.
+    """
+
+    jobs = str(get_build_jobs())
+    return {"CMAKE_BUILD_PARALLEL_LEVEL": jobs, "JOBS": jobs}
@@ -0,0 +1,419 @@
+import io
+import os
+import re
+import sys
+import json
+import time
+import gzip
+import mmap
+import shutil
+import tarfile
+import platform
+
+from pymol_wizard_installer.cache import format_size
+from pymol_wizard_installer.env_discovery import find_env_prefix, get_envs_dirs
+from pymol_wizard_installer.file_locks import environment_lock, path_lock
+from pymol_wizard_installer.install_manifest import InstallManifest
+from pymol_wizard_installer.menu_patcher import EXTERNAL_GUI, INTERNAL_GUI, patch_menu
+from pymol_wizard_installer.package_manager import get_package_manager
+
+BUNDLE_VERSION = 1
+
+# Members of the bundle that are not part of the environment
+BUNDLE_DIR = ".wizard-bundle"
+HEADER = f"{BUNDLE_DIR}/bundle.json"
+PREFIXES = f"{BUNDLE_DIR}/prefixes.json"
+
+# Menu steps recorded in the manifest, by the format of their file
+MENU_FORMATS = {
+    "external-gui-entry": EXTERNAL_GUI,
+    "internal-gui-entry": INTERNAL_GUI,
+}
+
+
+class BundleError(Exception):
+    pass
+
+
+def get_platform() -> str:
+    return f"{sys.platform}-{platform.machine().lower()}"
+
+
+def get_prefix_patterns(prefix: str) -> list[bytes]:
+    """The forms in which a prefix can appear in the files of an environment."""
+
+    patterns = [prefix]
+    if os.name == "nt":
+        patterns.append(prefix.replace("\\", "/"))
+    return [pattern.encode("utf-8") for pattern in dict.fromkeys(patterns)]
+
+
+class PrefixScanner:
+    """Reader that notes whether a file contains a prefix, while it is being packed."""
+
+    patterns: list[bytes]
+    found: bool
+    binary: bool
+
+    def __init__(self, f, patterns):
+        self.f = f
+        self.patterns = patterns
+        self.found = False
+        self.binary = False
+        self._overlap = max(len(pattern) for pattern in patterns) - 1
+        self._tail = b""
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        if data:
+            if not self.found:
+                window = self._tail + data
+                self.found = any(pattern in window for pattern in self.patterns)
+                self._tail = window[-self._overlap :] if self._overlap else b""
+            if not self.binary:
+                self.binary = b"\0" in data
+        return data
+
+
+def get_menu_record(manifest: InstallManifest) -> list[dict]:
+    """The menu entries added to the environment, relative to its prefix."""
+
+    menus = []
+    for wizard_name in manifest.get_wizards():
+        record = manifest.data["wizards"][wizard_name]
+        for step in MENU_FORMATS:
+            if step not in record["steps"]:
+                continue
+            for menu_file in record["files"].get(step, {}):
+                menus.append(
+                    {
+                        "wizard": wizard_name,
+                        "step": step,
+                        "menu_entry": record["steps"][step],
+                        "file": os.path.relpath(menu_file, manifest.prefix),
+                    }
+                )
+    return menus
+
+
+def check_exportable(manifest: InstallManifest) -> None:
+    """Reject environments whose wizards live outside of the prefix."""
+
+    wizard_names = manifest.get_wizards()
+    if not wizard_names:
+        raise BundleError(f"No wizard is installed in {manifest.prefix}.")
+
+    for wizard_name in wizard_names:
+        steps = manifest.data["wizards"][wizard_name]["steps"]
+        linked = isinstance(steps.get("wizard-file"), dict) or (
+            isinstance(steps.get("package"), dict) and "editable" in steps["package"]
+        )
+        if linked:
+            raise BundleError(
+                f"The {wizard_name} wizard was installed with --link, so its files are outside of the environment. Install it again without --link before exporting."
+            )
+
+
+def add_json(tar: tarfile.TarFile, name: str, data: dict) -> None:
+    contents = json.dumps(data, indent=2).encode("utf-8")
+    tarinfo = tarfile.TarInfo(name)
+    tarinfo.size = len(contents)
+    tarinfo.mtime = int(time.time())
+    tar.addfile(tarinfo, io.BytesIO(contents))
+
+
+def iter_prefix(prefix: str):
+    """Walk the prefix, yielding the relative path of every entry to pack."""
+
+    for root, dirs, files in os.walk(prefix):
+        relative_root = os.path.relpath(root, prefix)
+        if relative_root == ".":
+            relative_root = ""
+        dirs.sort()
+        for name in dirs:
+            path = os.path.join(root, name)
+            # Symlinks to directories are packed as links, not followed
+            yield os.path.join(relative_root, name), path
+        for name in sorted(files):
+            if name.endswith(".tmp"):
+                continue
+            yield os.path.join(relative_root, name), os.path.join(root, name)
+
+
+def write_bundle(prefix: str, out, compress_level: int = 4) -> dict:
+    """Stream the environment's prefix and its installation record into out, as a gzipped tar.
+
+    The first member describes the bundle, including the menu entries added
+    by the installer. The last one lists the files that contain the prefix,
+    found while packing them, so that they can be relocated when installed.
+    """
+
+    manifest = InstallManifest.load(prefix)
+    check_exportable(manifest)
+
+    patterns = get_prefix_patterns(prefix)
+    header = {
+        "version": BUNDLE_VERSION,
+        "created": time.time(),
+        "platform": get_platform(),
+        "prefix": prefix,
+        "env_name": manifest.get_info("env_name") or os.path.basename(prefix),
+        "wizards": manifest.get_wizards(),
+        "pymol": manifest.get_info("pymol"),
+        "menus": get_menu_record(manifest),
+    }
+
+    prefixed = []
+    stats = {"files": 0, "size": 0}
+    with gzip.GzipFile(
+        fileobj=out, mode="wb", compresslevel=compress_level, mtime=0
+    ) as compressed, tarfile.open(
+        fileobj=compressed, mode="w|", format=tarfile.PAX_FORMAT
+    ) as tar:
+        add_json(tar, HEADER, header)
+        for arcname, path in iter_prefix(prefix):
+            try:
+                tarinfo = tar.gettarinfo(path, arcname.replace(os.sep, "/"))
+            except FileNotFoundError:
+                continue
+            if tarinfo is None:
+                # Sockets and other special files
+                continue
+
+            if not tarinfo.isreg():
+                tar.addfile(tarinfo)
+                continue
+
+            with open(path, "rb") as f:
+                scanner = PrefixScanner(f, patterns)
+                tar.addfile(tarinfo, scanner)
+            stats["files"] += 1
+            stats["size"] += tarinfo.size
+            # Compiled bytecode has its source path fixed up by the import system
+            if scanner.found and not arcname.endswith(".pyc"):
+                prefixed.append(
+                    {
+                        "path": tarinfo.name,
+                        "mode": "binary" if scanner.binary else "text",
+                    }
+                )
+
+        add_json(tar, PREFIXES, {"files": prefixed})
+
+    stats["prefixed"] = len(prefixed)
+    return stats
+
+
+def export_bundle(env_name: str, output: str, compress_level: int = 4) -> None:
+    """Pack an installed environment into a bundle file, or to stdout if output is `-`."""
+
+    # Progress goes to stderr when the bundle itself is written to stdout
+    log = sys.stderr if output == "-" else sys.stdout
+
+    conda_base = get_package_manager().get_base()
+    prefix = find_env_prefix(env_name, conda_base)
+    if prefix is None:
+        raise BundleError(f"Environment {env_name} does not exist.")
+
+    start = time.perf_counter()
+    print(f"Exporting {prefix}...", file=log)
+    with environment_lock(env_name, conda_base):
+        if output == "-":
+            stats = write_bundle(prefix, sys.stdout.buffer, compress_level)
+            sys.stdout.buffer.flush()
+            bundle_size = None
+        else:
+            tmp_file = f"{output}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_file, "wb") as f:
+                    stats = write_bundle(prefix, f, compress_level)
+                os.replace(tmp_file, output)
+            except BaseException:
+                if os.path.exists(tmp_file):
+                    os.remove(tmp_file)
+                raise
+            bundle_size = os.path.getsize(output)
+
+    compressed = "" if bundle_size is None else f", {format_size(bundle_size)} bundle"
+    print(
+        f"Exported {stats['files']} files ({format_size(stats['size'])}{compressed}, {stats['prefixed']} to relocate) in {time.perf_counter() - start:.1f} s.",
+        file=log,
+    )
+
+
+def read_header(tar: tarfile.TarFile) -> dict:
+    member = tar.next()
+    if member is None or member.name != HEADER:
+        raise BundleError("Not a wizard bundle.")
+
+    header = json.load(tar.extractfile(member))
+    if header.get("version") != BUNDLE_VERSION:
+        raise BundleError(
+            f"Unsupported bundle version {header.get('version')}, expected {BUNDLE_VERSION}."
+        )
+    if header["platform"] != get_platform():
+        raise BundleError(
+            f"The bundle was made on {header['platform']} and cannot be installed on {get_platform()}."
+        )
+    return header
+
+
+def get_extract_filter(old_prefix: str, new_prefix: str):
+    """Extraction filter that also points absolute links into the old prefix at the new one."""
+
+    def extract_filter(member: tarfile.TarInfo, path: str) -> tarfile.TarInfo:
+        if member.issym() and member.linkname.startswith(old_prefix):
+            member = member.replace(
+                linkname=new_prefix + member.linkname[len(old_prefix) :], deep=False
+            )
+        return tarfile.tar_filter(member, path)
+
+    return extract_filter
+
+
+def replace_text_prefix(path: str, old_prefix: str, new_prefix: str) -> None:
+    with open(path, "rb") as f:
+        contents = f.read()
+    for old, new in zip(
+        get_prefix_patterns(old_prefix), get_prefix_patterns(new_prefix)
+    ):
+        contents = contents.replace(old, new)
+
+    tmp_file = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(contents)
+    shutil.copymode(path, tmp_file)
+    os.replace(tmp_file, path)
+
+
+def replace_binary_prefix(path: str, old_prefix: str, new_prefix: str) -> bool:
+    """Rewrite the prefix in the C strings of a binary file, padding them with NULs.
+
+    The file keeps its size, so the new prefix cannot be longer than the old
+    one. Returns False if the file could not be relocated.
+    """
+
+    if os.path.getsize(path) == 0:
+        return True
+
+    with open(path, "r+b") as f, mmap.mmap(f.fileno(), 0) as data:
+        for old, new in zip(
+            get_prefix_patterns(old_prefix), get_prefix_patterns(new_prefix)
+        ):
+            padding = len(old) - len(new)
+            for match in re.finditer(re.escape(old) + rb"[^\0]*\0", data):
+                string = match.group()
+                if padding < 0:
+                    return False
+                replaced = string.replace(old, new)
+                replaced += b"\0" * (len(string) - len(replaced))
+                data[match.start() : match.end()] = replaced
+        data.flush()
+    return True
+
+
+def relocate(staging: str, files: list[dict], old_prefix: str, new_prefix: str):
+    """Rewrite the old prefix in the extracted files, returning those that could not be."""
+
+    failed = []
+    for entry in files:
+        path = os.path.join(staging, *entry["path"].split("/"))
+        if os.path.islink(path) or not os.path.isfile(path):
+            continue
+        if entry["mode"] == "text":
+            replace_text_prefix(path, old_prefix, new_prefix)
+        elif not replace_binary_prefix(path, old_prefix, new_prefix):
+            failed.append(entry["path"])
+    return failed
+
+
+def replay_menus(prefix: str, header: dict, env_name: str) -> None:
+    """Add the bundle's menu entries and record them in the environment's manifest."""
+
+    manifest = InstallManifest.load(prefix)
+    manifest.set_info("env_name", env_name)
+    for menu in header["menus"]:
+        menu_file = os.path.join(prefix, menu["file"])
+        if not os.path.exists(menu_file):
+            print(f"Menu file {menu_file} not found, skipping...")
+            continue
+        patch_menu(
+            menu_file,
+            MENU_FORMATS[menu["step"]],
+            add=[(menu["menu_entry"], menu["wizard"])],
+        )
+        manifest.mark_done(
+            menu["wizard"], menu["step"], menu["menu_entry"], [menu_file]
+        )
+
+
+def extract_bundle(tar: tarfile.TarFile, header: dict, prefix: str) -> None:
+    """Stream the rest of a bundle into a new prefix and relocate it."""
+
+    old_prefix = header["prefix"]
+    if len(prefix) > len(old_prefix):
+        print(
+            f"Warning: {prefix} is longer than the prefix the bundle was made from ({old_prefix}), binary files referring to it might not be relocatable."
+        )
+
+    # Extracted next to the target, then moved into place once complete
+    staging = os.path.join(
+        os.path.dirname(prefix), f".{os.path.basename(prefix)}.{os.getpid()}.partial"
+    )
+    try:
+        tar.extractall(
+            staging,
+            members=iter(tar.next, None),
+            filter=get_extract_filter(old_prefix, prefix),
+        )
+
+        with open(os.path.join(staging, *PREFIXES.split("/")), "r") as f:
+            files = json.load(f)["files"]
+        shutil.rmtree(os.path.join(staging, BUNDLE_DIR))
+
+        failed = relocate(staging, files, old_prefix, prefix)
+        if failed:
+            raise BundleError(
+                f"The prefix {old_prefix} cannot be replaced by the longer {prefix} in: {', '.join(failed[:10])}. Install the bundle into a shorter prefix."
+            )
+        os.rename(staging, prefix)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def install_bundle(bundle: str, env_name: str | None = None, prefix: str | None = None):
+    """Install a bundle file, or one read from stdin if bundle is `-`, as a new environment."""
+
+    start = time.perf_counter()
+    stream = sys.stdin.buffer if bundle == "-" else open(bundle, "rb")
+    try:
+        with tarfile.open(fileobj=stream, mode="r|*") as tar:
+            header = read_header(tar)
+            if prefix is not None:
+                prefix = os.path.abspath(os.path.expanduser(prefix))
+                env_name = env_name or os.path.basename(prefix)
+                lock = path_lock(prefix)
+            else:
+                conda_base = get_package_manager().get_base()
+                if conda_base is None:
+                    raise BundleError("Failed to retrieve conda base path.")
+                env_name = env_name or header["env_name"]
+                prefix = os.path.join(get_envs_dirs(conda_base)[0], env_name)
+                lock = environment_lock(env_name, conda_base)
+
+            with lock:
+                if os.path.lexists(prefix):
+                    raise BundleError(f"{prefix} already exists.")
+                os.makedirs(os.path.dirname(prefix), exist_ok=True)
+
+                print(f"Installing {', '.join(header['wizards'])} into {prefix}...")
+                extract_bundle(tar, header, prefix)
+                replay_menus(prefix, header, env_name)
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+
+    print(
+        f"Installed the bundle as environment {env_name} in {time.perf_counter() - start:.1f} s."
+    )
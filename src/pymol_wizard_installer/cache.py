@@ -0,0 +1,170 @@
+import os
+import glob
+import json
+import time
+import shutil
+import hashlib
+
+
+def get_cache_root() -> str:
+    """Get the root directory of the installer's persistent cache."""
+
+    override = os.environ.get("PYMOL_WIZARD_INSTALLER_CACHE")
+    if override:
+        return os.path.abspath(override)
+
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser(
+            os.path.join("~", "AppData", "Local")
+        )
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser(
+            os.path.join("~", ".cache")
+        )
+
+    return os.path.join(base, "pymol_wizard_installer")
+
+
+def get_cache_dir(*parts: str, create: bool = True) -> str:
+    """Get a directory inside the installer's cache, creating it if needed unless create is False."""
+
+    cache_dir = os.path.join(get_cache_root(), *parts)
+    if create:
+        os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def get_dir_size(path: str) -> int:
+    """Get the total size in bytes of the files in a directory tree."""
+
+    size = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            try:
+                size += os.lstat(os.path.join(root, file)).st_size
+            except FileNotFoundError:
+                pass
+    return size
+
+
+def format_size(size: float) -> str:
+    """Format a size in bytes in a human readable way."""
+
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+
+def get_key_digest(key: dict) -> str:
+    """Get a stable digest of a cache key."""
+
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def get_file_digest(path: str) -> str:
+    """Get the SHA-256 digest of a file's contents."""
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_entry(entry_dir: str) -> dict | None:
+    """Read the metadata of a cache entry, or None if the entry is incomplete."""
+
+    try:
+        with open(os.path.join(entry_dir, "entry.json"), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def write_entry(entry_dir: str, entry: dict) -> None:
+    """Atomically write the metadata of a cache entry."""
+
+    entry_file = os.path.join(entry_dir, "entry.json")
+    tmp_file = f"{entry_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(entry, f, indent=2)
+    os.replace(tmp_file, entry_file)
+
+
+def touch_entry(entry_dir: str, entry: dict) -> None:
+    """Record that a cache entry has just been used."""
+
+    entry["last_used"] = time.time()
+    write_entry(entry_dir, entry)
+
+
+def list_entries(cache_dir: str) -> list[dict]:
+    """List the entries of a cache directory, most recently used first."""
+
+    entries = []
+    for name in os.listdir(cache_dir):
+        entry_dir = os.path.join(cache_dir, name)
+        if name.endswith(".tmp") or not os.path.isdir(entry_dir):
+            continue
+
+        entry = read_entry(entry_dir)
+        if entry is None:
+            entry = {"key": {}, "last_used": 0, "broken": True}
+        entry["digest"] = name
+        entry["path"] = entry_dir
+        entry["size"] = get_dir_size(entry_dir)
+        entries.append(entry)
+
+    return sorted(entries, key=lambda entry: entry["last_used"], reverse=True)
+
+
+def prune_entries(
+    cache_dir: str, max_age_days: float | None = None, max_size: int | None = None
+) -> list[dict]:
+    """Remove cache entries that are broken, older than max_age_days, or exceed max_size."""
+
+    removed = []
+    kept_size = 0
+    now = time.time()
+    for entry in list_entries(cache_dir):
+        too_old = (
+            max_age_days is not None and now - entry["last_used"] > max_age_days * 86400
+        )
+        too_big = max_size is not None and kept_size + entry["size"] > max_size
+        if entry.get("broken") or too_old or too_big:
+            shutil.rmtree(entry["path"], ignore_errors=True)
+            removed.append(entry)
+        else:
+            kept_size += entry["size"]
+
+    # Leftovers of interrupted builds
+    for leftover in glob.glob(os.path.join(cache_dir, "*.tmp")):
+        if now - os.path.getmtime(leftover) > 86400:
+            shutil.rmtree(leftover, ignore_errors=True)
+
+    return removed
+
+
+# Directories that never contribute to the contents of a source tree
+IGNORED_DIRS = {".git", "__pycache__", "tmp", "build", "dist", ".venv", "venv"}
+
+
+def get_tree_digest(root: str) -> str:
+    """Get a digest of the files in a source tree, ignoring build leftovers."""
+
+    digest = hashlib.sha256()
+    for current_dir, dirs, files in os.walk(root):
+        dirs[:] = sorted(
+            d for d in dirs if d not in IGNORED_DIRS and not d.endswith(".egg-info")
+        )
+        for file in sorted(files):
+            if file.endswith((".pyc", ".pyo")):
+                continue
+            path = os.path.join(current_dir, file)
+            digest.update(os.path.relpath(path, root).replace(os.sep, "/").encode())
+            digest.update(b"\0")
+            digest.update(get_file_digest(path).encode())
+            digest.update(b"\0")
+    return digest.hexdigest()
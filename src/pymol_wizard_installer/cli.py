@@ -0,0 +1,21 @@
+# Names accepted by --package-manager, fastest first, as in
+# package_manager.PACKAGE_MANAGERS. That module is not imported here, so
+# that the commands can parse their arguments without loading it.
+PACKAGE_MANAGER_NAMES = ["micromamba", "mamba", "conda"]
+
+
+def add_package_manager_argument(parser, help: str) -> None:
+    parser.add_argument(
+        "--package-manager",
+        type=str,
+        metavar="{" + ",".join(PACKAGE_MANAGER_NAMES) + "}",
+        help=help,
+    )
+
+
+def add_wizards_dir_argument(parser) -> None:
+    parser.add_argument(
+        "--wizards-dir",
+        type=str,
+        help="Directory containing one wizard per subdirectory, in which wizards given by name are looked up. Defaults to $PYMOL_WIZARD_INSTALLER_WIZARDS_DIR.",
+    )
@@ -0,0 +1,175 @@
+import os
+import subprocess
+
+from pymol_wizard_installer.process_runner import run_process
+
+
+def is_conda_prefix(path: str) -> bool:
+    """Check if a directory is a conda prefix."""
+
+    return os.path.isdir(os.path.join(path, "conda-meta"))
+
+
+def get_conda_base() -> str | None:
+    """Get the base conda installation path without spawning conda, if possible."""
+
+    conda_exe = os.environ.get("CONDA_EXE")
+    if conda_exe:
+        # CONDA_EXE is <base>/bin/conda or <base>\Scripts\conda.exe
+        base = os.path.dirname(os.path.dirname(os.path.abspath(conda_exe)))
+        if is_conda_prefix(base):
+            return base
+
+    conda_root = os.environ.get("CONDA_ROOT")
+    if conda_root and is_conda_prefix(conda_root):
+        return conda_root
+
+    conda_prefix = os.environ.get("CONDA_PREFIX")
+    if conda_prefix:
+        if os.path.isdir(os.path.join(conda_prefix, "condabin")):
+            return conda_prefix
+
+        parent = os.path.dirname(os.path.abspath(conda_prefix))
+        if os.path.basename(parent) == "envs":
+            base = os.path.dirname(parent)
+            if is_conda_prefix(base):
+                return base
+
+    try:
+        return run_process(
+            ["conda", "info", "--base"], check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+def get_condarc_files(conda_base: str) -> list[str]:
+    """Get the condarc files conda would read, in order of precedence."""
+
+    files = [
+        os.path.join(conda_base, ".condarc"),
+        os.path.join(conda_base, "condarc"),
+        os.path.expanduser(os.path.join("~", ".config", "conda", ".condarc")),
+        os.path.expanduser(os.path.join("~", ".conda", ".condarc")),
+        os.path.expanduser(os.path.join("~", ".conda", "condarc")),
+        os.path.expanduser(os.path.join("~", ".condarc")),
+    ]
+    if os.environ.get("CONDARC"):
+        files.append(os.environ["CONDARC"])
+
+    return [file for file in files if os.path.isfile(file)]
+
+
+def read_condarc(conda_base: str) -> dict:
+    """Merge the condarc files into a single configuration."""
+
+    # Only needed when there are condarc files, and slow to import
+    import yaml
+
+    config = {}
+    for file in get_condarc_files(conda_base):
+        try:
+            with open(file, "r") as f:
+                contents = yaml.safe_load(f) or {}
+        except (OSError, yaml.YAMLError):
+            continue
+
+        if not isinstance(contents, dict):
+            continue
+
+        for key, value in contents.items():
+            if isinstance(value, list) and isinstance(config.get(key), list):
+                config[key] = value + [v for v in config[key] if v not in value]
+            else:
+                config[key] = value
+
+    return config
+
+
+def get_envs_dirs(conda_base: str) -> list[str]:
+    """Get the directories conda looks for named environments in."""
+
+    envs_dirs = []
+    for var in ["CONDA_ENVS_DIRS", "CONDA_ENVS_PATH"]:
+        if os.environ.get(var):
+            envs_dirs.extend(os.environ[var].split(os.pathsep))
+
+    envs_dirs.extend(read_condarc(conda_base).get("envs_dirs") or [])
+    envs_dirs.append(os.path.join(conda_base, "envs"))
+    envs_dirs.append(os.path.expanduser(os.path.join("~", ".conda", "envs")))
+
+    unique_dirs = []
+    for envs_dir in envs_dirs:
+        envs_dir = os.path.abspath(os.path.expandvars(os.path.expanduser(envs_dir)))
+        if envs_dir not in unique_dirs:
+            unique_dirs.append(envs_dir)
+
+    return unique_dirs
+
+
+def get_registered_prefixes() -> list[str]:
+    """Get the environment prefixes registered in ~/.conda/environments.txt."""
+
+    environments_file = os.path.expanduser(
+        os.path.join("~", ".conda", "environments.txt")
+    )
+    try:
+        with open(environments_file, "r") as f:
+            return [line.strip() for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def list_env_prefixes(conda_base: str) -> list[str]:
+    """List the prefixes of all the known conda environments."""
+
+    prefixes = [conda_base]
+    for envs_dir in get_envs_dirs(conda_base):
+        try:
+            entries = sorted(os.listdir(envs_dir))
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        prefixes.extend(os.path.join(envs_dir, entry) for entry in entries)
+
+    prefixes.extend(get_registered_prefixes())
+
+    unique_prefixes = []
+    for prefix in prefixes:
+        prefix = os.path.abspath(prefix)
+        if prefix not in unique_prefixes and is_conda_prefix(prefix):
+            unique_prefixes.append(prefix)
+
+    return unique_prefixes
+
+
+def find_env_prefix(env_name: str, conda_base: str | None = None) -> str | None:
+    """Get the prefix of a conda environment, or None if it does not exist."""
+
+    if conda_base is None:
+        conda_base = get_conda_base()
+        if conda_base is None:
+            return None
+
+    if os.sep in env_name or (os.altsep and os.altsep in env_name):
+        prefix = os.path.abspath(os.path.expanduser(env_name))
+        return prefix if is_conda_prefix(prefix) else None
+
+    if env_name == "base":
+        return conda_base
+
+    for envs_dir in get_envs_dirs(conda_base):
+        prefix = os.path.join(envs_dir, env_name)
+        if is_conda_prefix(prefix):
+            return prefix
+
+    for prefix in get_registered_prefixes():
+        if os.path.basename(prefix) == env_name and is_conda_prefix(prefix):
+            return os.path.abspath(prefix)
+
+    return None
+
+
+def env_exists(env_name: str, conda_base: str | None = None) -> bool:
+    """Check if a conda environment exists."""
+
+    return find_env_prefix(env_name, conda_base) is not None
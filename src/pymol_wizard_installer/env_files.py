@@ -0,0 +1,155 @@
+import os
+import sys
+import platform
+
+import yaml
+
+from pymol_wizard_installer.cache import get_cache_dir, get_key_digest
+from pymol_wizard_installer.env_discovery import read_condarc
+
+
+def _add_unique(items: list, item) -> None:
+    if item not in items:
+        items.append(item)
+
+
+def merge_envs(env_files: list[str]) -> dict:
+    """Merge several conda environment files into one environment.
+
+    Channels and dependencies are concatenated in order without duplicates,
+    and the pip sections are merged into a single one.
+    """
+
+    channels = []
+    dependencies = []
+    pip_dependencies = []
+    variables = {}
+    for env_file in env_files:
+        with open(env_file, "r") as f:
+            env = yaml.safe_load(f) or {}
+
+        for channel in env.get("channels") or []:
+            _add_unique(channels, channel)
+
+        for dependency in env.get("dependencies") or []:
+            if isinstance(dependency, dict):
+                for pip_dependency in dependency.get("pip") or []:
+                    _add_unique(pip_dependencies, pip_dependency)
+            else:
+                _add_unique(dependencies, dependency)
+
+        variables.update(env.get("variables") or {})
+
+    merged = {}
+    if channels:
+        merged["channels"] = channels
+    if pip_dependencies:
+        _add_unique(dependencies, "pip")
+        dependencies.append({"pip": pip_dependencies})
+    merged["dependencies"] = dependencies
+    if variables:
+        merged["variables"] = variables
+    return merged
+
+
+def get_merged_env_file(merged: dict) -> str:
+    """Get the path in the cache of the file holding a merged environment, without writing it."""
+
+    return os.path.join(
+        get_cache_dir("envs", create=False), f"{get_key_digest(merged)[:16]}.yaml"
+    )
+
+
+def merge_env_files(env_files: list[str]) -> str:
+    """Merge several conda environment files into one, so they are solved together.
+
+    The merged file is written to the cache and its path is returned.
+    """
+
+    if len(env_files) == 1:
+        return env_files[0]
+
+    merged = merge_envs(env_files)
+    merged_file = get_merged_env_file(merged)
+    # Named after its contents, so an existing file is already up to date
+    if not os.path.exists(merged_file):
+        os.makedirs(os.path.dirname(merged_file), exist_ok=True)
+        tmp_file = f"{merged_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w") as f:
+            yaml.safe_dump(merged, f, sort_keys=False)
+        os.replace(tmp_file, merged_file)
+
+    return merged_file
+
+
+def get_conda_subdir() -> str:
+    """Get the conda platform subdirectory, e.g. linux-64, that packages are solved for."""
+
+    if os.environ.get("CONDA_SUBDIR"):
+        return os.environ["CONDA_SUBDIR"]
+
+    system = {"win32": "win", "darwin": "osx"}.get(sys.platform, sys.platform)
+    if system.startswith("linux"):
+        system = "linux"
+
+    machine = platform.machine().lower()
+    arch = {
+        "x86_64": "64",
+        "amd64": "64",
+        "aarch64": "aarch64",
+        "arm64": "arm64",
+        "ppc64le": "ppc64le",
+    }.get(machine, machine)
+    if system == "linux" and arch == "arm64":
+        arch = "aarch64"
+
+    return f"{system}-{arch}"
+
+
+def read_env_file(env_file: str) -> dict:
+    with open(env_file, "r") as f:
+        return yaml.safe_load(f) or {}
+
+
+def get_env_file_digest(env_file: str, env: dict | None = None) -> str:
+    """Digest of the channels, dependencies and variables of an environment file.
+
+    The file is not read if its parsed contents are given as env.
+    """
+
+    if env is None:
+        env = read_env_file(env_file)
+    return get_key_digest(
+        {
+            "channels": env.get("channels") or [],
+            "dependencies": env.get("dependencies") or [],
+            "variables": env.get("variables") or {},
+        }
+    )
+
+
+def get_pip_dependencies(env: dict) -> list[str]:
+    """Get the pip section of a parsed environment file."""
+
+    pip_dependencies = []
+    for dependency in env.get("dependencies") or []:
+        if isinstance(dependency, dict):
+            pip_dependencies.extend(dependency.get("pip") or [])
+    return pip_dependencies
+
+
+def get_env_fingerprint(env_file: str, conda_base: str, env: dict | None = None) -> str:
+    """Fingerprint everything that determines the result of solving an environment file.
+
+    This covers the file's channels, dependencies and variables, the channels
+    configured in condarc and the platform the environment is solved for.
+    The file is not read if its parsed contents are given as env.
+    """
+
+    return get_key_digest(
+        {
+            "env_file": get_env_file_digest(env_file, env),
+            "condarc_channels": read_condarc(conda_base).get("channels") or [],
+            "subdir": get_conda_subdir(),
+        }
+    )
@@ -0,0 +1,135 @@
+import os
+import shutil
+import tempfile
+import subprocess
+
+from pymol_wizard_installer.cache import get_cache_dir
+from pymol_wizard_installer.env_files import (
+    get_conda_subdir,
+    get_env_file_digest,
+    get_pip_dependencies,
+    read_env_file,
+)
+from pymol_wizard_installer.env_runner import run_in_env
+from pymol_wizard_installer.package_manager import get_package_manager
+
+# Header line recording the digest of the environment file a lock was generated from
+SOURCE_HEADER = "# source-digest: "
+
+
+def get_lock_file(env_file: str, subdir: str | None = None) -> str:
+    """Get the path of the explicit lockfile of an environment file for a platform.
+
+    The lock is kept next to the environment file, e.g. environment.yaml is
+    locked for linux-64 in environment.linux-64.lock.
+    """
+
+    stem = os.path.splitext(env_file)[0]
+    return f"{stem}.{subdir or get_conda_subdir()}.lock"
+
+
+def read_source_digest(lock_file: str) -> str | None:
+    """Read the digest of the environment file a lock was generated from."""
+
+    try:
+        with open(lock_file, "r") as f:
+            for line in f:
+                if line.startswith(SOURCE_HEADER):
+                    return line[len(SOURCE_HEADER) :].strip()
+                if not line.startswith("#"):
+                    break
+    except FileNotFoundError:
+        pass
+
+    return None
+
+
+def is_lock_up_to_date(env_file: str, lock_file: str, env: dict | None = None) -> bool:
+    """Check if a lock was generated from the current contents of the environment file."""
+
+    return read_source_digest(lock_file) == get_env_file_digest(env_file, env)
+
+
+def find_lock(env_file: str) -> str | None:
+    """Get the lock of an environment file for this platform, if it is present and up to date."""
+
+    lock_file = get_lock_file(env_file)
+    if not os.path.exists(lock_file):
+        return None
+
+    if not is_lock_up_to_date(env_file, lock_file):
+        print(
+            f"{lock_file} is out of date with {env_file}, solving the environment file instead..."
+        )
+        return None
+
+    return lock_file
+
+
+def write_lock(env_file: str, env_name: str | None = None, prefix: str | None = None):
+    """Write the lock of an environment file from an environment solved from it.
+
+    The lock lists the exact URL and MD5 hash of every conda package in the
+    environment. Returns the path of the lock, or None if it could not be
+    written, e.g. because the directory of the environment file is read-only.
+    This is not fatal: the environment file is simply solved again next time.
+    """
+
+    lock_file = get_lock_file(env_file)
+    try:
+        packages = get_package_manager().list_explicit(env_name=env_name, prefix=prefix)
+    except subprocess.CalledProcessError as e:
+        print(f"Could not list the packages to write {lock_file}: {e}")
+        return None
+
+    tmp_file = f"{lock_file}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_file, "w") as f:
+            f.write(
+                f"# Generated by pymol_wizard_installer from {os.path.basename(env_file)}, do not edit.\n"
+            )
+            f.write(f"{SOURCE_HEADER}{get_env_file_digest(env_file)}\n")
+            f.write(packages)
+        os.replace(tmp_file, lock_file)
+    except OSError as e:
+        print(f"Could not write {lock_file}: {e}")
+        return None
+
+    print(f"Locked the environment in {lock_file}.")
+    return lock_file
+
+
+def create_env_from_lock(env_name: str, env_file: str, lock_file: str) -> None:
+    """Create an environment from its lock, without running the solver.
+
+    Explicit locks only cover conda packages, so the pip dependencies and the
+    variables of the environment file are installed and set afterwards.
+    """
+
+    get_package_manager().create_from_explicit(env_name, lock_file)
+
+    env = read_env_file(env_file)
+    pip_dependencies = get_pip_dependencies(env)
+    if pip_dependencies:
+        run_in_env(
+            env_name,
+            ["python", "-m", "pip", "install", *pip_dependencies],
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(env_file)),
+        )
+
+    variables = env.get("variables") or {}
+    if variables:
+        get_package_manager().set_variables(env_name, variables)
+
+
+def refresh_lock(env_file: str) -> str | None:
+    """Solve an environment file from scratch in a scratch prefix and lock the result."""
+
+    scratch_dir = tempfile.mkdtemp(dir=get_cache_dir("lock"))
+    prefix = os.path.join(scratch_dir, "env")
+    try:
+        get_package_manager().create_prefix(prefix, env_file)
+        return write_lock(env_file, prefix=prefix)
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
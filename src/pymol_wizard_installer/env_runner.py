@@ -0,0 +1,203 @@
+import os
+import json
+import shutil
+import hashlib
+import subprocess
+
+from pymol_wizard_installer.cache import get_cache_dir
+from pymol_wizard_installer.env_discovery import find_env_prefix
+from pymol_wizard_installer.package_manager import get_package_manager
+from pymol_wizard_installer.process_runner import run_process
+
+# When enabled, commands are executed directly with the environment's
+# activation variables instead of going through `conda run`.
+_direct_exec = False
+
+# In-memory copy of the activation cache, keyed by environment name.
+_activations = {}
+
+_CAPTURE_SCRIPT = "import json, os; print(json.dumps(dict(os.environ)))"
+
+# Variables that the shell running the activation changes for itself
+_SHELL_VARIABLES = {"_", "SHLVL", "PWD", "OLDPWD"}
+
+
+def set_direct_exec(enabled: bool) -> None:
+    """Enable or disable direct execution for the current run."""
+
+    global _direct_exec
+    _direct_exec = enabled
+
+
+def is_direct_exec() -> bool:
+    """Check whether direct execution is enabled."""
+
+    return _direct_exec
+
+
+def get_prefix_fingerprint(prefix: str) -> list[int] | None:
+    """Fingerprint the parts of a prefix that affect its activation."""
+
+    fingerprint = []
+    for path in [
+        prefix,
+        os.path.join(prefix, "conda-meta"),
+        os.path.join(prefix, "etc", "conda", "activate.d"),
+    ]:
+        try:
+            fingerprint.append(os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            if path == prefix:
+                return None
+            fingerprint.append(0)
+
+    return fingerprint
+
+
+def get_activation_delta(before: dict, after: dict) -> dict:
+    """Get the changes that activating an environment makes to the variables.
+
+    Values that the activation prepends to, like PATH, only record the
+    prepended part, so that it can be applied to a different value later.
+    """
+
+    delta = {"set": {}, "prepend": {}, "unset": []}
+    for key in sorted(set(before) - set(after) - _SHELL_VARIABLES):
+        delta["unset"].append(key)
+
+    for key, value in after.items():
+        old_value = before.get(key)
+        if key in _SHELL_VARIABLES or value == old_value:
+            continue
+
+        if old_value and value.endswith(os.pathsep + old_value):
+            delta["prepend"][key] = value[: -len(old_value)]
+        else:
+            delta["set"][key] = value
+
+    return delta
+
+
+def apply_activation_delta(delta: dict, environ: dict) -> dict:
+    """Apply the changes made by an activation to a copy of the variables."""
+
+    environ = dict(environ)
+    for key in delta["unset"]:
+        environ.pop(key, None)
+    for key, value in delta["prepend"].items():
+        environ[key] = (
+            value + environ[key] if environ.get(key) else value.removesuffix(os.pathsep)
+        )
+    environ.update(delta["set"])
+    return environ
+
+
+def _get_cache_file(prefix: str) -> str:
+    digest = hashlib.sha256(os.path.abspath(prefix).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(get_cache_dir("activation"), f"{digest}.json")
+
+
+def _load_cached_activation(env_name: str) -> dict | None:
+    """Load a cached activation delta, returning None if missing or stale."""
+
+    entry = _activations.get(env_name)
+    if entry is None:
+        prefix = find_env_prefix(env_name, get_package_manager().get_base())
+        if prefix is None:
+            return None
+
+        try:
+            with open(_get_cache_file(prefix), "r") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if "delta" not in entry:
+            return None
+
+    if get_prefix_fingerprint(entry["prefix"]) != entry["fingerprint"]:
+        return None
+
+    _activations[env_name] = entry
+    return entry["delta"]
+
+
+def capture_activation(env_name: str) -> dict | None:
+    """Capture the changes the activation of an environment makes, and cache them.
+
+    Only the changes are kept, so that the variables of the current process,
+    which may hold credentials, are never written to the cache.
+    """
+
+    try:
+        output = run_process(
+            get_package_manager().get_run_command(
+                env_name, ["python", "-c", _CAPTURE_SCRIPT]
+            ),
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        activated = json.loads(output.strip().splitlines()[-1])
+    except (subprocess.CalledProcessError, json.JSONDecodeError, IndexError):
+        return None
+
+    prefix = activated.get("CONDA_PREFIX")
+    if not prefix:
+        return None
+
+    entry = {
+        "prefix": prefix,
+        "fingerprint": get_prefix_fingerprint(prefix),
+        "delta": get_activation_delta(dict(os.environ), activated),
+    }
+    _activations[env_name] = entry
+
+    cache_file = _get_cache_file(prefix)
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(entry, f)
+    os.replace(tmp_file, cache_file)
+
+    return entry["delta"]
+
+
+def get_activation(env_name: str) -> dict | None:
+    """Get the variables of the current process as activated for an environment.
+
+    The cached activation is applied to the current variables, so that
+    variables set since it was captured are kept.
+    """
+
+    delta = _load_cached_activation(env_name) or capture_activation(env_name)
+    if delta is None:
+        return None
+
+    return apply_activation_delta(delta, os.environ)
+
+
+def get_env_command(env_name: str, args: list[str]) -> tuple[list[str], dict | None]:
+    """Build the command line and environment needed to run a command in a conda environment."""
+
+    if _direct_exec:
+        environ = get_activation(env_name)
+        if environ is not None:
+            executable = shutil.which(args[0], path=environ.get("PATH"))
+            if executable is not None:
+                return [executable, *args[1:]], environ
+
+    return get_package_manager().get_run_command(env_name, args), None
+
+
+def run_in_env(env_name: str, args: list[str], **kwargs) -> subprocess.CompletedProcess:
+    """Run a command inside a conda environment.
+
+    Variables passed as `env` are added to those of the environment, instead
+    of replacing them.
+    """
+
+    command, environ = get_env_command(env_name, args)
+    if environ is not None or "env" in kwargs:
+        kwargs["env"] = {**(environ or os.environ), **kwargs.get("env", {})}
+
+    # Named after the tool, since every command goes through `conda run` otherwise
+    return run_process(command, name=os.path.basename(args[0]), **kwargs)
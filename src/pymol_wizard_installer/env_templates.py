@@ -0,0 +1,121 @@
+import os
+import re
+import time
+
+from pymol_wizard_installer.env_discovery import find_env_prefix, read_condarc
+from pymol_wizard_installer.env_files import get_conda_subdir, get_env_fingerprint
+from pymol_wizard_installer.package_manager import get_package_manager
+from pymol_wizard_installer.install_manifest import (
+    ENVIRONMENT,
+    InstallManifest,
+    get_manifest_file,
+)
+
+# Templates older than this are rebuilt, so that they pick up package updates
+TEMPLATE_MAX_AGE_DAYS = 30
+
+
+class EnvTemplate:
+    """Environment with Python, PyMOL and optionally OpenVR preinstalled, cloned to create wizard environments.
+
+    The template is solved from the wizards' environment file, whose digest is
+    part of its name, so that wizards with other dependencies do not inherit
+    them through the clone.
+    """
+
+    python_version: str
+    pymol_version: str
+    use_openvr: bool
+    env_digest: str
+
+    def __init__(self, python_version, pymol_version, use_openvr, env_digest):
+        self.python_version = str(python_version)
+        self.pymol_version = str(pymol_version)
+        self.use_openvr = use_openvr
+        self.env_digest = env_digest
+
+    @property
+    def name(self) -> str:
+        openvr = "openvr" if self.use_openvr else "no-openvr"
+        name = (
+            f"pymol-template-py{self.python_version}-pymol{self.pymol_version}"
+            f"-{openvr}-{self.env_digest[:8]}"
+        )
+        return re.sub(r"[^\w.-]", "_", name)
+
+    def get_key(self, conda_base: str) -> dict:
+        """Get everything the contents of the template depend on."""
+
+        return {
+            "python_version": self.python_version,
+            "pymol_version": self.pymol_version,
+            "openvr": self.use_openvr,
+            "env_file": self.env_digest,
+            "condarc_channels": read_condarc(conda_base).get("channels") or [],
+            "subdir": get_conda_subdir(),
+        }
+
+    def get_stale_reason(self, conda_base: str) -> str | None:
+        """Get the reason why the template must be (re)built, or None if it is usable."""
+
+        prefix = find_env_prefix(self.name, conda_base)
+        if prefix is None:
+            return "it does not exist"
+
+        manifest = InstallManifest.load(prefix)
+        info = manifest.get_info("template")
+        if info is None:
+            return "it was not completely built"
+        if info["key"] != self.get_key(conda_base):
+            return "its configuration changed"
+        if time.time() - info["created"] > TEMPLATE_MAX_AGE_DAYS * 24 * 60 * 60:
+            return f"it is older than {TEMPLATE_MAX_AGE_DAYS} days"
+        if not manifest.is_done(ENVIRONMENT, "template", info["key"]):
+            return "it was modified since it was built"
+
+        return None
+
+    def mark_built(self, conda_base: str) -> None:
+        """Record that the template was completely built."""
+
+        prefix = find_env_prefix(self.name, conda_base)
+        manifest = InstallManifest.load(prefix)
+        key = self.get_key(conda_base)
+        manifest.mark_done(
+            ENVIRONMENT,
+            "template",
+            key,
+            files=[os.path.join(prefix, "conda-meta", "history")],
+        )
+        manifest.set_info("template", {"key": key, "created": time.time()})
+
+    def remove(self) -> None:
+        get_package_manager().remove(self.name)
+
+    def clone(self, env_name: str, env_file: str, conda_base: str) -> None:
+        """Create an environment by cloning the template, then apply the environment file on top.
+
+        Conda hardlinks the packages of the clone from its package cache. The
+        environment file is only applied if it differs from the one the
+        template was built from.
+        """
+
+        template_prefix = find_env_prefix(self.name, conda_base)
+        template_manifest = InstallManifest.load(template_prefix)
+        get_package_manager().clone(env_name, self.name)
+
+        prefix = find_env_prefix(env_name, conda_base)
+        # The clone does not share the template's installation record
+        try:
+            os.remove(get_manifest_file(prefix))
+        except FileNotFoundError:
+            pass
+
+        if not template_manifest.is_done(
+            ENVIRONMENT, "env", get_env_fingerprint(env_file, conda_base)
+        ):
+            get_package_manager().update(env_name, env_file)
+
+        manifest = InstallManifest.load(prefix)
+        manifest.set_info("cloned_from", self.name)
+        manifest.set_info("pymol", template_manifest.get_info("pymol"))
@@ -0,0 +1,58 @@
+import argparse
+
+from pymol_wizard_installer.cli import add_package_manager_argument
+
+
+def parse_args():
+    """Parse and return command line arguments."""
+
+    parser = argparse.ArgumentParser(
+        prog="export_bundle",
+        description="Pack an environment with installed wizards into a bundle that can be installed offline.",
+    )
+    parser.add_argument(
+        "env_name", type=str, help="Name of the conda environment to pack."
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        help="Bundle file to write, or `-` for stdout. Defaults to ENV_NAME.wizard-bundle.tar.gz.",
+    )
+    parser.add_argument(
+        "--compress-level",
+        type=int,
+        default=4,
+        choices=range(0, 10),
+        metavar="{0-9}",
+        help="gzip compression level, from 0 (fastest) to 9 (smallest).",
+    )
+
+    add_package_manager_argument(
+        parser,
+        "Package manager whose environments are used, or the path of its executable.",
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    from pymol_wizard_installer.bundle import BundleError, export_bundle
+    from pymol_wizard_installer.package_manager import set_package_manager
+
+    set_package_manager(args.package_manager)
+    try:
+        export_bundle(
+            args.env_name,
+            args.output or f"{args.env_name}.wizard-bundle.tar.gz",
+            args.compress_level,
+        )
+    except BundleError as e:
+        print(e)
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import os
+import time
+import hashlib
+from contextlib import contextmanager
+
+from pymol_wizard_installer.cache import get_cache_dir
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+def get_lock_file(name: str) -> str:
+    digest = hashlib.sha256(name.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(get_cache_dir("locks"), f"{digest}.lock")
+
+
+def _try_lock(fd: int) -> bool:
+    try:
+        if os.name == "nt":
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(fd: int) -> None:
+    if os.name == "nt":
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+@contextmanager
+def file_lock(name: str, description: str | None = None):
+    """Hold an exclusive lock shared by every installer process on the machine.
+
+    Locks are identified by an arbitrary name, e.g. the path of the resource
+    they protect, and live in the cache so that nothing is written next to
+    the resource itself. They are released when the process exits, even if
+    it is killed. The same name must not be locked again while held.
+    """
+
+    fd = os.open(get_lock_file(name), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if not _try_lock(fd):
+            print(
+                f"Waiting for another installation to release {description or name}..."
+            )
+            while not _try_lock(fd):
+                time.sleep(0.1)
+        try:
+            yield
+        finally:
+            _unlock(fd)
+    finally:
+        os.close(fd)
+
+
+def environment_lock(env_name: str, conda_base: str):
+    """Lock an environment, so that only one process creates or edits it at a time."""
+
+    return file_lock(
+        f"environment {os.path.normcase(os.path.abspath(conda_base))} {env_name}",
+        f"environment {env_name}",
+    )
+
+
+def path_lock(path: str, description: str | None = None):
+    """Lock a file or directory, e.g. a checkout that several processes might write to."""
+
+    return file_lock(
+        f"path {os.path.normcase(os.path.abspath(path))}", description or path
+    )
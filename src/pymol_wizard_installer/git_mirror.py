@@ -0,0 +1,148 @@
+import os
+import time
+import subprocess
+
+from pymol_wizard_installer.cache import (
+    get_cache_dir,
+    get_key_digest,
+    list_entries as list_cache_entries,
+    prune_entries,
+    read_entry,
+    touch_entry,
+)
+from pymol_wizard_installer.file_locks import file_lock
+from pymol_wizard_installer.process_runner import run_process
+from pymol_wizard_installer.profiling import span
+
+
+def get_mirrors_dir() -> str:
+    return get_cache_dir("git")
+
+
+def get_mirror(url: str) -> str:
+    """Get the bare mirror repository for a remote, creating it if needed."""
+
+    mirror = os.path.join(get_mirrors_dir(), get_key_digest({"url": url}))
+    entry = read_entry(mirror)
+    if entry is None:
+        if not os.path.exists(os.path.join(mirror, "HEAD")):
+            run_process(
+                ["git", "init", "--quiet", "--bare", mirror],
+                check=True,
+            )
+            run_process(
+                ["git", "-C", mirror, "remote", "add", "origin", url],
+                check=True,
+            )
+        entry = {"key": {"url": url}, "created": time.time()}
+
+    touch_entry(mirror, entry)
+    return mirror
+
+
+def has_ref(mirror: str, ref: str) -> bool:
+    """Check if the mirror contains the given ref."""
+
+    return (
+        run_process(
+            [
+                "git",
+                "-C",
+                mirror,
+                "rev-parse",
+                "--verify",
+                "--quiet",
+                f"{ref}^{{commit}}",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        ).returncode
+        == 0
+    )
+
+
+def fetch(mirror: str, version: str) -> None:
+    """Shallowly fetch a tag or branch into the mirror.
+
+    Tags are assumed to be immutable, so a tag already in the mirror is not
+    fetched again. Branches are always refreshed.
+    """
+
+    tag_ref = f"refs/tags/{version}"
+    if has_ref(mirror, tag_ref):
+        return
+
+    for ref in [tag_ref, f"refs/heads/{version}"]:
+        result = run_process(
+            [
+                "git",
+                "-C",
+                mirror,
+                "fetch",
+                "--quiet",
+                "--depth",
+                "1",
+                "--force",
+                "origin",
+                f"{ref}:{ref}",
+            ],
+            stderr=subprocess.DEVNULL,
+        )
+        if result.returncode == 0:
+            return
+
+    raise subprocess.CalledProcessError(
+        result.returncode, ["git", "fetch", "origin", version]
+    )
+
+
+def checkout(url: str, version: str, dest: str) -> None:
+    """Check out a tag or branch of a remote into dest, as a worktree of its mirror.
+
+    The worktree shares the objects of the mirror instead of copying them, and
+    needs no network access once the version is in the mirror. Removing the
+    mirror leaves the checked out files in place, but not their history.
+    """
+
+    with span(f"clone {os.path.basename(dest)}", "clone", version=version):
+        # Concurrent fetches into the same mirror would fight over its refs,
+        # and worktrees are registered in the mirror too
+        with file_lock(f"git-mirror {url}", f"the mirror of {url}"):
+            mirror = get_mirror(url)
+            fetch(mirror, version)
+            # Forget the worktrees whose checkouts were deleted
+            run_process(["git", "-C", mirror, "worktree", "prune"], check=True)
+            run_process(
+                [
+                    "git",
+                    "-C",
+                    mirror,
+                    "worktree",
+                    "add",
+                    "--quiet",
+                    "--detach",
+                    os.path.abspath(dest),
+                    version,
+                ],
+                check=True,
+            )
+
+
+def list_entries() -> list[dict]:
+    """List the mirrored repositories, most recently used first."""
+
+    return list_cache_entries(get_mirrors_dir())
+
+
+def prune(max_age_days: float | None = None, max_size: int | None = None) -> list[dict]:
+    """Remove mirrors that are broken, unused or over the size budget."""
+
+    return prune_entries(get_mirrors_dir(), max_age_days, max_size)
+
+
+def describe_entry(entry: dict) -> str:
+    key = entry["key"]
+    if not key:
+        return "(incomplete entry)"
+
+    return f"mirror of {key['url']}"
@@ -0,0 +1,52 @@
+import argparse
+
+from pymol_wizard_installer.cli import add_package_manager_argument
+
+
+def parse_args():
+    """Parse and return command line arguments."""
+
+    parser = argparse.ArgumentParser(
+        prog="install_bundle",
+        description="Install a bundle made by export_bundle as a new environment, without network access or compilation.",
+    )
+    parser.add_argument(
+        "bundle", type=str, help="Bundle file to install, or `-` to read it from stdin."
+    )
+
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument(
+        "--env_name",
+        type=str,
+        help="Name of the environment to create. Defaults to the name of the packed environment.",
+    )
+    target.add_argument(
+        "--prefix",
+        type=str,
+        help="Path of the environment to create, instead of a name.",
+    )
+
+    add_package_manager_argument(
+        parser,
+        "Package manager whose environments directory is used, or the path of its executable.",
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    from pymol_wizard_installer.bundle import BundleError, install_bundle
+    from pymol_wizard_installer.package_manager import set_package_manager
+
+    set_package_manager(args.package_manager)
+    try:
+        install_bundle(args.bundle, args.env_name, args.prefix)
+    except BundleError as e:
+        print(e)
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
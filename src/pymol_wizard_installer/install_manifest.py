@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import threading
+
+from pymol_wizard_installer.cache import get_file_digest
+from pymol_wizard_installer.env_discovery import list_env_prefixes
+
+# Scope of the steps that concern the environment rather than a single wizard
+ENVIRONMENT = "environment"
+
+
+def get_manifest_file(prefix: str) -> str:
+    return os.path.join(prefix, "etc", "pymol_wizard_installer", "manifest.json")
+
+
+class InstallManifest:
+    """Record of the installation steps done in an environment and their inputs.
+
+    Steps are grouped by scope: either ENVIRONMENT or the name of a wizard.
+    Each completed step is stored with a fingerprint of its inputs, so that
+    a later installation can skip the steps whose inputs are unchanged.
+    """
+
+    prefix: str
+    data: dict
+
+    def __init__(self, prefix, data):
+        self.prefix = prefix
+        self.data = data
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def load(prefix: str) -> "InstallManifest":
+        """Load the manifest of an environment, or an empty one if there is none."""
+
+        try:
+            with open(get_manifest_file(prefix), "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = {}
+
+        data.setdefault(ENVIRONMENT, {"steps": {}, "files": {}})
+        data.setdefault("wizards", {})
+        return InstallManifest(prefix, data)
+
+    def _get_scope(self, scope: str) -> dict:
+        if scope == ENVIRONMENT:
+            return self.data[ENVIRONMENT]
+        return self.data["wizards"].setdefault(scope, {"steps": {}, "files": {}})
+
+    def is_done(self, scope: str, step: str, fingerprint) -> bool:
+        """Check if a step was completed with the same inputs and its files are intact."""
+
+        with self._lock:
+            if scope == ENVIRONMENT:
+                record = self.data[ENVIRONMENT]
+            else:
+                record = self.data["wizards"].get(scope, {"steps": {}, "files": {}})
+            if record["steps"].get(step) != fingerprint:
+                return False
+            files = dict(record["files"].get(step, {}))
+
+        for path, digest in files.items():
+            try:
+                if get_file_digest(path) != digest:
+                    return False
+            except FileNotFoundError:
+                return False
+
+        return True
+
+    def mark_done(self, scope: str, step: str, fingerprint, files=()) -> None:
+        """Record a completed step, with the files it wrote, and save the manifest."""
+
+        digests = {
+            path: get_file_digest(path) for path in files if os.path.exists(path)
+        }
+        with self._lock:
+            record = self._get_scope(scope)
+            record["steps"][step] = fingerprint
+            if digests:
+                record["files"][step] = digests
+            else:
+                record["files"].pop(step, None)
+            self._save()
+
+    def forget(self, scope: str, step: str | None = None) -> None:
+        """Forget a step, or a whole scope, and save the manifest."""
+
+        with self._lock:
+            if step is None:
+                if scope == ENVIRONMENT:
+                    self.data[ENVIRONMENT] = {"steps": {}, "files": {}}
+                else:
+                    self.data["wizards"].pop(scope, None)
+            else:
+                record = self._get_scope(scope)
+                record["steps"].pop(step, None)
+                record["files"].pop(step, None)
+            self._save()
+
+    def set_info(self, key: str, value) -> None:
+        """Store additional information about the installation."""
+
+        with self._lock:
+            self.data[key] = value
+            self._save()
+
+    def get_info(self, key: str, default=None):
+        return self.data.get(key, default)
+
+    def get_wizards(self) -> list[str]:
+        return list(self.data["wizards"])
+
+    def _save(self) -> None:
+        manifest_file = get_manifest_file(self.prefix)
+        os.makedirs(os.path.dirname(manifest_file), exist_ok=True)
+        self.data["updated"] = time.time()
+        tmp_file = f"{manifest_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_file, manifest_file)
+
+
+def find_recorded_envs(conda_base: str, wizard_names: list[str]) -> list[str]:
+    """Get the names of the environments in which any of the wizards were installed."""
+
+    env_names = []
+    for prefix in list_env_prefixes(conda_base):
+        if not os.path.exists(get_manifest_file(prefix)):
+            continue
+
+        manifest = InstallManifest.load(prefix)
+        if set(wizard_names).intersection(manifest.get_wizards()):
+            env_name = manifest.get_info("env_name") or os.path.basename(prefix)
+            if env_name not in env_names:
+                env_names.append(env_name)
+
+    return env_names
@@ -0,0 +1,500 @@
+import os
+import glob
+import json
+
+from pymol_wizard_installer import openvr_cache, wheel_cache
+from pymol_wizard_installer.cache import get_file_digest, get_tree_digest
+from pymol_wizard_installer.env_discovery import find_env_prefix
+from pymol_wizard_installer.env_files import (
+    get_env_file_digest,
+    get_merged_env_file,
+    merge_envs,
+)
+from pymol_wizard_installer.env_lock import get_lock_file, is_lock_up_to_date
+from pymol_wizard_installer.env_templates import EnvTemplate
+from pymol_wizard_installer.install_manifest import ENVIRONMENT, InstallManifest
+from pymol_wizard_installer.installation import (
+    check_can_clone,
+    check_compatibility,
+    is_env_up_to_date,
+    parse_manifest,
+)
+from pymol_wizard_installer.installer import get_installer
+from pymol_wizard_installer.menu_patcher import EXTERNAL_GUI, INTERNAL_GUI, read_entries
+from pymol_wizard_installer.package_manager import (
+    get_package_manager,
+    set_package_manager,
+)
+from pymol_wizard_installer.prompts import get_preset_answer, load_answers, set_answers
+from pymol_wizard_installer.step_timings import get_estimate, load_timings
+from pymol_wizard_installer.wizard_registry import resolve_wizards
+
+
+class PlannedStep:
+    """A step of the installation, whether it would run and how long it would take.
+
+    The estimate adds up the median durations recorded on this host for each
+    of the timing keys, and is None if any of them was never recorded.
+    """
+
+    name: str
+    run: bool
+    reason: str
+    timing_keys: list[str]
+    estimate: float | None
+
+    def __init__(self, name, run, reason, timing_keys=(), timings=None):
+        self.name = name
+        self.run = run
+        self.reason = reason
+        self.timing_keys = list(timing_keys) if run else []
+        estimates = [get_estimate(timings or {}, key) for key in self.timing_keys]
+        self.estimate = None if None in estimates else sum(estimates)
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "action": "run" if self.run else "skip",
+            "reason": self.reason,
+            "timing_keys": self.timing_keys,
+            "estimate": self.estimate,
+        }
+
+
+class InstallPlan:
+    """The steps an installation would run or skip, found without changing anything."""
+
+    wizards: list[str]
+    env_name: str
+    prefix: str | None
+    steps: list[PlannedStep]
+
+    def __init__(self, wizards, env_name, prefix, timings):
+        self.wizards = wizards
+        self.env_name = env_name
+        self.prefix = prefix
+        self.steps = []
+        self._timings = timings
+
+    def add(self, name, run, reason, timing_keys=()):
+        self.steps.append(PlannedStep(name, run, reason, timing_keys, self._timings))
+
+    def get_estimate(self) -> tuple[float, int]:
+        """Get the estimated duration of the steps that would run, and how many have no estimate."""
+
+        running = [step for step in self.steps if step.run]
+        unknown = sum(step.estimate is None for step in running)
+        return sum(step.estimate or 0 for step in running), unknown
+
+    def as_dict(self) -> dict:
+        total, unknown = self.get_estimate()
+        return {
+            "wizards": self.wizards,
+            "env_name": self.env_name,
+            "prefix": self.prefix,
+            "steps": [step.as_dict() for step in self.steps],
+            "estimate": total,
+            "steps_without_estimate": unknown,
+        }
+
+    def format(self) -> str:
+        lines = [
+            f"Installation plan for {', '.join(self.wizards)} in environment {self.env_name}:",
+            "",
+            f"  {'Step':<22} {'Action':<6} {'Estimate':>9}  Reason",
+        ]
+        for step in self.steps:
+            estimate = "" if not step.run else format_duration(step.estimate)
+            lines.append(
+                f"  {step.name:<22} {'run' if step.run else 'skip':<6} {estimate:>9}  {step.reason}"
+            )
+
+        total, unknown = self.get_estimate()
+        summary = f"\nEstimated time: {format_duration(total)}"
+        if unknown:
+            summary += f", plus {unknown} step(s) never timed on this host"
+        lines.append(summary + ".")
+        return "\n".join(lines)
+
+
+def format_duration(seconds: float | None) -> str:
+    if seconds is None:
+        return "?"
+    if seconds < 60:
+        return f"{seconds:.1f} s"
+    minutes, seconds = divmod(round(seconds), 60)
+    return f"{minutes}m {seconds:02d}s"
+
+
+def get_manifest(prefix: str | None) -> InstallManifest:
+    """Load the manifest of an environment that is kept, or an empty one for a new environment."""
+
+    if prefix is None:
+        return InstallManifest(
+            None, {ENVIRONMENT: {"steps": {}, "files": {}}, "wizards": {}}
+        )
+    return InstallManifest.load(prefix)
+
+
+def get_planned_env_file(wizard_roots):
+    """Get the environment file the installation would use, and its contents if it is merged.
+
+    Unlike installation.get_env_file(), the merged file is not written.
+    """
+
+    env_files = [get_installer().get_env_file(root) for root in wizard_roots]
+    if len(env_files) == 1:
+        return env_files[0], None
+
+    merged = merge_envs(env_files)
+    return get_merged_env_file(merged), merged
+
+
+def plan_environment(plan, args, env_file, env, prefix, conda_base_path, template):
+    """Plan the creation or update of the environment, returning whether its prefix is kept.
+
+    env holds the contents of env_file if the file is yet to be written.
+    """
+
+    # Existing environments are assumed to be used, unless preset otherwise
+    replaced = ""
+    if prefix is not None:
+        if get_preset_answer("existing_env", "u") == "o":
+            replaced = "overwritten, "
+        elif args.force_env_update:
+            plan.add("environment", True, "exists, update forced", ["env-update"])
+            return True
+        elif not is_env_up_to_date(plan.env_name, env_file, conda_base_path, env):
+            plan.add(
+                "environment",
+                True,
+                "exists but its environment file changed since the last update",
+                ["env-update"],
+            )
+            return True
+        else:
+            plan.add(
+                "environment", False, "exists and its environment file is unchanged"
+            )
+            return True
+
+    if template is not None:
+        reason = (
+            "a rebuild was requested"
+            if args.rebuild_template
+            else template.get_stale_reason(conda_base_path)
+        )
+        if reason is None:
+            plan.add("template", False, f"template {template.name} is up to date")
+        else:
+            plan.add("template", True, f"{template.name}: {reason}", ["template-build"])
+        plan.add(
+            "environment",
+            True,
+            f"{replaced}cloned from template {template.name}",
+            ["env-clone"],
+        )
+        return False
+
+    lock_file = get_lock_file(env_file)
+    if os.path.exists(lock_file) and is_lock_up_to_date(env_file, lock_file, env):
+        plan.add(
+            "environment",
+            True,
+            f"{replaced}created from the lock {os.path.basename(lock_file)}",
+            ["env-create-lock"],
+        )
+    else:
+        plan.add(
+            "environment",
+            True,
+            f"{replaced}created by solving the environment file",
+            ["env-create"],
+        )
+    return False
+
+
+def plan_pymol(plan, prefix, pymol_dir, pymol_version, from_template):
+    """Plan the OpenVR and PyMOL builds."""
+
+    names = ["openvr", "fetch-pymol", "pymol"]
+    if from_template:
+        for name in names:
+            plan.add(name, False, "PyMOL is preinstalled in the template")
+        return
+    # Unlike the installation, PyMOL is not imported to look for it
+    if prefix is not None and os.path.exists(os.path.join(pymol_dir, "__init__.py")):
+        for name in names:
+            plan.add(name, False, "PyMOL is already installed")
+        return
+    if get_preset_answer("install_pymol", "y") != "y":
+        for name in names:
+            plan.add(name, False, "PyMOL installation declined")
+        return
+
+    clone_dir_path = os.path.join(".", "tmp")
+    use_openvr = get_preset_answer("openvr", "y") == "y"
+    if not use_openvr:
+        plan.add("openvr", False, "OpenVR support declined")
+    else:
+        headers = prefix is not None and glob.glob(
+            os.path.join(prefix, "include", "openvr*.h")
+        )
+        note = ", headers already in the prefix" if headers else ""
+        if openvr_cache.is_cached(get_installer().get_openvr_key()):
+            plan.add(
+                "openvr",
+                True,
+                f"installed from the cached build{note}",
+                ["openvr-install"],
+            )
+        else:
+            keys = ["openvr-build", "openvr-install"]
+            if os.path.isdir(os.path.join(clone_dir_path, "openvr")):
+                reason = f"built from the checkout in {clone_dir_path}{note}"
+            else:
+                keys.insert(0, "openvr-clone")
+                reason = f"cloned and built{note}"
+            plan.add("openvr", True, reason, keys)
+
+    # The wheel's ABI is only known by probing the environment, so any
+    # compatible wheel is assumed to be the one that will be reused
+    if wheel_cache.find_compatible_entries(pymol_version, use_openvr):
+        plan.add("fetch-pymol", False, "a build of this version is cached")
+        plan.add("pymol", True, "installed from the cached wheel", ["pymol-install"])
+        return
+
+    if os.path.isdir(os.path.join(clone_dir_path, "pymol-open-source")):
+        plan.add("fetch-pymol", False, f"the checkout in {clone_dir_path} is reused")
+    else:
+        plan.add("fetch-pymol", True, f"cloned into {clone_dir_path}", ["pymol-clone"])
+    plan.add("pymol", True, "built from source", ["pymol-build", "pymol-install"])
+
+
+def plan_wizard_steps(plan, manifest, wizards, kind):
+    """Plan the pre or post installation scripts of the wizards."""
+
+    for wizard_root, wizard_metadata in wizards:
+        script = getattr(wizard_metadata, f"{kind}_script")
+        name = f"{kind}-script {wizard_metadata.name}"
+        if not script:
+            continue
+        fingerprint = get_file_digest(os.path.join(wizard_root, script))
+        if manifest.is_done(wizard_metadata.name, f"{kind}-script", fingerprint):
+            plan.add(name, False, "the script is unchanged")
+        else:
+            plan.add(name, True, "the script changed or never ran", [name])
+
+
+def plan_packages(plan, manifest, wizards, link):
+    if link:
+        outdated = [
+            wizard_metadata.name
+            for wizard_root, wizard_metadata in wizards
+            if os.path.exists(os.path.join(wizard_root, "pyproject.toml"))
+            and not manifest.is_done(
+                wizard_metadata.name,
+                "package",
+                {
+                    "editable": wizard_root,
+                    "pyproject": get_file_digest(
+                        os.path.join(wizard_root, "pyproject.toml")
+                    ),
+                },
+            )
+        ]
+        key = "editable-packages"
+    else:
+        outdated = [
+            wizard_metadata.name
+            for wizard_root, wizard_metadata in wizards
+            if not manifest.is_done(
+                wizard_metadata.name, "package", get_tree_digest(wizard_root)
+            )
+        ]
+        key = "packages"
+
+    if outdated:
+        plan.add("packages", True, f"changed: {', '.join(outdated)}", [key])
+    else:
+        plan.add("packages", False, "the wizard packages are unchanged")
+
+
+def plan_wizard_files(plan, manifest, installed_wizard_dir, wizards, link):
+    outdated = []
+    for wizard_root, wizard_metadata in wizards:
+        source = os.path.join(wizard_root, f"{wizard_metadata.name}.py")
+        if link:
+            destination = os.path.join(
+                installed_wizard_dir, f"{wizard_metadata.name}.py"
+            )
+            done = os.path.islink(destination) and os.path.realpath(
+                destination
+            ) == os.path.realpath(source)
+        else:
+            done = manifest.is_done(
+                wizard_metadata.name, "wizard-file", get_file_digest(source)
+            )
+        if not done:
+            outdated.append(wizard_metadata.name)
+
+    if outdated:
+        # Links are not timed, they take no time
+        keys = [] if link else ["wizard-file"] * len(outdated)
+        plan.add("wizard-files", True, f"changed: {', '.join(outdated)}", keys)
+    else:
+        plan.add("wizard-files", False, "the wizard files are unchanged")
+
+
+def plan_menu_entries(plan, manifest, menu_file, menu_format, wizards, step, name):
+    outdated = [
+        wizard_metadata
+        for _, wizard_metadata in wizards
+        if not manifest.is_done(wizard_metadata.name, step, wizard_metadata.menu_entry)
+    ]
+    if not outdated:
+        plan.add(name, False, "the menu entries are recorded")
+        return
+
+    entries = {}
+    # A new environment has no PyMOL yet, hence no menu to read
+    if manifest.prefix is not None and os.path.exists(menu_file):
+        entries = read_entries(menu_file, menu_format)
+    missing = [
+        wizard_metadata.name
+        for wizard_metadata in outdated
+        if entries.get(wizard_metadata.name) != wizard_metadata.menu_entry
+    ]
+    if missing:
+        reason = f"missing: {', '.join(missing)}"
+    else:
+        reason = "the entries are present, only their record is updated"
+    plan.add(name, True, reason, [step])
+
+
+def make_plan(args) -> InstallPlan:
+    """Find the steps an installation with the given arguments would run, without running them.
+
+    Prompts are assumed to get their preset answer, or else their default.
+    Nothing is written, not even to the installer's cache.
+    """
+
+    set_package_manager(args.package_manager)
+    if args.answers:
+        set_answers(load_answers(args.answers))
+
+    wizard_roots = list(args.wizard_roots)
+    if args.manifest:
+        wizard_roots.extend(parse_manifest(args.manifest))
+    wizards = resolve_wizards(wizard_roots, args.wizards_dir, update_index=False)
+    wizards_metadata = [wizard_metadata for _, wizard_metadata in wizards]
+    check_compatibility(wizards_metadata)
+
+    current_env = os.environ.get("CONDA_DEFAULT_ENV")
+    if current_env is None:
+        print("Could not detect conda environment. Is conda installed?")
+        exit(1)
+    conda_base_path = get_package_manager().get_base()
+    if conda_base_path is None:
+        print("Failed to retrieve conda base path.")
+        exit(1)
+
+    target_env = args.env_name or current_env
+    if (
+        not args.env_name
+        and not (args.fast or args.link)
+        and get_preset_answer("create_new_env", "y") == "y"
+    ):
+        target_env = get_preset_answer("env_name", wizards_metadata[0].default_env)
+
+    prefix = find_env_prefix(target_env, conda_base_path)
+    plan = InstallPlan(
+        [wizard_metadata.name for wizard_metadata in wizards_metadata],
+        target_env,
+        prefix,
+        load_timings(),
+    )
+
+    from_template = False
+    if args.fast or args.link:
+        if prefix is None:
+            print(f"Environment {target_env} does not exist.")
+            exit(1)
+    elif target_env == current_env:
+        plan.add("environment", False, "the current environment is used")
+    else:
+        env_file, env = get_planned_env_file(
+            [wizard_root for wizard_root, _ in wizards]
+        )
+        template = None
+        if args.template or args.rebuild_template:
+            check_can_clone()
+            template = EnvTemplate(
+                wizards_metadata[0].python_version,
+                wizards_metadata[0].pymol_version,
+                get_preset_answer("openvr", "y") == "y",
+                get_env_file_digest(env_file, env),
+            )
+        if not plan_environment(
+            plan, args, env_file, env, prefix, conda_base_path, template
+        ):
+            prefix = None
+            from_template = template is not None
+
+    manifest = get_manifest(prefix)
+    pymol_dir = get_installer().get_pymol_dir(
+        prefix or "", wizards_metadata[0].python_version
+    )
+    installed_wizard_dir = os.path.join(pymol_dir, "wizard")
+    if not (args.fast or args.link):
+        plan_pymol(
+            plan,
+            prefix,
+            pymol_dir,
+            wizards_metadata[0].pymol_version,
+            from_template,
+        )
+        plan_wizard_steps(plan, manifest, wizards, "pre")
+
+    plan_packages(plan, manifest, wizards, args.link)
+    plan_wizard_files(plan, manifest, installed_wizard_dir, wizards, args.link)
+    if not (args.fast or args.link):
+        plan_menu_entries(
+            plan,
+            manifest,
+            os.path.join(pymol_dir, "_gui.py"),
+            EXTERNAL_GUI,
+            wizards,
+            "external-gui-entry",
+            "external-gui-entries",
+        )
+        plan_menu_entries(
+            plan,
+            manifest,
+            os.path.join(installed_wizard_dir, "openvr.py"),
+            INTERNAL_GUI,
+            wizards,
+            "internal-gui-entry",
+            "internal-gui-entries",
+        )
+        plan_wizard_steps(plan, manifest, wizards, "post")
+
+    return plan
+
+
+def print_plan(args) -> None:
+    """Print the plan of an installation, and write it as JSON to the --plan-json file.
+
+    With `--plan-json -` only the JSON is printed, to stdout.
+    """
+
+    plan = make_plan(args)
+    if args.plan_json == "-":
+        print(json.dumps(plan.as_dict(), indent=2))
+        return
+
+    print(plan.format())
+    if args.plan_json:
+        with open(args.plan_json, "w") as f:
+            json.dump(plan.as_dict(), f, indent=2)
+        print(f"Plan written to {args.plan_json}.")
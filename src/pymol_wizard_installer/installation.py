@@ -0,0 +1,857 @@
+import os
+from pathlib import Path
+import subprocess
+import shutil
+import stat
+import yaml
+from contextlib import ExitStack
+
+from pymol_wizard_installer import wizard_wheelhouse
+from pymol_wizard_installer.wizard_metadata import WizardMetadata
+from pymol_wizard_installer.env_runner import run_in_env, set_direct_exec
+from pymol_wizard_installer.scheduler import Step, run_steps
+from pymol_wizard_installer.build_jobs import set_build_jobs
+from pymol_wizard_installer.process_runner import process_step, set_step_timeout
+from pymol_wizard_installer.profiling import enable_profiling, span
+from pymol_wizard_installer.step_timings import timed
+from pymol_wizard_installer.env_files import (
+    get_env_file_digest,
+    get_env_fingerprint,
+    merge_env_files,
+)
+from pymol_wizard_installer.env_lock import create_env_from_lock, find_lock, write_lock
+from pymol_wizard_installer.env_templates import EnvTemplate
+from pymol_wizard_installer.package_manager import (
+    get_package_manager,
+    set_package_manager,
+)
+from pymol_wizard_installer.menu_patcher import EXTERNAL_GUI, INTERNAL_GUI, patch_menu
+from pymol_wizard_installer.cache import get_file_digest, get_tree_digest
+from pymol_wizard_installer.install_manifest import ENVIRONMENT, InstallManifest
+from pymol_wizard_installer.env_discovery import env_exists, find_env_prefix
+from pymol_wizard_installer.file_locks import environment_lock
+from pymol_wizard_installer.installer import get_installer
+from pymol_wizard_installer.wizard_registry import resolve_wizards
+from pymol_wizard_installer.prompts import (
+    get_answer,
+    get_preset_answer,
+    load_answers,
+    set_answers,
+)
+
+
+def check_can_clone():
+    """Exit if the package manager cannot clone template environments."""
+
+    package_manager = get_package_manager()
+    if not package_manager.can_clone:
+        print(
+            f"{package_manager.name} cannot clone environments, so templates cannot be used. Run without --template, or use another package manager."
+        )
+        exit(1)
+
+
+def create_new_env(env_name, env_file, conda_base_path=None, template=None):
+    """Create a conda environment by cloning a template, from its lock if there is an up-to-date one, or else from the environment file."""
+
+    if template is not None:
+        # The template must not be rebuilt by another process while cloning it
+        with environment_lock(template.name, conda_base_path):
+            build_template(template, env_file, conda_base_path)
+            print(f"Cloning template environment {template.name}...")
+            with timed("env-clone"):
+                template.clone(env_name, env_file, conda_base_path)
+        return
+
+    lock_file = find_lock(env_file)
+    if lock_file is not None:
+        print(f"Creating the environment from {lock_file}...")
+        with timed("env-create-lock"):
+            create_env_from_lock(env_name, env_file, lock_file)
+        return
+
+    with timed("env-create"):
+        get_package_manager().create(env_name, env_file)
+    write_lock(env_file, env_name=env_name)
+
+
+def build_template(template, env_file, conda_base_path):
+    """Build a template environment with Python, PyMOL and OpenVR, unless it is up to date."""
+
+    reason = template.get_stale_reason(conda_base_path)
+    if reason is None:
+        return
+
+    print(f"Building template environment {template.name}, since {reason}...")
+    if env_exists(template.name, conda_base_path):
+        template.remove()
+
+    with timed("template-build"):
+        create_new_env(template.name, env_file)
+        record_env_file(template.name, env_file, conda_base_path)
+
+        installer = get_installer()
+        prefix = find_env_prefix(template.name, conda_base_path)
+        clone_dir_path = os.path.join(".", "tmp")
+        Path(clone_dir_path).mkdir(parents=True, exist_ok=True)
+        if template.use_openvr:
+            installer.install_openvr(clone_dir_path, prefix, template.name)
+        installer.install_pymol(
+            clone_dir_path, template.pymol_version, template.name, template.use_openvr
+        )
+
+    InstallManifest.load(prefix).set_info(
+        "pymol", {"version": template.pymol_version, "openvr": template.use_openvr}
+    )
+    template.mark_built(conda_base_path)
+
+
+def overwrite_env(env_name, env_file, current_env, conda_base_path=None, template=None):
+    """Overwrite an existing conda environment."""
+
+    print(f"Overwriting existing environment {env_name}.")
+    if env_name == current_env:
+        print(
+            "Cannot overwrite an active environment. Please deactivate it before retrying."
+        )
+        exit(1)
+    try:
+        get_package_manager().remove(env_name)
+
+        create_new_env(env_name, env_file, conda_base_path, template)
+    except subprocess.CalledProcessError as e:
+        print(f"Something went wrong while overwriting the environment: {e}")
+        exit(1)
+
+
+def get_conda_history(prefix):
+    """Get the file in which conda logs every transaction on the environment."""
+
+    return os.path.join(prefix, "conda-meta", "history")
+
+
+def record_env_file(env_name, env_file, conda_base_path):
+    """Record the environment file the environment was last solved from.
+
+    The conda history is recorded too, so that any later change made to the
+    environment outside of the installer invalidates the record.
+    """
+
+    prefix = find_env_prefix(env_name, conda_base_path)
+    if prefix is not None:
+        InstallManifest.load(prefix).mark_done(
+            ENVIRONMENT,
+            "env",
+            get_env_fingerprint(env_file, conda_base_path),
+            files=[get_conda_history(prefix)],
+        )
+
+
+def is_env_up_to_date(env_name, env_file, conda_base_path, env=None):
+    """Check if the environment was solved from an equivalent environment file and left untouched since."""
+
+    prefix = find_env_prefix(env_name, conda_base_path)
+    if prefix is None or not os.path.isfile(get_conda_history(prefix)):
+        return False
+
+    return InstallManifest.load(prefix).is_done(
+        ENVIRONMENT, "env", get_env_fingerprint(env_file, conda_base_path, env)
+    )
+
+
+def reuse_env(env_name, env_file, conda_base_path, force_update=False):
+    """Reuse existing conda environment."""
+
+    print(f"Using existing environment {env_name}.")
+    if not force_update and is_env_up_to_date(env_name, env_file, conda_base_path):
+        print("The environment file is unchanged, skipping the update...")
+        return
+
+    with timed("env-update"):
+        get_package_manager().update(env_name, env_file)
+    record_env_file(env_name, env_file, conda_base_path)
+
+
+def create_env(
+    env_name,
+    env_file,
+    current_env,
+    conda_base_path,
+    answer="",
+    force_update=False,
+    template=None,
+):
+    """Create a conda environment."""
+
+    if env_exists(env_name, conda_base_path):
+        while answer not in ["o", "u", "a"]:
+            answer = get_answer(
+                f"Environment {env_name} already exists. Do you wish to overwrite it, use it or abort? (o/u/A)\n",
+                "a",
+                "existing_env",
+            )
+
+        if answer == "o":
+            overwrite_env(env_name, env_file, current_env, conda_base_path, template)
+            record_env_file(env_name, env_file, conda_base_path)
+        elif answer == "u":
+            reuse_env(env_name, env_file, conda_base_path, force_update)
+        elif answer == "a":
+            print("Aborted by user.")
+            exit(0)
+        else:
+            print(
+                "Invalid input. Please enter 'o' (overwrite), 'u' (use) or 'a' (abort)."
+            )
+    else:
+        print(f"Creating new environment {env_name}.")
+        create_new_env(env_name, env_file, conda_base_path, template)
+        record_env_file(env_name, env_file, conda_base_path)
+
+
+def is_pymol_installed(env_name: str) -> bool:
+    """Check if PyMOL is installed in the conda environment."""
+
+    try:
+        run_in_env(
+            env_name,
+            ["python", "-c", "import pymol"],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        return True
+    except subprocess.CalledProcessError:
+        return False
+
+
+def run_aux_script(script_path, wizard_root, conda_env):
+    """Run a pre/post installation script."""
+
+    try:
+        with span(os.path.basename(script_path), "script"):
+            run_in_env(
+                conda_env,
+                ["python", script_path, wizard_root, conda_env],
+                check=True,
+                interactive=True,
+            )
+    except subprocess.CalledProcessError as e:
+        print(f"Failed to run auxiliary installation script: {e}")
+        exit(1)
+
+
+def install_package(conda_env: str, wizards, source_digests=None):
+    """Install the wizard packages in the conda environment from the wheelhouse."""
+
+    print(f"Installing package in the {conda_env} environment...")
+    source_digests = source_digests or {}
+    try:
+        wheels = [
+            wizard_wheelhouse.get_wheel(
+                conda_env,
+                wizard_root,
+                wizard_metadata.python_version,
+                source_digests.get(wizard_root),
+            )
+            for wizard_root, wizard_metadata in wizards
+        ]
+        wizard_wheelhouse.install_wheels(conda_env, wheels)
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        print(f"Failed to install package: {e}")
+        exit(1)
+
+
+def copy_files(installed_wizard_dir: str, wizard_root: str, wizard_name: str):
+    """Copy the wizard files to the PyMOL installation directory."""
+
+    print(f"Copying the {wizard_name} wizard to {installed_wizard_dir}...")
+    destination = os.path.join(installed_wizard_dir, f"{wizard_name}.py")
+    try:
+        # Replace links left by --link instead of writing through them
+        with span(f"copy {wizard_name}.py", "files"):
+            if os.path.islink(destination) or is_hardlink(destination):
+                os.remove(destination)
+            shutil.copy(os.path.join(wizard_root, f"{wizard_name}.py"), destination)
+    except shutil.Error as e:
+        print(f"Failed to copy files: {e}")
+        exit(1)
+
+
+def is_hardlink(path: str) -> bool:
+    try:
+        return os.lstat(path).st_nlink > 1
+    except FileNotFoundError:
+        return False
+
+
+def link_file(source: str, destination: str) -> str:
+    """Link a file into place, with a symlink if possible or else a hardlink.
+
+    Returns the kind of link that was created.
+    """
+
+    if os.path.lexists(destination):
+        os.remove(destination)
+
+    try:
+        os.symlink(source, destination)
+        return "symlink"
+    except (OSError, NotImplementedError):
+        # Creating symlinks requires privileges on Windows
+        os.link(source, destination)
+        return "hardlink"
+
+
+def add_external_gui_entries(pymol_dir: str, wizards_metadata: list[WizardMetadata]):
+    """Add the wizards' entries to the external GUI's Wizard menu."""
+
+    print("Adding external GUI entries...")
+    patch_menu(
+        os.path.join(pymol_dir, "_gui.py"),
+        EXTERNAL_GUI,
+        add=[(metadata.menu_entry, metadata.name) for metadata in wizards_metadata],
+    )
+
+
+def add_internal_gui_entries(
+    installed_wizard_dir: str, wizards_metadata: list[WizardMetadata]
+):
+    """Add the wizards' entries to the internal GUI's Wizard menu."""
+
+    print("Adding internal GUI entries...")
+    patch_menu(
+        os.path.join(installed_wizard_dir, "openvr.py"),
+        INTERNAL_GUI,
+        add=[(metadata.menu_entry, metadata.name) for metadata in wizards_metadata],
+    )
+
+
+def parse_manifest(manifest_file):
+    """Parse a manifest file listing wizard root directories.
+
+    The manifest is a YAML list of paths, or a mapping with a `wizards` list.
+    Relative paths are resolved against the manifest's directory.
+    """
+
+    try:
+        with open(manifest_file, "r") as f:
+            manifest = yaml.safe_load(f) or []
+    except yaml.YAMLError as e:
+        print(f"{manifest_file} is not valid YAML: {e}")
+        exit(1)
+
+    if isinstance(manifest, dict):
+        manifest = manifest.get("wizards") or []
+
+    if not isinstance(manifest, list) or not all(
+        isinstance(root, str) for root in manifest
+    ):
+        print(f"{manifest_file} must contain a list of wizard paths.")
+        exit(1)
+
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_file))
+    return [os.path.join(manifest_dir, os.path.expanduser(root)) for root in manifest]
+
+
+def check_compatibility(wizards_metadata: list[WizardMetadata]):
+    """Make sure that the wizards can be installed in the same environment."""
+
+    for attribute in ["python_version", "pymol_version"]:
+        versions = {}
+        for wizard_metadata in wizards_metadata:
+            versions.setdefault(str(getattr(wizard_metadata, attribute)), []).append(
+                wizard_metadata.name
+            )
+
+        if len(versions) > 1:
+            conflicts = "; ".join(
+                f"{version} ({', '.join(names)})" for version, names in versions.items()
+            )
+            print(f"The wizards require conflicting values of {attribute}: {conflicts}")
+            exit(1)
+
+
+def get_env_file(wizard_roots: list[str]) -> str:
+    """Get the environment file for the wizards, merging them if needed."""
+
+    return merge_env_files(
+        [get_installer().get_env_file(root) for root in wizard_roots]
+    )
+
+
+def run_aux_scripts(manifest, target_env, wizards, kind):
+    """Run the wizards' pre or post installation scripts that changed since the last run."""
+
+    for wizard_root, wizard_metadata in wizards:
+        script = getattr(wizard_metadata, f"{kind}_script")
+        if not script:
+            continue
+
+        script_path = os.path.join(wizard_root, script)
+        fingerprint = get_file_digest(script_path)
+        if manifest.is_done(wizard_metadata.name, f"{kind}-script", fingerprint):
+            print(
+                f"The {kind}-installation script of the {wizard_metadata.name} wizard is unchanged, skipping..."
+            )
+            continue
+
+        print(
+            f"Running {kind}-installation script for the {wizard_metadata.name} wizard..."
+        )
+        with timed(f"{kind}-script {wizard_metadata.name}"):
+            run_aux_script(script_path, wizard_root, target_env)
+        manifest.mark_done(wizard_metadata.name, f"{kind}-script", fingerprint)
+
+
+def install_packages(manifest, target_env, wizards):
+    """Install the packages of the wizards whose sources changed since the last run."""
+
+    fingerprints = {
+        wizard_root: get_tree_digest(wizard_root) for wizard_root, _ in wizards
+    }
+    outdated = [
+        (wizard_root, wizard_metadata)
+        for wizard_root, wizard_metadata in wizards
+        if not manifest.is_done(
+            wizard_metadata.name, "package", fingerprints[wizard_root]
+        )
+    ]
+    if not outdated:
+        print("The wizard packages are unchanged, skipping...")
+        return
+
+    with timed("packages"):
+        install_package(target_env, outdated, fingerprints)
+    for wizard_root, wizard_metadata in outdated:
+        manifest.mark_done(wizard_metadata.name, "package", fingerprints[wizard_root])
+
+
+def copy_wizard_files(manifest, installed_wizard_dir, wizards):
+    """Copy the wizard files that changed since the last run."""
+
+    for wizard_root, wizard_metadata in wizards:
+        source = os.path.join(wizard_root, f"{wizard_metadata.name}.py")
+        fingerprint = get_file_digest(source)
+        if manifest.is_done(wizard_metadata.name, "wizard-file", fingerprint):
+            print(f"The {wizard_metadata.name} wizard file is unchanged, skipping...")
+            continue
+
+        with timed("wizard-file"):
+            copy_files(installed_wizard_dir, wizard_root, wizard_metadata.name)
+        manifest.mark_done(
+            wizard_metadata.name,
+            "wizard-file",
+            fingerprint,
+            [os.path.join(installed_wizard_dir, f"{wizard_metadata.name}.py")],
+        )
+
+
+def add_menu_entries(manifest, menu_file, wizards, add_entries, step):
+    """Add the menu entries that are not already recorded in the menu file."""
+
+    outdated = [
+        wizard_metadata
+        for _, wizard_metadata in wizards
+        if not manifest.is_done(wizard_metadata.name, step, wizard_metadata.menu_entry)
+    ]
+    if not outdated:
+        print(f"The menu entries in {menu_file} are unchanged, skipping...")
+        return
+
+    with timed(step):
+        add_entries(os.path.dirname(menu_file), outdated)
+    for wizard_metadata in outdated:
+        manifest.mark_done(
+            wizard_metadata.name, step, wizard_metadata.menu_entry, [menu_file]
+        )
+
+
+def install_editable_packages(manifest, target_env, wizards):
+    """Install the wizard packages in editable mode, unless they already are."""
+
+    fingerprints = {}
+    for wizard_root, _ in wizards:
+        pyproject = os.path.join(wizard_root, "pyproject.toml")
+        if os.path.exists(pyproject):
+            fingerprints[wizard_root] = {
+                "editable": wizard_root,
+                "pyproject": get_file_digest(pyproject),
+            }
+
+    outdated = [
+        (wizard_root, wizard_metadata)
+        for wizard_root, wizard_metadata in wizards
+        if wizard_root in fingerprints
+        and not manifest.is_done(
+            wizard_metadata.name, "package", fingerprints[wizard_root]
+        )
+    ]
+    if not outdated:
+        print("The wizard packages are already installed in editable mode, skipping...")
+        return
+
+    print(f"Installing packages in editable mode in the {target_env} environment...")
+    editable_args = []
+    for wizard_root, _ in outdated:
+        editable_args.extend(["--editable", wizard_root])
+    try:
+        with timed("editable-packages"):
+            run_in_env(target_env, ["pip", "install", *editable_args], check=True)
+    except subprocess.CalledProcessError as e:
+        print(f"Failed to install package: {e}")
+        exit(1)
+
+    for wizard_root, wizard_metadata in outdated:
+        manifest.mark_done(wizard_metadata.name, "package", fingerprints[wizard_root])
+
+
+def link_wizard_files(manifest, installed_wizard_dir, wizards):
+    """Link the wizard files into the PyMOL installation, so that edits are picked up live."""
+
+    for wizard_root, wizard_metadata in wizards:
+        source = os.path.join(wizard_root, f"{wizard_metadata.name}.py")
+        destination = os.path.join(installed_wizard_dir, f"{wizard_metadata.name}.py")
+        if os.path.islink(destination) and os.path.realpath(
+            destination
+        ) == os.path.realpath(source):
+            print(
+                f"The {wizard_metadata.name} wizard file is already linked, skipping..."
+            )
+            continue
+
+        kind = link_file(source, destination)
+        print(f"Linked the {wizard_metadata.name} wizard to {destination} ({kind}).")
+        if kind == "hardlink":
+            print(
+                "Editors that save by replacing the file break hardlinks: run with --link again if the changes are not picked up."
+            )
+
+        # The linked file changes with the sources, so its digest is not recorded
+        manifest.mark_done(wizard_metadata.name, "wizard-file", {"link": source})
+
+
+def link_installation(target_env, prefix, wizards):
+    print("Link installation mode enabled.")
+    manifest = InstallManifest.load(prefix)
+    manifest.set_info("env_name", target_env)
+    install_editable_packages(manifest, target_env, wizards)
+
+    pymol_dir = get_installer().get_pymol_dir(prefix, wizards[0][1].python_version)
+    installed_wizard_dir = os.path.join(pymol_dir, "wizard")
+    link_wizard_files(manifest, installed_wizard_dir, wizards)
+
+
+def fast_installation(target_env, prefix, wizards):
+    print("Quick installation mode enabled.")
+    manifest = InstallManifest.load(prefix)
+    manifest.set_info("env_name", target_env)
+    install_packages(manifest, target_env, wizards)
+
+    pymol_dir = get_installer().get_pymol_dir(prefix, wizards[0][1].python_version)
+    installed_wizard_dir = os.path.join(pymol_dir, "wizard")
+    copy_wizard_files(manifest, installed_wizard_dir, wizards)
+
+
+def is_pymol_recorded(manifest, pymol_dir):
+    """Check if the manifest records a PyMOL installation that is still present."""
+
+    return manifest.get_info("pymol") is not None and os.path.exists(
+        os.path.join(pymol_dir, "__init__.py")
+    )
+
+
+def full_installation(target_env, prefix, wizards, jobs=1):
+    wizard_roots = [wizard_root for wizard_root, _ in wizards]
+    wizards_metadata = [wizard_metadata for _, wizard_metadata in wizards]
+    names = ", ".join(wizard_metadata.name for wizard_metadata in wizards_metadata)
+
+    # All the wizards share the same versions, see check_compatibility()
+    python_version = wizards_metadata[0].python_version
+    pymol_version = wizards_metadata[0].pymol_version
+
+    installer = get_installer()
+    pymol_dir = installer.get_pymol_dir(prefix, python_version)
+    installed_wizard_dir = os.path.join(pymol_dir, "wizard")
+    manifest = InstallManifest.load(prefix)
+    manifest.set_info("env_name", target_env)
+    steps = []
+
+    if is_pymol_recorded(manifest, pymol_dir) or is_pymol_installed(target_env):
+        print("PyMOL is already installed, skipping...")
+        if manifest.get_info("pymol") is None:
+            manifest.set_info("pymol", {"version": None, "openvr": None})
+    else:
+        install_pymol_ans = get_answer(
+            f"PyMOL is not installed in the {target_env} environment. Do you wish to install it? (Y/n)",
+            "y",
+            "install_pymol",
+        )
+        if install_pymol_ans == "y":
+            clone_dir_path = os.path.join(".", "tmp")
+            Path(clone_dir_path).mkdir(parents=True, exist_ok=True)
+
+            openvr_support_ans = get_answer(
+                "Do you wish to enable OpenVR support? (Y/n)", "y", "openvr"
+            )
+            use_openvr = openvr_support_ans == "y"
+            if use_openvr:
+                steps.append(
+                    Step(
+                        "openvr",
+                        lambda: installer.install_openvr(
+                            clone_dir_path, prefix, target_env
+                        ),
+                        outputs=["openvr"],
+                    )
+                )
+
+            def pymol():
+                installer.install_pymol(
+                    clone_dir_path,
+                    pymol_version,
+                    target_env,
+                    use_openvr,
+                )
+                manifest.set_info(
+                    "pymol", {"version": pymol_version, "openvr": use_openvr}
+                )
+
+            steps.append(
+                Step(
+                    "fetch-pymol",
+                    lambda: installer.fetch_pymol(
+                        clone_dir_path,
+                        pymol_version,
+                        target_env,
+                        use_openvr,
+                    ),
+                    outputs=["pymol-source"],
+                )
+            )
+            steps.append(
+                Step(
+                    "pymol",
+                    pymol,
+                    inputs=["pymol-source", "openvr"],
+                    outputs=["pymol"],
+                    locks=["site-packages"],
+                )
+            )
+
+    # The wizard files and menu entries are only added once the package is
+    # installed, so that a failed script or install leaves nothing behind
+    steps.extend(
+        [
+            Step(
+                "pre-scripts",
+                lambda: run_aux_scripts(manifest, target_env, wizards, "pre"),
+                inputs=["pymol", "openvr"],
+                outputs=["pre-scripts"],
+                locks=["site-packages"],
+            ),
+            Step(
+                "packages",
+                lambda: install_packages(manifest, target_env, wizards),
+                inputs=["pre-scripts"],
+                outputs=["packages"],
+                locks=["site-packages"],
+            ),
+            Step(
+                "wizard-files",
+                lambda: copy_wizard_files(manifest, installed_wizard_dir, wizards),
+                inputs=["packages"],
+                outputs=["wizard-files"],
+            ),
+            Step(
+                "external-gui-entries",
+                lambda: add_menu_entries(
+                    manifest,
+                    os.path.join(pymol_dir, "_gui.py"),
+                    wizards,
+                    add_external_gui_entries,
+                    "external-gui-entry",
+                ),
+                inputs=["wizard-files"],
+                outputs=["menu-entries"],
+            ),
+            Step(
+                "internal-gui-entries",
+                lambda: add_menu_entries(
+                    manifest,
+                    os.path.join(installed_wizard_dir, "openvr.py"),
+                    wizards,
+                    add_internal_gui_entries,
+                    "internal-gui-entry",
+                ),
+                inputs=["wizard-files"],
+                outputs=["menu-entries"],
+            ),
+        ]
+    )
+
+    run_steps(steps, jobs)
+
+    if len(wizards) == 1:
+        print(f"The {names} wizard has been successfully installed.")
+    else:
+        print(f"The {names} wizards have been successfully installed.")
+
+    run_aux_scripts(manifest, target_env, wizards, "post")
+
+    def remove_readonly(func, path, _):
+        """Clear the readonly bit and remove the file."""
+
+        os.chmod(path, stat.S_IWRITE)
+        func(path)
+
+    for wizard_root in wizard_roots:
+        if os.path.exists(os.path.join(wizard_root, "tmp")):
+            delete_files_ans = get_answer(
+                "Do you wish to clear the installation files? (y/N)", "n", "clear_files"
+            )
+            if delete_files_ans == "y":
+                try:
+                    shutil.rmtree(
+                        os.path.join(wizard_root, "tmp"), onerror=remove_readonly
+                    )
+                    print("Files removed.")
+                except FileNotFoundError:
+                    print("No files to remove.")
+                    pass
+            else:
+                print(
+                    f"Installation files are kept in {os.path.join(wizard_root, 'tmp')}, if you want to manually delete them."
+                )
+
+
+def install(args):
+    """Install the wizards as requested on the command line."""
+
+    if args.profile:
+        enable_profiling(args.profile)
+    set_direct_exec(args.direct)
+    set_package_manager(args.package_manager)
+    set_step_timeout(args.step_timeout)
+    set_build_jobs(args.build_jobs)
+    if args.answers:
+        set_answers(load_answers(args.answers))
+
+    wizard_roots = list(args.wizard_roots)
+    if args.manifest:
+        wizard_roots.extend(parse_manifest(args.manifest))
+
+    wizards = resolve_wizards(wizard_roots, args.wizards_dir)
+
+    wizards_metadata = [wizard_metadata for _, wizard_metadata in wizards]
+    check_compatibility(wizards_metadata)
+    names = ", ".join(wizard_metadata.name for wizard_metadata in wizards_metadata)
+    default_env = wizards_metadata[0].default_env
+
+    current_env = os.environ.get("CONDA_DEFAULT_ENV")
+    if current_env is None:
+        print("Could not detect conda environment. Is conda installed?")
+        exit(1)
+
+    with span("env-discovery", "discovery"):
+        conda_base_path = get_package_manager().get_base()
+    if conda_base_path is None:
+        print("Failed to retrieve conda base path.")
+        exit(1)
+
+    if args.env_name:
+        target_env = args.env_name
+        print(f"Using provided environment name: {target_env}.")
+    else:
+        target_env = current_env
+        print(f"Using current environment: {target_env}.")
+
+    # Held until the installation is done, so that concurrent installations
+    # into the same environment do not interleave their edits
+    locks = ExitStack()
+    if args.fast or args.link:
+        locks.enter_context(environment_lock(target_env, conda_base_path))
+        prefix = find_env_prefix(target_env, conda_base_path)
+        if prefix is None:
+            print(f"Environment {target_env} does not exist.")
+            exit(1)
+
+        if args.link:
+            link_installation(target_env, prefix, wizards)
+        else:
+            fast_installation(target_env, prefix, wizards)
+    else:
+        env_file = get_env_file([wizard_root for wizard_root, _ in wizards])
+        template = None
+        if args.template or args.rebuild_template:
+            check_can_clone()
+            use_openvr = (
+                get_answer("Do you wish to enable OpenVR support? (Y/n)", "y", "openvr")
+                == "y"
+            )
+            template = EnvTemplate(
+                wizards_metadata[0].python_version,
+                wizards_metadata[0].pymol_version,
+                use_openvr,
+                get_env_file_digest(env_file),
+            )
+            if args.rebuild_template:
+                with environment_lock(template.name, conda_base_path):
+                    if env_exists(template.name, conda_base_path):
+                        template.remove()
+
+        if target_env != current_env:
+            locks.enter_context(environment_lock(target_env, conda_base_path))
+            with span("environment", "environment", env=target_env), process_step(
+                "environment"
+            ):
+                create_env(
+                    target_env,
+                    env_file,
+                    current_env,
+                    conda_base_path,
+                    get_preset_answer("existing_env", "u"),
+                    args.force_env_update,
+                    template,
+                )
+        else:
+            create_new_env_ans = get_answer(
+                f"You are currently about to install the {names} wizard in the {current_env} environment. Do you wish to create a new conda environment instead? (Y/n)",
+                "y",
+                "create_new_env",
+            )
+
+            if create_new_env_ans == "y":
+                target_env = get_answer(
+                    f"Please enter the name of the new environment ({default_env}):",
+                    default_env,
+                    "env_name",
+                )
+
+                locks.enter_context(environment_lock(target_env, conda_base_path))
+                with span("environment", "environment", env=target_env), process_step(
+                    "environment"
+                ):
+                    create_env(
+                        target_env,
+                        env_file,
+                        current_env,
+                        conda_base_path,
+                        force_update=args.force_env_update,
+                        template=template,
+                    )
+            else:
+                locks.enter_context(environment_lock(current_env, conda_base_path))
+                print(f"Using existing environment {current_env}.")
+
+        prefix = find_env_prefix(target_env, conda_base_path)
+        if prefix is None:
+            print(f"Environment {target_env} does not exist.")
+            exit(1)
+
+        full_installation(target_env, prefix, wizards, args.jobs)
+
+    locks.close()
+    print(
+        f"Remember to activate the {target_env} conda environment before running PyMOL."
+    )
@@ -0,0 +1,18 @@
+import os
+
+
+def get_installer():
+    """Get the installer of the current platform, importing only its module."""
+
+    if os.name == "nt":
+        from pymol_wizard_installer.installer.windows_installer import (
+            WindowsInstaller,
+        )
+
+        return WindowsInstaller
+    elif os.name == "posix":
+        from pymol_wizard_installer.installer.linux_installer import LinuxInstaller
+
+        return LinuxInstaller
+    else:
+        raise RuntimeError("Unsupported operating system.")
@@ -1,64 +1,109 @@
 import os
-import subprocess
 from abc import ABC, abstractmethod
 
+from pymol_wizard_installer import git_mirror, openvr_cache, wheel_cache
+from pymol_wizard_installer.build_jobs import get_build_environ, get_build_jobs
+from pymol_wizard_installer.cache import get_key_digest
+from pymol_wizard_installer.env_runner import run_in_env
+from pymol_wizard_installer.file_locks import file_lock, path_lock
+from pymol_wizard_installer.step_timings import timed
+
+OPENVR_VERSION = "v1.0.17"
+
+DEFAULT_OPENVR_URL = "git@github.com:ValveSoftware/openvr.git"
+DEFAULT_PYMOL_URL = "git@github.com:schrodinger/pymol-open-source.git"
+
+
+def get_openvr_url() -> str:
+    """Get the OpenVR remote, overridable through PYMOL_WIZARD_INSTALLER_OPENVR_URL."""
+
+    return os.environ.get("PYMOL_WIZARD_INSTALLER_OPENVR_URL") or DEFAULT_OPENVR_URL
+
+
+def get_pymol_url() -> str:
+    """Get the PyMOL remote, overridable through PYMOL_WIZARD_INSTALLER_PYMOL_URL."""
+
+    return os.environ.get("PYMOL_WIZARD_INSTALLER_PYMOL_URL") or DEFAULT_PYMOL_URL
+
 
 class Installer(ABC):
     @staticmethod
     def clone_openvr(clone_dir: str) -> None:
         """Clone the OpenVR repository."""
 
-        if not os.path.exists(os.path.join(clone_dir, "openvr")):
-            subprocess.run(
-                [
-                    "git",
-                    "clone",
-                    "-b",
-                    "v1.0.17",
-                    "git@github.com:ValveSoftware/openvr.git",
-                    os.path.join(clone_dir, "openvr"),
-                ],
-                check=True,
-            )
+        dest = os.path.join(clone_dir, "openvr")
+        with path_lock(dest):
+            if not os.path.exists(dest):
+                with timed("openvr-clone"):
+                    git_mirror.checkout(get_openvr_url(), OPENVR_VERSION, dest)
 
     @staticmethod
     def clone_pymol(clone_dir: str, version: str) -> None:
         """Clone the PyMOL repository."""
 
-        if not os.path.exists(os.path.join(clone_dir, "pymol-open-source")):
-            subprocess.run(
-                [
-                    "git",
-                    "clone",
-                    "-b",
-                    version,
-                    "git@github.com:schrodinger/pymol-open-source.git",
-                    os.path.join(clone_dir, "pymol-open-source"),
-                ],
-                check=True,
-            )
+        dest = os.path.join(clone_dir, "pymol-open-source")
+        with path_lock(dest):
+            if not os.path.exists(dest):
+                with timed("pymol-clone"):
+                    git_mirror.checkout(get_pymol_url(), version, dest)
+
+    @staticmethod
+    def fetch_pymol(
+        clone_dir: str, version: str, env_name: str, use_openvr: bool
+    ) -> None:
+        """Clone PyMOL, unless a cached build can be installed instead."""
+
+        key = wheel_cache.get_build_key(env_name, version, use_openvr)
+        if key is None or wheel_cache.find_cached_wheel(key) is None:
+            Installer.clone_pymol(clone_dir, version)
 
     @staticmethod
     def install_pymol(
         clone_dir: str, version: str, env_name: str, use_openvr: bool
     ) -> None:
-        """Clone, build and install PyMOL."""
-
-        Installer.clone_pymol(clone_dir, version)
-        subprocess.run(
-            [
-                "conda",
-                "run",
-                "-n",
-                env_name,
-                "pip",
-                "install",
-                "--config-settings",
-                f"openvr={use_openvr}",
-                os.path.join(clone_dir, "pymol-open-source"),
-            ],
-            check=True,
-        )
+        """Build and install PyMOL, reusing a cached wheel when available.
+
+        Concurrent installations of the same build wait for the first one to
+        cache its wheel, instead of building it again in the same checkout.
+        """
+
+        key = wheel_cache.get_build_key(env_name, version, use_openvr)
+        source_dir = os.path.join(clone_dir, "pymol-open-source")
+        if key is None:
+            print(
+                "Could not fingerprint the build environment, building PyMOL without caching..."
+            )
+            Installer.clone_pymol(clone_dir, version)
+            with path_lock(source_dir), timed("pymol-build"):
+                run_in_env(
+                    env_name,
+                    [
+                        "pip",
+                        "install",
+                        "--config-settings",
+                        f"openvr={use_openvr}",
+                        "--config-settings",
+                        f"jobs={get_build_jobs()}",
+                        source_dir,
+                    ],
+                    env=get_build_environ(),
+                    check=True,
+                )
+            return
+
+        with file_lock(f"pymol-wheel {get_key_digest(key)}", "the PyMOL build"):
+            wheel = wheel_cache.find_cached_wheel(key)
+            if wheel is not None:
+                print("Using cached PyMOL build...")
+            else:
+                Installer.clone_pymol(clone_dir, version)
+                with path_lock(source_dir), timed("pymol-build"):
+                    wheel = wheel_cache.build_wheel(
+                        env_name, source_dir, use_openvr, key
+                    )
+
+        with timed("pymol-install"):
+            run_in_env(env_name, ["pip", "install", wheel], check=True)
 
     @staticmethod
     @abstractmethod
@@ -67,9 +112,35 @@ class Installer(ABC):
 
     @staticmethod
     @abstractmethod
-    def install_openvr(clone_dir: str, conda_base_path: str, env_name: str) -> None:
+    def get_openvr_key() -> dict:
         pass
 
+    @staticmethod
+    @abstractmethod
+    def build_openvr(clone_dir: str, env_name: str, install_dir: str) -> None:
+        pass
+
+    @classmethod
+    def install_openvr(cls, clone_dir: str, env_dir: str, env_name: str) -> None:
+        """Build OpenVR, or reuse a cached build, and install it in the environment."""
+
+        key = cls.get_openvr_key()
+        with file_lock(f"openvr-build {get_key_digest(key)}", "the OpenVR build"):
+            install_tree = openvr_cache.find_artifacts(key)
+            if install_tree is None:
+                Installer.clone_openvr(clone_dir)
+                with path_lock(os.path.join(clone_dir, "openvr")), timed(
+                    "openvr-build"
+                ):
+                    with openvr_cache.building(key) as install_dir:
+                        cls.build_openvr(clone_dir, env_name, install_dir)
+                install_tree = openvr_cache.find_artifacts(key)
+            else:
+                print("Using cached OpenVR build...")
+
+        with timed("openvr-install"):
+            openvr_cache.install_artifacts(install_tree, env_dir)
+
     @staticmethod
     @abstractmethod
     def get_pymol_dir(conda_prefix: str, python_version: str) -> str:
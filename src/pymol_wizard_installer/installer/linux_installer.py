@@ -1,9 +1,11 @@
 import os
 import shutil
-import subprocess
 from typing import override
 
-from pymol_wizard_installer.installer.base_installer import Installer
+from pymol_wizard_installer import openvr_cache
+from pymol_wizard_installer.installer.base_installer import Installer, OPENVR_VERSION
+from pymol_wizard_installer.build_jobs import get_build_environ, get_build_jobs
+from pymol_wizard_installer.env_runner import run_in_env
 
 
 class LinuxInstaller(Installer):
@@ -28,70 +30,56 @@ class LinuxInstaller(Installer):
 
     @staticmethod
     @override
-    def install_openvr(clone_dir: str, conda_base_path: str, env_name: str) -> None:
-        """Clone, build and install OpenVR."""
+    def build_openvr(clone_dir: str, env_name: str, install_dir: str) -> None:
+        """Build OpenVR and install it in the given directory."""
 
-        Installer.clone_openvr(clone_dir)
-        env_dir = os.path.join(conda_base_path, "envs", env_name)
-
-        if not os.path.exists(os.path.join(clone_dir, "openvr")):
-            subprocess.run(
-                [
-                    "git",
-                    "clone",
-                    "-b",
-                    "v1.0.17",
-                    "git@github.com:ValveSoftware/openvr.git",
-                    os.path.join(clone_dir, "openvr"),
-                ],
-                check=True,
-            )
-
-        subprocess.run(
+        run_in_env(
+            env_name,
             [
-                "conda",
-                "run",
-                "-n",
-                env_name,
                 "cmake",
                 "-S",
                 ".",
                 "-B",
                 "build",
                 "-DCMAKE_BUILD_TYPE=Release",
+                f"-DCMAKE_INSTALL_PREFIX={install_dir}",
             ],
             cwd=os.path.join(clone_dir, "openvr"),
             check=True,
         )
 
-        subprocess.run(
+        run_in_env(
+            env_name,
             [
-                "conda",
-                "run",
-                "-n",
-                env_name,
                 "cmake",
                 "--build",
                 "build",
                 "--config",
                 "Release",
+                "--parallel",
+                str(get_build_jobs()),
+                "--target",
+                "install",
             ],
             cwd=os.path.join(clone_dir, "openvr"),
-            check=True,
-        )
-
-        subprocess.run(
-            ["conda", "run", "-n", env_name, "sudo", "make", "install"],
-            cwd=os.path.join(clone_dir, "openvr", "build"),
+            env=get_build_environ(),
             check=True,
         )
 
         # Copy the openvr.h header
+        os.makedirs(os.path.join(install_dir, "include"), exist_ok=True)
         shutil.copy(
             os.path.join(clone_dir, "openvr", "headers", "openvr.h"),
-            os.path.join(env_dir, "include"),
+            os.path.join(install_dir, "include"),
         )
 
+    @staticmethod
+    @override
+    def get_openvr_key() -> dict:
+        """Get the cache key of the OpenVR build installed by this installer."""
+
+        return openvr_cache.get_artifact_key(OPENVR_VERSION, "Release", False)
+
     @staticmethod
     @override
     def get_pymol_dir(conda_prefix: str, python_version: str) -> str:
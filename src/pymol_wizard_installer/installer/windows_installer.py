@@ -1,9 +1,11 @@
 import os
 import shutil
-import subprocess
 from typing import override
 
-from pymol_wizard_installer.installer.base_installer import Installer
+from pymol_wizard_installer import openvr_cache
+from pymol_wizard_installer.installer.base_installer import Installer, OPENVR_VERSION
+from pymol_wizard_installer.build_jobs import get_build_environ, get_build_jobs
+from pymol_wizard_installer.env_runner import run_in_env
 
 
 class WindowsInstaller(Installer):
@@ -28,71 +30,66 @@ class WindowsInstaller(Installer):
 
     @staticmethod
     @override
-    def install_openvr(clone_dir: str, conda_base_path: str, env_name: str) -> None:
-        """Clone, build and install OpenVR."""
+    def build_openvr(clone_dir: str, env_name: str, install_dir: str) -> None:
+        """Build OpenVR and install it in the given directory."""
 
-        Installer.clone_openvr(clone_dir)
-        env_dir = os.path.join(conda_base_path, "envs", env_name)
-
-        subprocess.run(
+        run_in_env(
+            env_name,
             [
-                "conda",
-                "run",
-                "-n",
-                env_name,
                 "cmake",
                 "-S",
                 ".",
                 "-B",
                 "build",
-                f"-DCMAKE_INSTALL_PREFIX={env_dir}",
+                f"-DCMAKE_INSTALL_PREFIX={install_dir}",
                 "-DBUILD_SHARED=1",
             ],
             cwd=os.path.join(clone_dir, "openvr"),
             check=True,
         )
 
-        subprocess.run(
+        run_in_env(
+            env_name,
             [
-                "conda",
-                "run",
-                "-n",
-                env_name,
                 "cmake",
                 "--build",
                 "build",
                 "--config",
                 "Release",
+                "--parallel",
+                str(get_build_jobs()),
                 "--target",
                 "install",
             ],
             cwd=os.path.join(clone_dir, "openvr"),
+            env=get_build_environ(),
             check=True,
         )
 
         # Rename the .lib file
         shutil.move(
             os.path.join(
-                env_dir,
+                install_dir,
                 "Lib",
                 "openvr_api64.lib",
             ),
             os.path.join(
-                env_dir,
+                install_dir,
                 "Lib",
                 "openvr_api.lib",
             ),
         )
 
         # Move the .dll to the right directory
+        os.makedirs(os.path.join(install_dir, "Library", "bin"), exist_ok=True)
         shutil.move(
             os.path.join(
-                env_dir,
+                install_dir,
                 "Lib",
                 "openvr_api64.dll",
             ),
             os.path.join(
-                env_dir,
+                install_dir,
                 "Library",
                 "bin",
                 "openvr_api64.dll",
@@ -100,11 +97,19 @@ class WindowsInstaller(Installer):
         )
 
         # Copy the openvr.h header
+        os.makedirs(os.path.join(install_dir, "include"), exist_ok=True)
         shutil.copy(
             os.path.join(clone_dir, "openvr", "headers", "openvr.h"),
-            os.path.join(env_dir, "include"),
+            os.path.join(install_dir, "include"),
         )
 
+    @staticmethod
+    @override
+    def get_openvr_key() -> dict:
+        """Get the cache key of the OpenVR build installed by this installer."""
+
+        return openvr_cache.get_artifact_key(OPENVR_VERSION, "Release", True)
+
     @staticmethod
     @override
     def get_pymol_dir(conda_prefix: str, _: str) -> str:
@@ -0,0 +1,186 @@
+import os
+import re
+import shutil
+import tempfile
+
+from pymol_wizard_installer.profiling import span
+
+
+class MenuFormat:
+    """How the Wizard menu and its entries are written in a PyMOL source file."""
+
+    target_pattern: re.Pattern
+    entry_pattern: re.Pattern
+    entry_template: str
+
+    def __init__(self, target_pattern, entry_pattern, entry_template):
+        self.target_pattern = re.compile(target_pattern)
+        self.entry_pattern = re.compile(entry_pattern)
+        self.entry_template = entry_template
+
+    def format_entry(self, menu_entry: str, wizard_name: str) -> str:
+        return self.entry_template.format(
+            label=repr(menu_entry), command=repr(f"wizard {wizard_name}")
+        )
+
+
+# Wizard menu of the external GUI, in pymol/_gui.py
+EXTERNAL_GUI = MenuFormat(
+    r'\(\s*["\']menu["\'],\s*["\']Wizard["\'],\s*\[',
+    r'^\s*\(\s*(["\'])command\1\s*,\s*(["\'])(?P<label>.*?)\2\s*,'
+    r'\s*(["\'])wizard\s+(?P<name>[^"\']+?)\4\s*\)\s*,?\s*$',
+    "\n('command', {label}, {command}),",
+)
+
+# Wizard menu of the internal GUI, in pymol/wizard/openvr.py
+INTERNAL_GUI = MenuFormat(
+    r'\[\s*2\s*,\s*["\']Wizard Menu["\']\s*,\s*["\']["\']\s*\]\s*,',
+    r'^\s*\[\s*1\s*,\s*(["\'])(?P<label>.*?)\1\s*,'
+    r'\s*(["\'])wizard\s+(?P<name>[^"\']+?)\3\s*\]\s*,?\s*$',
+    "\n[1, {label}, {command}],",
+)
+
+
+def find_menu_block(contents: str, menu_format: MenuFormat) -> tuple[int, int] | None:
+    """Find the span of the Wizard menu's items, from its target to the bracket closing it.
+
+    Brackets inside strings and comments are ignored. Returns None if the
+    target is missing or the menu is never closed.
+    """
+
+    target = menu_format.target_pattern.search(contents)
+    if target is None:
+        return None
+
+    depth = 0
+    quote = None
+    position = target.end()
+    while position < len(contents):
+        char = contents[position]
+        if quote is not None:
+            if char == "\\":
+                position += 1
+            elif char == quote or char == "\n":
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char == "#":
+            newline = contents.find("\n", position)
+            position = len(contents) if newline == -1 else newline
+            continue
+        elif char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+            if depth < 0:
+                return target.end(), position
+        position += 1
+
+    return None
+
+
+def iter_menu_lines(contents: str, menu_format: MenuFormat):
+    """Yield each line of the contents, with its entry match if it is an entry of the Wizard menu."""
+
+    block = find_menu_block(contents, menu_format)
+    offset = 0
+    for line in contents.splitlines(keepends=True):
+        match = None
+        if block is not None and block[0] <= offset < block[1]:
+            match = menu_format.entry_pattern.match(line)
+        yield line, match
+        offset += len(line)
+
+
+def read_entries(file: str, menu_format: MenuFormat) -> dict[str, str]:
+    """Get the Wizard menu entries of a file, by wizard name."""
+
+    with open(file, "r") as f:
+        contents = f.read()
+
+    entries = {}
+    for _, match in iter_menu_lines(contents, menu_format):
+        if match is not None:
+            entries[match.group("name")] = match.group("label")
+    return entries
+
+
+def write_atomically(file: str, contents: str) -> None:
+    """Replace the contents of a file, so that readers never see a partial write."""
+
+    directory = os.path.dirname(os.path.abspath(file))
+    fd, tmp_file = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(file)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(contents)
+        shutil.copymode(file, tmp_file)
+        os.replace(tmp_file, file)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+
+def patch_menu(
+    file: str,
+    menu_format: MenuFormat,
+    add: list[tuple[str, str]] = (),
+    remove: list[str] = (),
+) -> bool:
+    """Add and remove Wizard menu entries in a single pass over the file.
+
+    `add` is a list of (menu entry, wizard name) pairs and `remove` a list of
+    wizard names. Entries are recognised regardless of their quoting and
+    spacing, but only inside the Wizard menu. An entry for a wizard that is
+    already present with a different menu entry is replaced. Returns whether
+    the file was changed.
+    """
+
+    with span(f"patch {os.path.basename(file)}", "menu"):
+        return _patch_menu(file, menu_format, add, remove)
+
+
+def _patch_menu(file, menu_format, add, remove) -> bool:
+    with open(file, "r") as f:
+        contents = f.read()
+
+    to_add = {wizard_name: menu_entry for menu_entry, wizard_name in add}
+    to_remove = set(remove)
+
+    kept_lines = []
+    changed = False
+    for line, match in iter_menu_lines(contents, menu_format):
+        if match is not None:
+            name = match.group("name")
+            if name in to_remove:
+                changed = True
+                continue
+            if name in to_add:
+                if match.group("label") == to_add[name]:
+                    print(f"Entry already exists in {file}, skipping...")
+                    del to_add[name]
+                else:
+                    # Outdated menu entry, replaced below
+                    changed = True
+                    continue
+        kept_lines.append(line)
+
+    contents = "".join(kept_lines)
+    if to_add:
+        target = menu_format.target_pattern.search(contents)
+        if target is None:
+            print(f"Could not find target in {file}")
+        else:
+            to_insert = "".join(
+                menu_format.format_entry(menu_entry, wizard_name)
+                for wizard_name, menu_entry in to_add.items()
+            )
+            contents = contents[: target.end()] + to_insert + contents[target.end() :]
+            changed = True
+
+    if changed:
+        write_atomically(file, contents)
+
+    return changed
@@ -0,0 +1,156 @@
+import os
+import time
+import shutil
+import sysconfig
+from contextlib import contextmanager
+
+from pymol_wizard_installer.cache import (
+    get_cache_dir,
+    get_file_digest,
+    get_key_digest,
+    list_entries as list_cache_entries,
+    prune_entries,
+    read_entry,
+    touch_entry,
+    write_entry,
+)
+
+
+def get_openvr_dir(create: bool = True) -> str:
+    return get_cache_dir("openvr", create=create)
+
+
+def get_artifact_key(version: str, build_type: str, shared: bool) -> dict:
+    """Get the cache key identifying an OpenVR build."""
+
+    return {
+        "version": version,
+        "platform": sysconfig.get_platform(),
+        "build_type": build_type,
+        "shared": shared,
+    }
+
+
+def _get_entry_dir(key: dict) -> str:
+    return os.path.join(get_openvr_dir(), get_key_digest(key))
+
+
+def _is_intact(entry_dir: str, entry: dict) -> bool:
+    """Check that every file recorded in the entry is present and unmodified."""
+
+    install_dir = os.path.join(entry_dir, "install")
+    for relative_path, (size, digest) in entry["files"].items():
+        path = os.path.join(install_dir, relative_path)
+        try:
+            if os.path.getsize(path) != size:
+                return False
+        except FileNotFoundError:
+            return False
+        if get_file_digest(path) != digest:
+            return False
+
+    return bool(entry["files"])
+
+
+def find_artifacts(key: dict) -> str | None:
+    """Get the cached install tree for an OpenVR build, if present and intact."""
+
+    entry_dir = _get_entry_dir(key)
+    entry = read_entry(entry_dir)
+    if entry is None:
+        if os.path.exists(entry_dir):
+            print("Cached OpenVR build is incomplete, rebuilding it.")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+        return None
+
+    if not _is_intact(entry_dir, entry):
+        print("Cached OpenVR build is corrupt, rebuilding it.")
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        return None
+
+    touch_entry(entry_dir, entry)
+    return os.path.join(entry_dir, "install")
+
+
+def is_cached(key: dict) -> bool:
+    """Check if an OpenVR build is cached, without verifying or touching it."""
+
+    entry_dir = os.path.join(get_openvr_dir(create=False), get_key_digest(key))
+    return read_entry(entry_dir) is not None
+
+
+@contextmanager
+def building(key: dict):
+    """Provide a staging install directory, committed to the cache on success."""
+
+    entry_dir = _get_entry_dir(key)
+    staging_dir = f"{entry_dir}.{os.getpid()}.tmp"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    install_dir = os.path.join(staging_dir, "install")
+    os.makedirs(install_dir)
+
+    try:
+        yield install_dir
+
+        files = {}
+        for root, _, filenames in os.walk(install_dir):
+            for filename in filenames:
+                path = os.path.join(root, filename)
+                files[os.path.relpath(path, install_dir)] = [
+                    os.path.getsize(path),
+                    get_file_digest(path),
+                ]
+        if not files:
+            raise FileNotFoundError("The OpenVR build did not install any files.")
+
+        write_entry(
+            staging_dir,
+            {
+                "key": key,
+                "files": files,
+                "created": time.time(),
+                "last_used": time.time(),
+            },
+        )
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(staging_dir, entry_dir)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def install_artifacts(install_tree: str, prefix: str) -> None:
+    """Install a cached OpenVR tree into a prefix, hardlinking files when possible."""
+
+    for root, _, filenames in os.walk(install_tree):
+        target_dir = os.path.join(prefix, os.path.relpath(root, install_tree))
+        os.makedirs(target_dir, exist_ok=True)
+        for filename in filenames:
+            source = os.path.join(root, filename)
+            target = os.path.join(target_dir, filename)
+            if os.path.lexists(target):
+                os.remove(target)
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copy2(source, target)
+
+
+def list_entries() -> list[dict]:
+    """List the cached OpenVR builds, most recently used first."""
+
+    return list_cache_entries(get_openvr_dir())
+
+
+def prune(max_age_days: float | None = None, max_size: int | None = None) -> list[dict]:
+    """Remove cached OpenVR builds that are broken, unused or over the size budget."""
+
+    return prune_entries(get_openvr_dir(), max_age_days, max_size)
+
+
+def describe_entry(entry: dict) -> str:
+    key = entry["key"]
+    if not key:
+        return "(incomplete entry)"
+
+    linkage = "shared" if key["shared"] else "static"
+    return f"openvr {key['version']}, {key['build_type']}, {linkage}, {key['platform']}"
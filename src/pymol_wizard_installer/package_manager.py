@@ -0,0 +1,252 @@
+import os
+import json
+import shutil
+import subprocess
+
+from pymol_wizard_installer.env_discovery import find_env_prefix, get_conda_base
+from pymol_wizard_installer.file_locks import file_lock
+from pymol_wizard_installer.process_runner import run_process
+
+
+class PackageManager:
+    """Frontend used to create, update, remove and run conda environments.
+
+    The default implementation speaks the `conda` command line, which
+    `mamba` also implements. The executable can be any path, so that a
+    stand-in script can be used in place of the real tool.
+    """
+
+    name = "conda"
+    # Whether whole environments, including the files pip installed, can be cloned
+    can_clone = True
+    executable: str
+
+    def __init__(self, executable=None):
+        self.executable = executable or self.name
+
+    def _run(self, args: list[str], **kwargs) -> subprocess.CompletedProcess:
+        return run_process([self.executable, *args], check=True, **kwargs)
+
+    def _run_locked(self, args: list[str], **kwargs) -> subprocess.CompletedProcess:
+        """Run a command that downloads and extracts packages into the shared package cache.
+
+        The package cache is not safe against concurrent writers, so these
+        commands are serialized across installer processes.
+        """
+
+        with file_lock("package-cache", "the conda package cache"):
+            return self._run(args, **kwargs)
+
+    def get_base(self) -> str | None:
+        """Get the root prefix under which the manager keeps its environments."""
+
+        base = get_conda_base()
+        if base is not None:
+            return base
+
+        try:
+            return self._run(
+                ["info", "--base"], capture_output=True, text=True
+            ).stdout.strip()
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            return None
+
+    def exists(self, env_name: str) -> bool:
+        return find_env_prefix(env_name, self.get_base()) is not None
+
+    def create(self, env_name: str, env_file: str) -> None:
+        """Create an environment by solving an environment file."""
+
+        self._run_locked(["env", "create", "--name", env_name, "--file", env_file])
+
+    def create_from_explicit(self, env_name: str, lock_file: str) -> None:
+        """Create an environment from an explicit package list, without solving."""
+
+        self._run_locked(["create", "--yes", "--name", env_name, "--file", lock_file])
+
+    def create_prefix(self, prefix: str, env_file: str) -> None:
+        """Create an environment at a path by solving an environment file."""
+
+        self._run_locked(
+            ["env", "create", "--quiet", "--prefix", prefix, "--file", env_file]
+        )
+
+    def clone(self, env_name: str, source_env: str) -> None:
+        self._run_locked(["create", "--yes", "--name", env_name, "--clone", source_env])
+
+    def update(self, env_name: str, env_file: str) -> None:
+        """Update an environment from an environment file."""
+
+        self._run_locked(["env", "update", "--name", env_name, "--file", env_file])
+
+    def remove(self, env_name: str) -> None:
+        self._run(["env", "remove", "--yes", "--name", env_name])
+
+    def set_variables(self, env_name: str, variables: dict) -> None:
+        """Set the variables exported when the environment is activated."""
+
+        self._run(
+            [
+                "env",
+                "config",
+                "vars",
+                "set",
+                "--name",
+                env_name,
+                *[f"{key}={value}" for key, value in variables.items()],
+            ]
+        )
+
+    def list_explicit(self, env_name=None, prefix=None) -> str:
+        """List the packages of an environment as an explicit file with URLs and MD5 hashes."""
+
+        target = ["--prefix", prefix] if prefix is not None else ["--name", env_name]
+        return self._run(
+            ["list", "--explicit", "--md5", *target], capture_output=True, text=True
+        ).stdout
+
+    def get_run_command(self, env_name: str, args: list[str]) -> list[str]:
+        """Build the command line that runs a command inside an environment."""
+
+        return [
+            self.executable,
+            "run",
+            "--no-capture-output",
+            "--name",
+            env_name,
+            *args,
+        ]
+
+    def run(self, env_name: str, args: list[str], **kwargs):
+        return run_process(self.get_run_command(env_name, args), **kwargs)
+
+
+class MambaManager(PackageManager):
+    """mamba, a faster drop-in replacement for the conda command line."""
+
+    name = "mamba"
+
+
+class MicromambaManager(PackageManager):
+    """micromamba, a standalone reimplementation of conda with a different command line."""
+
+    name = "micromamba"
+    # Recreating an environment from its explicit package list would leave
+    # out everything installed with pip, such as PyMOL
+    can_clone = False
+
+    def get_base(self) -> str | None:
+        root_prefix = os.environ.get("MAMBA_ROOT_PREFIX")
+        if root_prefix:
+            return root_prefix
+
+        try:
+            info = json.loads(
+                self._run(["info", "--json"], capture_output=True, text=True).stdout
+            )
+        except (subprocess.CalledProcessError, FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        return info.get("base environment")
+
+    def create(self, env_name: str, env_file: str) -> None:
+        self._run_locked(["create", "--yes", "--name", env_name, "--file", env_file])
+
+    def create_prefix(self, prefix: str, env_file: str) -> None:
+        self._run_locked(
+            ["create", "--yes", "--quiet", "--prefix", prefix, "--file", env_file]
+        )
+
+    def update(self, env_name: str, env_file: str) -> None:
+        self._run_locked(["install", "--yes", "--name", env_name, "--file", env_file])
+
+    def set_variables(self, env_name: str, variables: dict) -> None:
+        # micromamba has no `env config vars`, but reads the same state file
+        prefix = find_env_prefix(env_name, self.get_base())
+        state_file = os.path.join(prefix, "conda-meta", "state")
+        try:
+            with open(state_file, "r") as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            state = {}
+
+        state.setdefault("env_vars", {}).update(
+            {key: str(value) for key, value in variables.items()}
+        )
+        with open(f"{state_file}.tmp", "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(f"{state_file}.tmp", state_file)
+
+    def list_explicit(self, env_name=None, prefix=None) -> str:
+        target = ["--prefix", prefix] if prefix is not None else ["--name", env_name]
+        return self._run(
+            ["env", "export", "--explicit", "--md5", *target],
+            capture_output=True,
+            text=True,
+        ).stdout
+
+    def get_run_command(self, env_name: str, args: list[str]) -> list[str]:
+        return [self.executable, "run", "--name", env_name, *args]
+
+
+# Supported package managers, fastest first. Keep cli.PACKAGE_MANAGER_NAMES in sync.
+PACKAGE_MANAGERS = {
+    "micromamba": MicromambaManager,
+    "mamba": MambaManager,
+    "conda": PackageManager,
+}
+
+_package_manager = None
+
+
+def create_package_manager(choice: str) -> PackageManager:
+    """Create a package manager from its name or the path of its executable.
+
+    The kind of an executable given by path is guessed from its file name,
+    and defaults to the conda command line.
+    """
+
+    if choice in PACKAGE_MANAGERS:
+        return PACKAGE_MANAGERS[choice]()
+
+    name = os.path.splitext(os.path.basename(choice))[0].lower()
+    return PACKAGE_MANAGERS.get(name, PackageManager)(os.path.abspath(choice))
+
+
+def detect_package_manager() -> PackageManager:
+    """Pick the fastest package manager that manages the current conda installation.
+
+    micromamba keeps its environments under its own root prefix, so it is
+    only picked automatically when conda is not installed.
+    """
+
+    has_conda = shutil.which("conda") is not None
+    for name in PACKAGE_MANAGERS:
+        if shutil.which(name) is None:
+            continue
+        if name == "micromamba" and has_conda:
+            continue
+        return PACKAGE_MANAGERS[name]()
+
+    return PackageManager()
+
+
+def set_package_manager(choice: str | None) -> None:
+    """Select the package manager for the current run.
+
+    Without an explicit choice, PYMOL_WIZARD_INSTALLER_PACKAGE_MANAGER is
+    used if set, or else the package manager is detected.
+    """
+
+    global _package_manager
+    choice = choice or os.environ.get("PYMOL_WIZARD_INSTALLER_PACKAGE_MANAGER")
+    if choice:
+        _package_manager = create_package_manager(choice)
+    else:
+        _package_manager = detect_package_manager()
+
+
+def get_package_manager() -> PackageManager:
+    if _package_manager is None:
+        set_package_manager(None)
+    return _package_manager
@@ -0,0 +1,369 @@
+import os
+import sys
+import time
+import codecs
+import signal
+import threading
+import subprocess
+from collections import deque
+from contextlib import contextmanager
+
+from pymol_wizard_installer.profiling import span
+
+# Lines of output kept for each step whose output is buffered
+MAX_LOG_LINES = 500
+
+# Seconds a child is given to exit after being asked to, before it is killed
+KILL_GRACE = 5
+
+# Timeout of the steps that do not set their own, or None for no timeout
+_step_timeout = None
+
+_local = threading.local()
+_print_lock = threading.Lock()
+
+# Children that are running, by pid, so that they can be stopped on Ctrl-C
+_children = {}
+_children_lock = threading.Lock()
+_cancelled = threading.Event()
+
+
+class ProcessCancelled(subprocess.SubprocessError):
+    def __init__(self, cmd):
+        self.cmd = cmd
+
+    def __str__(self):
+        return f"Command '{self.cmd}' was cancelled."
+
+
+class StepLog:
+    """The output of the child processes of a step.
+
+    Live logs write the output as it arrives. Buffered logs keep the last
+    max_lines lines and print them as a single block when the step ends, so
+    that the output of steps running concurrently is not interleaved.
+    """
+
+    name: str
+    buffered: bool
+    timeout: float | None
+    deadline: float | None
+    lines: deque
+    omitted: int
+
+    def __init__(self, name, buffered=False, timeout=None, max_lines=MAX_LOG_LINES):
+        self.name = name
+        self.buffered = buffered
+        self.timeout = timeout
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.lines = deque(maxlen=max_lines)
+        self.omitted = 0
+        self._partial = ""
+        self._lock = threading.Lock()
+
+    def write(self, text: str) -> None:
+        if not text:
+            return
+        if not self.buffered:
+            with _print_lock:
+                sys.stdout.write(text)
+                sys.stdout.flush()
+            return
+
+        with self._lock:
+            *lines, self._partial = (self._partial + text).split("\n")
+            for line in lines:
+                self._append(line)
+
+    def _append(self, line: str) -> None:
+        # Keep what a terminal would show of progress bars redrawn with \r
+        line = line.rstrip("\r").rsplit("\r", 1)[-1]
+        if len(self.lines) == self.lines.maxlen:
+            self.omitted += 1
+        self.lines.append(line)
+
+    def get_remaining(self) -> float | None:
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def flush(self) -> None:
+        """Print the buffered output, if any."""
+
+        with self._lock:
+            if self._partial:
+                self._append(self._partial)
+                self._partial = ""
+            if not self.lines:
+                return
+
+            block = [f"[{self.name}] {line}" for line in self.lines]
+            if self.omitted:
+                block.insert(
+                    0, f"[{self.name}] ... {self.omitted} earlier lines omitted"
+                )
+            self.lines.clear()
+            self.omitted = 0
+
+        with _print_lock:
+            print("\n".join(block), flush=True)
+
+
+# Output of the children started outside of any step
+_default_log = StepLog("")
+
+
+def set_step_timeout(seconds: float | None) -> None:
+    """Set the timeout of the steps that do not set their own."""
+
+    global _step_timeout
+    _step_timeout = seconds
+
+
+def get_step_log() -> StepLog:
+    return getattr(_local, "log", None) or _default_log
+
+
+@contextmanager
+def process_step(name: str, timeout: float | None = None, buffered: bool = False):
+    """Run the child processes started in the block under the log and deadline of a step.
+
+    Steps are tracked per thread, so concurrent steps must run on different
+    threads. The timeout defaults to the one set with set_step_timeout().
+    """
+
+    log = StepLog(name, buffered, timeout if timeout is not None else _step_timeout)
+    previous = getattr(_local, "log", None)
+    _local.log = log
+    try:
+        yield log
+    finally:
+        _local.log = previous
+        log.flush()
+
+
+def _signal(process, kill: bool, group: bool) -> None:
+    """Ask a child, and its own children if it leads a group, to exit, or kill them."""
+
+    try:
+        if os.name == "nt":
+            if group:
+                subprocess.run(
+                    [
+                        "taskkill",
+                        "/T",
+                        *(["/F"] if kill else []),
+                        "/PID",
+                        str(process.pid),
+                    ],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+            elif kill:
+                process.kill()
+            else:
+                process.terminate()
+        elif group:
+            os.killpg(process.pid, signal.SIGKILL if kill else signal.SIGTERM)
+        else:
+            os.kill(process.pid, signal.SIGKILL if kill else signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def _stop(process, group: bool) -> None:
+    import asyncio
+
+    if process.returncode is not None:
+        return
+
+    _signal(process, False, group)
+    try:
+        await asyncio.wait_for(process.wait(), KILL_GRACE)
+    except TimeoutError:
+        _signal(process, True, group)
+        await process.wait()
+
+
+async def _pump(stream, log: StepLog | None) -> bytes:
+    """Read a child's pipe to the end, into a log or else into memory."""
+
+    chunks = []
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while chunk := await stream.read(1 << 16):
+        if log is None:
+            chunks.append(chunk)
+        else:
+            log.write(decoder.decode(chunk))
+    if log is not None:
+        log.write(decoder.decode(b"", final=True))
+    return b"".join(chunks)
+
+
+async def run_async(
+    command: list[str],
+    *,
+    check: bool = False,
+    capture_output: bool = False,
+    stdout=None,
+    stderr=None,
+    text: bool = False,
+    env: dict | None = None,
+    cwd: str | None = None,
+    timeout: float | None = None,
+    interactive: bool = False,
+) -> subprocess.CompletedProcess:
+    """Run a child process, with the arguments and results of subprocess.run.
+
+    Output that is not captured or redirected goes to the current step's log.
+    The child gets no input and runs in a process group of its own, so that
+    it can be stopped with its own children on timeout or cancellation.
+    Interactive children instead share the installer's terminal.
+    """
+
+    import asyncio
+
+    if _cancelled.is_set():
+        raise ProcessCancelled(command)
+
+    log = get_step_log()
+    remaining = log.get_remaining()
+    if remaining is not None and (timeout is None or remaining < timeout):
+        timeout = remaining
+    if timeout is not None and timeout <= 0:
+        raise subprocess.TimeoutExpired(command, log.timeout)
+
+    if capture_output:
+        stdout = stderr = subprocess.PIPE
+
+    kwargs = {"env": env, "cwd": cwd}
+    if interactive:
+        streams = {}
+    else:
+        # Output meant for the terminal is read line by line into the log
+        if stdout is None and stderr is None:
+            stderr = subprocess.STDOUT
+        streams = {
+            "stdout": log if stdout is None else None,
+            "stderr": log if stderr is None else None,
+        }
+        kwargs["stdin"] = subprocess.DEVNULL
+        kwargs["stdout"] = subprocess.PIPE if stdout is None else stdout
+        kwargs["stderr"] = subprocess.PIPE if stderr is None else stderr
+        if os.name == "nt":
+            kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs["start_new_session"] = True
+
+    process = await asyncio.create_subprocess_exec(*command, **kwargs)
+    with _children_lock:
+        _children[process.pid] = (process, not interactive)
+
+    pumps = [
+        _pump(getattr(process, name), streams.get(name))
+        for name in ["stdout", "stderr"]
+        if getattr(process, name) is not None
+    ]
+    try:
+        outputs = await asyncio.wait_for(
+            asyncio.gather(*pumps, process.wait()), timeout
+        )
+    except TimeoutError:
+        await _stop(process, not interactive)
+        raise subprocess.TimeoutExpired(command, timeout)
+    except asyncio.CancelledError:
+        await _stop(process, not interactive)
+        raise
+    finally:
+        with _children_lock:
+            _children.pop(process.pid, None)
+
+    if _cancelled.is_set():
+        raise ProcessCancelled(command)
+
+    outputs = dict(
+        zip(
+            [name for name in ["stdout", "stderr"] if getattr(process, name)],
+            outputs,
+        )
+    )
+    captured = [
+        outputs.get(name) if value == subprocess.PIPE else None
+        for name, value in [("stdout", stdout), ("stderr", stderr)]
+    ]
+    if text:
+        captured = [
+            None if output is None else output.decode(errors="replace")
+            for output in captured
+        ]
+
+    if check and process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command, *captured)
+    return subprocess.CompletedProcess(command, process.returncode, *captured)
+
+
+def run_process(
+    command: list[str], name: str | None = None, **kwargs
+) -> subprocess.CompletedProcess:
+    """Run a child process like subprocess.run, in a span of its own when profiling.
+
+    The span is named `name`, or else after the executable.
+    """
+
+    import asyncio
+
+    with span(name or os.path.basename(command[0]), "process", command=command):
+        return asyncio.run(run_async(command, **kwargs))
+
+
+def run_concurrently(
+    commands: list[list[str]], jobs: int | None = None, **kwargs
+) -> list[subprocess.CompletedProcess]:
+    """Run several children at once, up to `jobs` at a time, and wait for all of them.
+
+    The results are in the order of the commands. If a child fails, the
+    others are stopped and its error is raised.
+    """
+
+    import asyncio
+
+    async def run_all():
+        semaphore = asyncio.Semaphore(jobs or len(commands) or 1)
+
+        async def run_one(command):
+            async with semaphore:
+                with span(os.path.basename(command[0]), "process", command=command):
+                    return await run_async(command, **kwargs)
+
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(run_one(command)) for command in commands]
+        return [task.result() for task in tasks]
+
+    try:
+        return asyncio.run(run_all())
+    except ExceptionGroup as group:
+        raise group.exceptions[0]
+
+
+def cancel_all() -> None:
+    """Stop every running child and refuse to start new ones, e.g. on Ctrl-C.
+
+    Children running in other threads are asked to exit, and killed if they
+    are still running after a grace period.
+    """
+
+    _cancelled.set()
+    with _children_lock:
+        children = list(_children.values())
+    for process, group in children:
+        _signal(process, False, group)
+
+    def kill_remaining():
+        with _children_lock:
+            remaining = list(_children.values())
+        for process, group in remaining:
+            _signal(process, True, group)
+
+    timer = threading.Timer(KILL_GRACE, kill_remaining)
+    timer.daemon = True
+    timer.start()
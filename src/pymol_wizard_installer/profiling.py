@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import atexit
+import threading
+from contextlib import contextmanager, nullcontext
+
+# Spans recorded in the current run, or None when profiling is disabled
+_spans = None
+_origin = 0
+
+_NO_SPAN = nullcontext()
+
+
+def enable_profiling(trace_file: str) -> None:
+    """Start recording spans, and write them to trace_file at exit."""
+
+    global _spans, _origin
+    _spans = []
+    _origin = time.perf_counter_ns()
+    atexit.register(write_report, trace_file)
+
+
+def is_profiling() -> bool:
+    return _spans is not None
+
+
+def _get_children_cpu() -> float:
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+@contextmanager
+def _record(name: str, category: str, args: dict):
+    start = time.perf_counter_ns()
+    children_cpu = _get_children_cpu()
+    try:
+        yield
+    finally:
+        end = time.perf_counter_ns()
+        _spans.append(
+            {
+                "name": name,
+                "cat": category,
+                "start": start - _origin,
+                "duration": end - start,
+                # Process-wide: children of concurrent steps that exit meanwhile are included
+                "children_cpu": _get_children_cpu() - children_cpu,
+                "tid": threading.get_ident(),
+                "args": args,
+            }
+        )
+
+
+def span(name: str, category: str = "step", **args):
+    """Time a block of code when profiling is enabled.
+
+    When profiling is disabled this returns a shared no-op context manager,
+    so instrumented code pays for little more than a function call.
+    """
+
+    if _spans is None:
+        return _NO_SPAN
+    return _record(name, category, args)
+
+
+def get_summary() -> list[dict]:
+    """Aggregate the spans by category and name, slowest first."""
+
+    totals = {}
+    for recorded in _spans:
+        total = totals.setdefault(
+            (recorded["cat"], recorded["name"]),
+            {
+                "cat": recorded["cat"],
+                "name": recorded["name"],
+                "count": 0,
+                "wall": 0.0,
+                "children_cpu": 0.0,
+            },
+        )
+        total["count"] += 1
+        total["wall"] += recorded["duration"] / 1e9
+        total["children_cpu"] += recorded["children_cpu"]
+
+    return sorted(totals.values(), key=lambda total: total["wall"], reverse=True)
+
+
+def write_report(trace_file: str) -> None:
+    """Write the spans as a Chrome trace and print a summary table."""
+
+    pid = os.getpid()
+    events = [
+        {
+            "name": recorded["name"],
+            "cat": recorded["cat"],
+            "ph": "X",
+            "ts": recorded["start"] / 1000,
+            "dur": recorded["duration"] / 1000,
+            "pid": pid,
+            "tid": recorded["tid"],
+            "args": {
+                **recorded["args"],
+                "children_cpu_s": round(recorded["children_cpu"], 3),
+            },
+        }
+        for recorded in _spans
+    ]
+    with open(trace_file, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    print(
+        f"\n{'Category':<10} {'Span':<32} {'Count':>5} {'Wall (s)':>9} {'Child CPU (s)':>13}"
+    )
+    for total in get_summary():
+        print(
+            f"{total['cat']:<10} {total['name'][:32]:<32} {total['count']:>5} {total['wall']:>9.2f} {total['children_cpu']:>13.2f}"
+        )
+    print(f"Trace written to {trace_file} (open it in chrome://tracing or Perfetto).")
@@ -0,0 +1,79 @@
+# Answers to the prompts, by prompt key, when running non-interactively
+_answers = None
+
+# Valid answers to each prompt, or None if any answer is valid
+PROMPTS = {
+    "create_new_env": ["y", "n"],
+    "env_name": None,
+    "existing_env": ["o", "u", "a"],
+    "install_pymol": ["y", "n"],
+    "openvr": ["y", "n"],
+    "clear_files": ["y", "n"],
+}
+
+
+def load_answers(answers_file):
+    """Load the answers to the prompts from the `answers` mapping of a YAML file."""
+
+    import yaml
+
+    with open(answers_file, "r") as f:
+        config = yaml.safe_load(f) or {}
+
+    answers = {}
+    for key, value in (config.get("answers") or {}).items():
+        if key not in PROMPTS:
+            print(
+                f"Unknown prompt {key} in {answers_file}, expected one of: {', '.join(PROMPTS)}."
+            )
+            exit(1)
+
+        if isinstance(value, bool):
+            value = "y" if value else "n"
+        answer = str(value).strip()
+        if PROMPTS[key] is not None:
+            answer = answer.lower()[:1]
+            if answer not in PROMPTS[key]:
+                print(
+                    f"Invalid answer {value} to {key} in {answers_file}, expected one of: {', '.join(PROMPTS[key])}."
+                )
+                exit(1)
+        answers[key] = answer
+
+    return answers
+
+
+def set_answers(answers: dict | None) -> None:
+    """Answer the prompts from the given answers instead of asking, or ask again if None."""
+
+    global _answers
+    _answers = answers
+
+
+def get_preset_answer(key, default):
+    """Get the answer given in advance to a prompt, if running non-interactively."""
+
+    if _answers is None:
+        return default
+    return _answers.get(key, default)
+
+
+def get_answer(prompt, default="", key=None):
+    """Prompt the user and return the answer.
+
+    When running non-interactively, the preset answer to the prompt `key`
+    is returned instead, or else the default.
+    """
+
+    if _answers is not None:
+        answer = _answers.get(key, default)
+        print(f"{prompt.rstrip()} {answer}")
+        return answer
+
+    try:
+        answer = input(prompt).strip().lower() or default
+    except KeyboardInterrupt:
+        print("Aborted by user.")
+        exit(0)
+
+    return answer
@@ -0,0 +1,186 @@
+import os
+import sys
+import time
+import argparse
+
+from pymol_wizard_installer.prompts import load_answers
+
+
+def load_config(config_file):
+    """Load a provisioning config, resolving the wizard paths against its directory."""
+
+    import yaml
+
+    with open(config_file, "r") as f:
+        config = yaml.safe_load(f) or {}
+
+    wizards = config.get("wizards") or []
+    environments = [str(env_name) for env_name in config.get("environments") or []]
+    if not wizards or not environments:
+        print(f"{config_file} must list at least one wizard and one environment.")
+        exit(1)
+    if len(set(environments)) != len(environments):
+        print(f"{config_file} lists the same environment more than once.")
+        exit(1)
+
+    config_dir = os.path.dirname(os.path.abspath(config_file))
+    config["wizards"] = [
+        os.path.join(config_dir, os.path.expanduser(wizard_root))
+        for wizard_root in wizards
+    ]
+    config["environments"] = environments
+    config["options"] = [str(option) for option in config.get("options") or []]
+
+    # Fail before starting anything if the answers are invalid
+    load_answers(config_file)
+    return config
+
+
+def provision_env(env_name, config, config_file, log_file):
+    """Install the wizards into an environment in a child process, logging its output."""
+
+    import subprocess
+
+    from pymol_wizard_installer.process_runner import run_process
+
+    command = [
+        sys.executable,
+        "-m",
+        "pymol_wizard_installer.install_wizard",
+        "--answers",
+        config_file,
+        "--env_name",
+        env_name,
+        *config["options"],
+        *config["wizards"],
+    ]
+    start = time.perf_counter()
+    with open(log_file, "w") as log:
+        process = run_process(
+            command,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            env={**os.environ, "PYTHONUNBUFFERED": "1"},
+        )
+
+    return {
+        "env_name": env_name,
+        "success": process.returncode == 0,
+        "exit_code": process.returncode,
+        "duration": time.perf_counter() - start,
+        "log_file": log_file,
+    }
+
+
+def print_report(results, wall_time):
+    """Print the outcome of each environment and the overall throughput."""
+
+    print(f"\n{'Environment':<30} {'Result':<8} {'Time (s)':>9}  Log")
+    for result in results:
+        status = "ok" if result["success"] else f"exit {result['exit_code']}"
+        print(
+            f"{result['env_name'][:30]:<30} {status:<8} {result['duration']:>9.1f}  {result['log_file']}"
+        )
+
+    succeeded = sum(result["success"] for result in results)
+    print(
+        f"Provisioned {succeeded}/{len(results)} environments in {wall_time:.1f} s ({succeeded / wall_time * 60:.2f} environments/min)."
+    )
+
+
+def parse_args():
+    """Parse and return command line arguments."""
+
+    parser = argparse.ArgumentParser(
+        prog="provision_wizard",
+        description="Install PyMOL wizards into many conda environments concurrently and unattended.",
+    )
+    parser.add_argument(
+        "config",
+        type=str,
+        help="YAML file listing the wizards, the environments, the install_wizard options and the answers to its prompts.",
+    )
+
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        help="Maximum number of environments to provision concurrently. Defaults to the `jobs` of the config file, or 4.",
+    )
+
+    parser.add_argument(
+        "--log-dir",
+        type=str,
+        default="provision_logs",
+        help="Directory in which the output of each environment's installation is written.",
+    )
+
+    parser.add_argument(
+        "--report",
+        type=str,
+        metavar="REPORT_FILE",
+        help="Also write the results to a JSON file.",
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config_file = os.path.abspath(args.config)
+    config = load_config(config_file)
+    jobs = max(1, args.jobs or config.get("jobs") or 4)
+    os.makedirs(args.log_dir, exist_ok=True)
+
+    env_names = config["environments"]
+    print(
+        f"Provisioning {len(env_names)} environments with {jobs} concurrent installations..."
+    )
+
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    from pymol_wizard_installer.process_runner import cancel_all
+
+    # Each installation runs in a process of its own; the installer's file
+    # locks serialize their access to the caches and to shared checkouts
+    results = {}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [
+            pool.submit(
+                provision_env,
+                env_name,
+                config,
+                config_file,
+                os.path.abspath(os.path.join(args.log_dir, f"{env_name}.log")),
+            )
+            for env_name in env_names
+        ]
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                results[result["env_name"]] = result
+                status = "done" if result["success"] else "FAILED"
+                print(
+                    f"[{len(results)}/{len(env_names)}] {result['env_name']}: {status} in {result['duration']:.1f} s"
+                )
+        except KeyboardInterrupt:
+            # Each installation stops its own children when terminated
+            cancel_all()
+            print("\nProvisioning cancelled.")
+            exit(130)
+    wall_time = time.perf_counter() - start
+
+    ordered = [results[env_name] for env_name in env_names]
+    print_report(ordered, wall_time)
+    if args.report:
+        import json
+
+        with open(args.report, "w") as f:
+            json.dump({"wall_time": wall_time, "environments": ordered}, f, indent=2)
+
+    if not all(result["success"] for result in ordered):
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
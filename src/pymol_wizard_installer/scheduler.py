@@ -0,0 +1,137 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable
+
+from pymol_wizard_installer.process_runner import cancel_all, process_step
+from pymol_wizard_installer.profiling import span
+
+
+class Step:
+    """An installation step, with the resources it consumes and produces.
+
+    A step depends on every step that produces one of its inputs. Inputs that
+    no step produces are assumed to be already available. Steps holding the
+    same lock never run at the same time. A step whose child processes are
+    still running after `timeout` seconds is stopped.
+    """
+
+    name: str
+    action: Callable[[], None]
+    inputs: tuple[str, ...]
+    outputs: tuple[str, ...]
+    locks: tuple[str, ...]
+    timeout: float | None
+
+    def __init__(self, name, action, inputs=(), outputs=(), locks=(), timeout=None):
+        self.name = name
+        self.action = action
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.locks = tuple(locks)
+        self.timeout = timeout
+
+
+def get_dependencies(steps: list[Step]) -> dict[str, set[str]]:
+    """Map each step to the names of the steps it depends on."""
+
+    names = [step.name for step in steps]
+    if len(set(names)) != len(names):
+        raise ValueError("Step names must be unique.")
+
+    producers = {}
+    for step in steps:
+        for output in step.outputs:
+            producers.setdefault(output, []).append(step.name)
+
+    dependencies = {}
+    for step in steps:
+        dependencies[step.name] = {
+            producer
+            for resource in step.inputs
+            for producer in producers.get(resource, [])
+            if producer != step.name
+        }
+
+    # Reject cycles, which would otherwise stall the scheduler
+    resolved = set()
+    remaining = dict(dependencies)
+    while remaining:
+        ready = [name for name, deps in remaining.items() if deps <= resolved]
+        if not ready:
+            raise ValueError(
+                f"Circular dependency between steps: {', '.join(sorted(remaining))}."
+            )
+        for name in ready:
+            resolved.add(name)
+            del remaining[name]
+
+    return dependencies
+
+
+def _run_step(step: Step, buffered: bool) -> None:
+    with span(step.name, "step"), process_step(step.name, step.timeout, buffered):
+        step.action()
+
+
+def run_steps(steps: list[Step], jobs: int = 1) -> None:
+    """Run the steps on up to `jobs` worker threads, respecting their dependencies.
+
+    Ready steps are started in the order they are listed, so with a single job
+    the steps run in list order. When a step fails, no further steps are
+    started, running steps are allowed to finish and the error of the first
+    failed step (in list order) is raised. On Ctrl-C, the child processes of
+    the running steps are stopped.
+
+    With several jobs, the output of each step's child processes is buffered
+    and printed when the step ends, so that the output of concurrent steps is
+    not interleaved.
+    """
+
+    dependencies = get_dependencies(steps)
+    jobs = max(1, jobs)
+
+    pending = list(steps)
+    running = {}
+    held_locks = set()
+    done = set()
+    failures = {}
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            if not failures:
+                for step in list(pending):
+                    if len(running) >= jobs:
+                        break
+                    if not dependencies[step.name] <= done:
+                        continue
+                    if held_locks.intersection(step.locks):
+                        continue
+
+                    pending.remove(step)
+                    held_locks.update(step.locks)
+                    running[pool.submit(_run_step, step, jobs > 1)] = step
+
+            if not running:
+                break
+
+            try:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            except KeyboardInterrupt:
+                # The pool waits for the running steps, which fail as soon
+                # as their children are stopped
+                cancel_all()
+                raise
+            for future in finished:
+                step = running.pop(future)
+                held_locks.difference_update(step.locks)
+                error = future.exception()
+                if error is None:
+                    done.add(step.name)
+                else:
+                    failures[step.name] = error
+
+    if failures:
+        first_failed = next(step for step in steps if step.name in failures)
+        if pending:
+            skipped = ", ".join(step.name for step in pending)
+            print(f"Step {first_failed.name} failed, skipping: {skipped}.")
+        raise failures[first_failed.name]
@@ -0,0 +1,67 @@
+import os
+import json
+import time
+import socket
+from contextlib import contextmanager
+
+from pymol_wizard_installer.cache import get_cache_dir
+from pymol_wizard_installer.file_locks import file_lock
+
+# Durations kept for each kind of step, most recent last
+MAX_SAMPLES = 10
+
+
+def get_timings_file() -> str:
+    """Get the file recording the step durations measured on this host."""
+
+    return os.path.join(
+        get_cache_dir("timings", create=False), f"{socket.gethostname()}.json"
+    )
+
+
+def load_timings() -> dict[str, list[float]]:
+    try:
+        with open(get_timings_file(), "r") as f:
+            timings = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return timings if isinstance(timings, dict) else {}
+
+
+def record_duration(key: str, seconds: float) -> None:
+    """Add the duration of a step to the ones recorded for its kind."""
+
+    timings_file = get_timings_file()
+    os.makedirs(os.path.dirname(timings_file), exist_ok=True)
+    with file_lock(f"timings {timings_file}", "the step timings"):
+        timings = load_timings()
+        samples = timings.setdefault(key, [])
+        samples.append(round(seconds, 3))
+        del samples[:-MAX_SAMPLES]
+
+        tmp_file = f"{timings_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(timings, f, indent=2)
+        os.replace(tmp_file, timings_file)
+
+
+@contextmanager
+def timed(key: str):
+    """Record the duration of a block under key, if it completes."""
+
+    start = time.perf_counter()
+    yield
+    record_duration(key, time.perf_counter() - start)
+
+
+def get_estimate(timings: dict[str, list[float]], key: str) -> float | None:
+    """Estimate the duration of a step from the median of its recorded durations."""
+
+    samples = sorted(timings.get(key) or [])
+    if not samples:
+        return None
+
+    middle = len(samples) // 2
+    if len(samples) % 2:
+        return samples[middle]
+    return (samples[middle - 1] + samples[middle]) / 2
@@ -1,95 +1,138 @@
 import os
-import sys
-from pathlib import Path
-import subprocess
-import re
-import fileinput
-import yaml
-import toml
 import argparse
 
-from pymol_wizard_installer.wizard_metadata import WizardMetadata
+from pymol_wizard_installer.cli import (
+    add_package_manager_argument,
+    add_wizards_dir_argument,
+)
 
 
-def parse_wizard_metadata(metadata_file):
-    """Parse the wizard metadata file."""
+def uninstall_packages(package_names, env_name):
+    """Uninstalls Python packages using a single pip call."""
 
-    stream = open(Path(metadata_file), "r")
-    raw_metadata = yaml.safe_load(stream)
+    from pymol_wizard_installer.env_runner import run_in_env
 
-    return WizardMetadata(
-        raw_metadata["name"],
-        raw_metadata["menu_entry"],
-        raw_metadata["default_env"],
-        raw_metadata["python_version"],
-        raw_metadata["pymol_version"],
-        raw_metadata["openvr_version"],
-        raw_metadata["pre_script"],
-        raw_metadata["post_script"],
+    if not package_names:
+        return
+
+    run_in_env(env_name, ["pip", "uninstall", "-y", *package_names], check=True)
+    print(f"Successfully uninstalled {', '.join(package_names)} from {env_name}")
+
+
+def get_pymol_dir(prefix, python_versions):
+    """Get the PyMOL installation directory in the prefix."""
+
+    from pymol_wizard_installer.installer import get_installer
+
+    installer = get_installer()
+    candidates = [
+        installer.get_pymol_dir(prefix, python_version)
+        for python_version in python_versions
+    ]
+    for candidate in candidates:
+        if os.path.isdir(candidate):
+            return candidate
+    return candidates[0]
+
+
+def uninstall_from_env(
+    env_name, conda_base_path, wizards, package_names, buffered=False
+):
+    """Remove the wizards' packages, files and menu entries from an environment."""
+
+    from pymol_wizard_installer.file_locks import environment_lock
+    from pymol_wizard_installer.process_runner import process_step
+
+    with environment_lock(env_name, conda_base_path), process_step(
+        env_name, buffered=buffered
+    ):
+        _uninstall_from_env(env_name, conda_base_path, wizards, package_names)
+
+
+def _uninstall_from_env(env_name, conda_base_path, wizards, package_names):
+    from pymol_wizard_installer.env_discovery import find_env_prefix
+    from pymol_wizard_installer.install_manifest import InstallManifest
+    from pymol_wizard_installer.menu_patcher import (
+        EXTERNAL_GUI,
+        INTERNAL_GUI,
+        patch_menu,
     )
 
+    prefix = find_env_prefix(env_name, conda_base_path)
+    if prefix is None:
+        raise FileNotFoundError(f"Environment {env_name} does not exist.")
+
+    print(f"Uninstalling packages from {env_name}...")
+    uninstall_packages(package_names, env_name)
 
-def remove_line(file, pattern_to_remove):
-    print(f"Processing file: {file}")
-    with fileinput.FileInput(file, inplace=True, backup=".bak") as opened_file:
-        for line in opened_file:
-            if not pattern_to_remove.search(line):
-                sys.stdout.write(line)
-
-
-def get_package_name_from_toml(package_root):
-    """Reads the package name from pyproject.toml."""
-
-    toml_path = os.path.join(package_root, "pyproject.toml")
-    if not os.path.exists(toml_path):
-        print(f"Error: pyproject.toml not found in {package_root}")
-        return None
-
-    try:
-        with open(toml_path, "r") as f:
-            data = toml.load(f)
-            if "project" in data and "name" in data["project"]:
-                return data["project"]["name"]
-            else:
-                print("Error: 'project.name' not found in pyproject.toml")
-                return None
-    except toml.TomlDecodeError as e:
-        print(f"Error decoding pyproject.toml: {e}")
-        return None
-    except FileNotFoundError:
-        print(f"Error: pyproject.toml not found at {toml_path}")
-        return None
-
-
-def uninstall_package(package_name, env_name):
-    """Uninstalls a Python package using pip."""
-
-    try:
-        subprocess.run(
-            ["conda", "run", "-n", env_name, "pip", "uninstall", "-y", package_name],
-            shell=True,
-        )
-        print(f"Successfully uninstalled {package_name}")
-    except subprocess.CalledProcessError as e:
-        print(f"Error uninstalling {package_name}: {e}")
+    print(f"Removing files from {env_name}...")
+    pymol_dir = get_pymol_dir(
+        prefix,
+        list(dict.fromkeys(str(metadata.python_version) for metadata in wizards)),
+    )
+    installed_wizard_dir = os.path.join(pymol_dir, "wizard")
+    for wizard_metadata in wizards:
+        wizard_file = os.path.join(installed_wizard_dir, f"{wizard_metadata.name}.py")
+        if os.path.islink(wizard_file):
+            # Installed with --link: only the link is removed, not its target
+            print(f"Removing link {wizard_file} -> {os.readlink(wizard_file)}")
+        try:
+            os.remove(wizard_file)
+        except FileNotFoundError:
+            print(f"No files to delete for {wizard_metadata.name}.")
+            pass
+
+    print(f"Removing menu entries from {env_name}...")
+    names = [wizard_metadata.name for wizard_metadata in wizards]
+    patch_menu(
+        os.path.join(installed_wizard_dir, "openvr.py"),
+        INTERNAL_GUI,
+        remove=names,
+    )
+    patch_menu(
+        os.path.join(pymol_dir, "_gui.py"),
+        EXTERNAL_GUI,
+        remove=names,
+    )
+
+    manifest = InstallManifest.load(prefix)
+    for name in names:
+        manifest.forget(name)
 
 
 def parse_args():
     """Parse and return command line arguments."""
 
     parser = argparse.ArgumentParser(
-        prog="uninstall_wizard", description="Uninstall a PyMOL wizard."
+        prog="uninstall_wizard", description="Uninstall PyMOL wizards."
     )
     parser.add_argument(
-        "wizard_root",
+        "wizard_roots",
         type=str,
-        help="Path to the wizard's root directory.",
+        nargs="+",
+        metavar="wizard_root",
+        help="Path to the wizard's root directory, or the name of a wizard in the wizards directory. Several wizards can be uninstalled at once.",
     )
 
+    add_wizards_dir_argument(parser)
+
     parser.add_argument(
         "--env_name",
         type=str,
-        help="Name of the conda environment to uninstall from.",
+        action="append",
+        help="Name of the conda environment to uninstall from. Can be repeated.",
+    )
+
+    add_package_manager_argument(
+        parser,
+        "Package manager used to manage the environments, or the path of its executable. Defaults to $PYMOL_WIZARD_INSTALLER_PACKAGE_MANAGER, or the fastest one installed.",
+    )
+
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=min(4, os.cpu_count() or 1),
+        help="Maximum number of environments to process concurrently.",
     )
 
     return parser.parse_args()
@@ -97,86 +140,96 @@ def parse_args():
 
 def main():
     args = parse_args()
-    wizard_metadata = parse_wizard_metadata(
-        os.path.join(args.wizard_root, "metadata.yaml")
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    from pymol_wizard_installer.install_manifest import find_recorded_envs
+    from pymol_wizard_installer.package_manager import (
+        get_package_manager,
+        set_package_manager,
     )
+    from pymol_wizard_installer.process_runner import cancel_all
+    from pymol_wizard_installer.wizard_metadata import read_package_name
+    from pymol_wizard_installer.wizard_registry import resolve_wizards
+
+    set_package_manager(args.package_manager)
+    resolved = resolve_wizards(args.wizard_roots, args.wizards_dir)
+    wizard_roots = [wizard_root for wizard_root, _ in resolved]
+    wizards = [wizard_metadata for _, wizard_metadata in resolved]
+    names = ", ".join(wizard_metadata.name for wizard_metadata in wizards)
+
+    conda_base_path = get_package_manager().get_base()
+    if conda_base_path is None:
+        print("Failed to retrieve conda base path.")
+        exit(1)
 
     if args.env_name:
-        env_name = args.env_name
-        print(f"Using recorded environment name: {env_name}.")
+        env_names = list(dict.fromkeys(args.env_name))
+        print(f"Using provided environment names: {', '.join(env_names)}.")
     else:
-        print(
-            f'The conda environment used in the installation was not recorded. Please enter the name of the environment, or leave empty for default ("{wizard_metadata.default_env}"):'
+        env_names = find_recorded_envs(
+            conda_base_path, [wizard_metadata.name for wizard_metadata in wizards]
         )
+        if env_names:
+            print(f"Using recorded environment names: {', '.join(env_names)}.")
+        else:
+            default_envs = list(
+                dict.fromkeys(
+                    wizard_metadata.default_env for wizard_metadata in wizards
+                )
+            )
+            print(
+                f'The conda environment used in the installation was not recorded. Please enter the names of the environments, or leave empty for default ("{" ".join(default_envs)}"):'
+            )
+            try:
+                env_names = input().replace(",", " ").split() or default_envs
+            except KeyboardInterrupt:
+                print("Aborted by user.")
+                exit(0)
+
+    package_names = []
+    for wizard_root in wizard_roots:
+        package_name = read_package_name(wizard_root)
+        if package_name is not None:
+            package_names.append(package_name)
+
+    # The output of each environment is printed at once when several are
+    # processed concurrently
+    jobs = max(1, args.jobs)
+    buffered = jobs > 1 and len(env_names) > 1
+    failures = {}
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            env_name: pool.submit(
+                uninstall_from_env,
+                env_name,
+                conda_base_path,
+                wizards,
+                package_names,
+                buffered,
+            )
+            for env_name in env_names
+        }
         try:
-            env_name = input().strip()
-            if not env_name:
-                env_name = wizard_metadata.default_env
+            for env_name, future in futures.items():
+                error = future.exception()
+                if error is not None:
+                    failures[env_name] = error
         except KeyboardInterrupt:
-            print("Aborted by user.")
-            exit(0)
-
-    try:
-        conda_base_path = str(
-            subprocess.check_output("conda info --base", shell=True), "utf-8"
-        ).strip()
-    except subprocess.CalledProcessError:
-        print("Failed to retrieve conda base path.")
-        exit(1)
-
-    prefix = os.path.join(conda_base_path, "envs", env_name)
-    if prefix is None:
-        print("Something went wrong. Please check the conda environment name.")
+            cancel_all()
+            raise
+
+    for env_name in env_names:
+        if env_name in failures:
+            print(
+                f"Failed to uninstall {names} from environment {env_name}: {failures[env_name]}"
+            )
+        else:
+            print(f"Successfully uninstalled {names} from environment {env_name}.")
+
+    if failures:
         exit(1)
 
-    print("Uninstalling package...")
-    uninstall_package(get_package_name_from_toml(args.wizard_root), args.env_name)
-
-    print("Removing files...")
-    if os.name == "nt":
-        pymol_dir = os.path.join(
-            prefix,
-            "Lib",
-            "site-packages",
-            "pymol",
-        )
-    else:
-        pymol_dir = os.path.join(
-            prefix,
-            "lib",
-            f"python{wizard_metadata.python_version}",
-            "site-packages",
-            "pymol",
-        )
-
-    installed_wizard_dir = os.path.join(pymol_dir, "wizard")
-    try:
-        os.remove(os.path.join(installed_wizard_dir, f"{wizard_metadata.name}.py"))
-    except FileNotFoundError:
-        print("No files to delete.")
-        pass
-
-    print("Removing menu entries...")
-    openvr_wizard_file = os.path.join(pymol_dir, "wizard", "openvr.py")
-    openvr_entry = (
-        f"[1, '{wizard_metadata.menu_entry}', 'wizard {wizard_metadata.name}'],\n"
-    )
-    openvr_entry_pattern = re.compile(
-        openvr_entry.replace("[", r"\[").replace("]", r"\]")
-    )
-    remove_line(openvr_wizard_file, openvr_entry_pattern)
-
-    gui_file = os.path.join(pymol_dir, "_gui.py")
-    external_entry = f"('command', '{wizard_metadata.menu_entry}', 'wizard {wizard_metadata.name}'),\n"
-    external_entry_pattern = re.compile(
-        external_entry.replace("(", r"\(").replace(")", r"\)")
-    )
-    remove_line(gui_file, external_entry_pattern)
-
-    print(
-        f"Successfully uninstalled wizard {wizard_metadata.name} from environment {env_name}."
-    )
-
 
 if __name__ == "__main__":
     main()
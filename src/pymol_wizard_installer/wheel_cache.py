@@ -0,0 +1,188 @@
+import os
+import glob
+import json
+import time
+import shutil
+import sysconfig
+import subprocess
+
+from pymol_wizard_installer.cache import (
+    get_cache_dir,
+    get_file_digest,
+    get_key_digest,
+    list_entries as list_cache_entries,
+    prune_entries,
+    read_entry,
+    touch_entry,
+    write_entry,
+)
+from pymol_wizard_installer.build_jobs import get_build_environ, get_build_jobs
+from pymol_wizard_installer.env_runner import run_in_env
+
+_PROBE_SCRIPT = """
+import json, os, platform, shlex, subprocess, sys, sysconfig
+
+compiler = os.environ.get("CXX") or sysconfig.get_config_var("CXX") or "c++"
+try:
+    compiler_version = subprocess.run(
+        [shlex.split(compiler)[0], "--version"],
+        capture_output=True,
+        text=True,
+        timeout=30,
+    ).stdout.splitlines()[0]
+except (OSError, IndexError, subprocess.SubprocessError):
+    compiler_version = platform.python_compiler()
+
+print(json.dumps({
+    "python_version": platform.python_version(),
+    "platform": sysconfig.get_platform(),
+    "abi": sysconfig.get_config_var("SOABI") or sys.implementation.cache_tag,
+    "compiler": compiler_version,
+}))
+"""
+
+
+def get_wheels_dir(create: bool = True) -> str:
+    return get_cache_dir("wheels", "pymol", create=create)
+
+
+def get_build_key(env_name: str, pymol_version: str, use_openvr: bool) -> dict | None:
+    """Compute the cache key identifying a PyMOL build for the given environment."""
+
+    try:
+        output = run_in_env(
+            env_name,
+            ["python", "-c", _PROBE_SCRIPT],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        probe = json.loads(output.strip().splitlines()[-1])
+    except (subprocess.CalledProcessError, json.JSONDecodeError, IndexError):
+        return None
+
+    return {
+        "pymol_version": pymol_version,
+        "openvr": use_openvr,
+        **probe,
+    }
+
+
+def find_cached_wheel(key: dict, wheels_dir: str | None = None) -> str | None:
+    """Get the path of the cached wheel for a build key, if present and intact."""
+
+    entry_dir = os.path.join(wheels_dir or get_wheels_dir(), get_key_digest(key))
+    entry = read_entry(entry_dir)
+    if entry is None:
+        return None
+
+    wheel = os.path.join(entry_dir, entry["wheel"])
+    if not os.path.exists(wheel) or get_file_digest(wheel) != entry["sha256"]:
+        print(f"Cached wheel {entry['wheel']} is corrupt, discarding it.")
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        return None
+
+    touch_entry(entry_dir, entry)
+
+    return wheel
+
+
+def find_compatible_entries(pymol_version: str, use_openvr: bool) -> list[dict]:
+    """List the cached wheels of a PyMOL version built for this platform, whatever their ABI.
+
+    Unlike get_build_key(), this does not need an environment to probe, so
+    it can tell whether an environment yet to be created will likely reuse a
+    cached build.
+    """
+
+    wheels_dir = get_wheels_dir(create=False)
+    if not os.path.isdir(wheels_dir):
+        return []
+
+    return [
+        entry
+        for entry in list_cache_entries(wheels_dir)
+        if entry["key"].get("pymol_version") == pymol_version
+        and entry["key"].get("openvr") == use_openvr
+        and entry["key"].get("platform") == sysconfig.get_platform()
+    ]
+
+
+def store_wheel(key: dict, wheel: str, wheels_dir: str | None = None) -> str:
+    """Store a freshly built wheel in the cache and return its cached path."""
+
+    digest = get_key_digest(key)
+    entry_dir = os.path.join(wheels_dir or get_wheels_dir(), digest)
+    staging_dir = f"{entry_dir}.{os.getpid()}.tmp"
+    os.makedirs(staging_dir, exist_ok=True)
+
+    wheel_name = os.path.basename(wheel)
+    shutil.copy2(wheel, os.path.join(staging_dir, wheel_name))
+    write_entry(
+        staging_dir,
+        {
+            "key": key,
+            "wheel": wheel_name,
+            "sha256": get_file_digest(os.path.join(staging_dir, wheel_name)),
+            "created": time.time(),
+            "last_used": time.time(),
+        },
+    )
+
+    shutil.rmtree(entry_dir, ignore_errors=True)
+    os.replace(staging_dir, entry_dir)
+
+    return os.path.join(entry_dir, wheel_name)
+
+
+def build_wheel(env_name: str, source_dir: str, use_openvr: bool, key: dict) -> str:
+    """Build a PyMOL wheel from source in the environment and store it in the cache."""
+
+    wheel_dir = os.path.join(get_wheels_dir(), f"build.{os.getpid()}.tmp")
+    shutil.rmtree(wheel_dir, ignore_errors=True)
+    try:
+        run_in_env(
+            env_name,
+            [
+                "pip",
+                "wheel",
+                "--no-deps",
+                "--config-settings",
+                f"openvr={use_openvr}",
+                "--config-settings",
+                f"jobs={get_build_jobs()}",
+                "--wheel-dir",
+                wheel_dir,
+                source_dir,
+            ],
+            env=get_build_environ(),
+            check=True,
+        )
+        wheels = glob.glob(os.path.join(wheel_dir, "pymol-*.whl"))
+        if not wheels:
+            raise FileNotFoundError(f"No PyMOL wheel was produced in {wheel_dir}.")
+
+        return store_wheel(key, wheels[0])
+    finally:
+        shutil.rmtree(wheel_dir, ignore_errors=True)
+
+
+def list_entries() -> list[dict]:
+    """List the cached wheels, most recently used first."""
+
+    return list_cache_entries(get_wheels_dir())
+
+
+def prune(max_age_days: float | None = None, max_size: int | None = None) -> list[dict]:
+    """Remove cached wheels that are broken, unused or over the size budget."""
+
+    return prune_entries(get_wheels_dir(), max_age_days, max_size)
+
+
+def describe_entry(entry: dict) -> str:
+    key = entry["key"]
+    if not key:
+        return "(incomplete entry)"
+
+    openvr = "openvr" if key["openvr"] else "no openvr"
+    return f"pymol {key['pymol_version']}, {openvr}, python {key['python_version']}, {key['platform']}"
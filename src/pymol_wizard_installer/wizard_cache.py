@@ -0,0 +1,96 @@
+import time
+import argparse
+import importlib
+
+# Caches managed by this tool, by the module that provides their
+# list_entries(), prune() and describe_entry(). The modules are only
+# imported when their cache is used.
+CACHES = {
+    "pymol-wheels": "wheel_cache",
+    "openvr": "openvr_cache",
+    "git-mirrors": "git_mirror",
+    "wizard-wheels": "wizard_wheelhouse",
+}
+
+
+def get_cache_module(name: str):
+    return importlib.import_module(f"pymol_wizard_installer.{CACHES[name]}")
+
+
+def parse_args():
+    """Parse and return command line arguments."""
+
+    parser = argparse.ArgumentParser(
+        prog="wizard_cache", description="Inspect and prune the installer's caches."
+    )
+    parser.add_argument(
+        "--cache",
+        choices=sorted(CACHES),
+        action="append",
+        help="Cache to operate on. Can be repeated. Defaults to all caches.",
+    )
+
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="List the cache entries.")
+    subparsers.add_parser("size", help="Report the size of the caches.")
+
+    prune_parser = subparsers.add_parser("prune", help="Remove cache entries.")
+    prune_parser.add_argument(
+        "--older-than",
+        type=float,
+        metavar="DAYS",
+        help="Remove entries not used in the last DAYS days.",
+    )
+    prune_parser.add_argument(
+        "--max-size",
+        type=float,
+        metavar="MIB",
+        help="Remove the least recently used entries until each cache fits in MIB mebibytes.",
+    )
+    prune_parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Remove all entries.",
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    from pymol_wizard_installer.cache import get_cache_root, format_size
+
+    selected = args.cache or sorted(CACHES)
+
+    if args.command == "list":
+        for name in selected:
+            print(f"{name}:")
+            for entry in get_cache_module(name).list_entries():
+                last_used = time.strftime(
+                    "%Y-%m-%d %H:%M", time.localtime(entry["last_used"])
+                )
+                print(
+                    f"  {entry['digest'][:12]}  {format_size(entry['size']):>10}  {last_used}  {get_cache_module(name).describe_entry(entry)}"
+                )
+    elif args.command == "size":
+        total = 0
+        for name in selected:
+            entries = get_cache_module(name).list_entries()
+            size = sum(entry["size"] for entry in entries)
+            total += size
+            print(f"{name}: {len(entries)} entries, {format_size(size)}")
+        print(f"Total: {format_size(total)} in {get_cache_root()}")
+    elif args.command == "prune":
+        max_size = 0 if args.all else args.max_size
+        for name in selected:
+            removed = get_cache_module(name).prune(
+                max_age_days=args.older_than,
+                max_size=None if max_size is None else int(max_size * 1024 * 1024),
+            )
+            freed = sum(entry["size"] for entry in removed)
+            print(f"{name}: removed {len(removed)} entries, freed {format_size(freed)}")
+
+
+if __name__ == "__main__":
+    main()
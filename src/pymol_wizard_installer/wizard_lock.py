@@ -0,0 +1,90 @@
+import os
+import argparse
+
+from pymol_wizard_installer.cli import add_package_manager_argument
+
+
+def parse_args():
+    """Parse and return command line arguments."""
+
+    parser = argparse.ArgumentParser(
+        prog="wizard_lock",
+        description="Check and refresh the lockfiles of wizard environment files.",
+    )
+
+    add_package_manager_argument(
+        parser,
+        "Package manager used to solve and list the environments, or the path of its executable.",
+    )
+
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    check_parser = subparsers.add_parser(
+        "check", help="Check that the lockfiles are present and up to date."
+    )
+    check_parser.add_argument("env_files", nargs="+", metavar="ENV_FILE")
+
+    refresh_parser = subparsers.add_parser(
+        "refresh", help="Solve the environment files again and rewrite their locks."
+    )
+    refresh_parser.add_argument("env_files", nargs="+", metavar="ENV_FILE")
+    refresh_parser.add_argument(
+        "--env_name",
+        type=str,
+        help="Lock the packages of an existing environment solved from the file, instead of solving it again.",
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    import subprocess
+
+    from pymol_wizard_installer.env_lock import (
+        get_lock_file,
+        is_lock_up_to_date,
+        refresh_lock,
+        write_lock,
+    )
+    from pymol_wizard_installer.package_manager import set_package_manager
+
+    set_package_manager(args.package_manager)
+    env_files = [os.path.abspath(env_file) for env_file in args.env_files]
+
+    if args.command == "check":
+        outdated = 0
+        for env_file in env_files:
+            lock_file = get_lock_file(env_file)
+            if not os.path.exists(lock_file):
+                print(f"{env_file}: missing lock {lock_file}")
+                outdated += 1
+            elif not is_lock_up_to_date(env_file, lock_file):
+                print(f"{env_file}: out-of-date lock {lock_file}")
+                outdated += 1
+            else:
+                print(f"{env_file}: up to date")
+
+        if outdated:
+            exit(1)
+    elif args.command == "refresh":
+        if args.env_name and len(env_files) > 1:
+            print("--env_name can only be used with a single environment file.")
+            exit(1)
+
+        for env_file in env_files:
+            try:
+                if args.env_name:
+                    lock_file = write_lock(env_file, env_name=args.env_name)
+                else:
+                    lock_file = refresh_lock(env_file)
+            except subprocess.CalledProcessError as e:
+                print(f"Failed to lock {env_file}: {e}")
+                exit(1)
+
+            if lock_file is None:
+                exit(1)
+
+
+if __name__ == "__main__":
+    main()
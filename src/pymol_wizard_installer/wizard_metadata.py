@@ -1,4 +1,35 @@
+import os
+
+# Keys of metadata.yaml: (key, accepted types, required)
+METADATA_SCHEMA = [
+    ("name", (str,), True),
+    ("menu_entry", (str,), True),
+    ("default_env", (str,), True),
+    ("python_version", (str, int, float), True),
+    ("pymol_version", (str, int, float), True),
+    ("openvr_version", (str, int, float), True),
+    ("pre_script", (str, type(None)), False),
+    ("post_script", (str, type(None)), False),
+    ("use_vr", (bool,), False),
+]
+
+
+class MetadataError(Exception):
+    pass
+
+
 class WizardMetadata:
+    __slots__ = (
+        "name",
+        "menu_entry",
+        "default_env",
+        "python_version",
+        "pymol_version",
+        "openvr_version",
+        "pre_script",
+        "post_script",
+    )
+
     name: str
     menu_entry: str
     default_env: str
@@ -27,3 +58,92 @@ class WizardMetadata:
         self.openvr_version = openvr_version
         self.pre_script = pre_script
         self.post_script = post_script
+
+    def as_tuple(self) -> tuple:
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+
+def validate_metadata(raw_metadata) -> list[str]:
+    """Check parsed metadata against the schema, returning the problems found."""
+
+    if not isinstance(raw_metadata, dict):
+        return ["the file does not contain a mapping"]
+
+    errors = []
+    for key, types, required in METADATA_SCHEMA:
+        if key not in raw_metadata:
+            if required:
+                errors.append(f"missing key '{key}'")
+        elif not isinstance(raw_metadata[key], types) or (
+            bool not in types and isinstance(raw_metadata[key], bool)
+        ):
+            expected = " or ".join(
+                "null" if t is type(None) else t.__name__ for t in types
+            )
+            errors.append(f"'{key}' must be {expected}")
+
+    name = raw_metadata.get("name")
+    if isinstance(name, str) and not name.isidentifier():
+        errors.append(f"'name' must be a valid Python identifier, not '{name}'")
+    return errors
+
+
+def parse_wizard_metadata(metadata_file: str) -> WizardMetadata:
+    """Parse and validate the wizard metadata file."""
+
+    import yaml
+
+    try:
+        with open(metadata_file, "r") as f:
+            raw_metadata = yaml.safe_load(f)
+    except FileNotFoundError:
+        raise MetadataError(f"{metadata_file} not found")
+    except yaml.YAMLError as e:
+        raise MetadataError(f"{metadata_file} is not valid YAML: {e}")
+
+    errors = validate_metadata(raw_metadata)
+    if errors:
+        raise MetadataError(f"{metadata_file}: {'; '.join(errors)}")
+
+    return WizardMetadata(
+        raw_metadata["name"],
+        raw_metadata["menu_entry"],
+        raw_metadata["default_env"],
+        str(raw_metadata["python_version"]),
+        str(raw_metadata["pymol_version"]),
+        str(raw_metadata["openvr_version"]),
+        raw_metadata.get("pre_script") or "",
+        raw_metadata.get("post_script") or "",
+    )
+
+
+def load_wizard_metadata(wizard_root: str) -> WizardMetadata:
+    """Parse the metadata of a wizard, exiting with an error if it is invalid."""
+
+    try:
+        return parse_wizard_metadata(os.path.join(wizard_root, "metadata.yaml"))
+    except MetadataError as e:
+        print(f"Invalid wizard metadata: {e}")
+        exit(1)
+
+
+def read_package_name(wizard_root: str) -> str | None:
+    """Read the package name from the wizard's pyproject.toml."""
+
+    import tomllib
+
+    toml_path = os.path.join(wizard_root, "pyproject.toml")
+    try:
+        with open(toml_path, "rb") as f:
+            data = tomllib.load(f)
+    except FileNotFoundError:
+        print(f"Error: pyproject.toml not found in {wizard_root}")
+        return None
+    except tomllib.TOMLDecodeError as e:
+        print(f"Error decoding pyproject.toml: {e}")
+        return None
+
+    name = data.get("project", {}).get("name")
+    if name is None:
+        print("Error: 'project.name' not found in pyproject.toml")
+    return name
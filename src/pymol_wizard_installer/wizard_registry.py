@@ -0,0 +1,248 @@
+import os
+import argparse
+
+from pymol_wizard_installer.wizard_metadata import (
+    MetadataError,
+    WizardMetadata,
+    load_wizard_metadata,
+    parse_wizard_metadata,
+    read_package_name,
+)
+
+INDEX_VERSION = 1
+
+
+def get_wizards_dir(wizards_dir: str | None = None) -> str | None:
+    """Get the directory of wizards, defaulting to PYMOL_WIZARD_INSTALLER_WIZARDS_DIR."""
+
+    wizards_dir = wizards_dir or os.environ.get("PYMOL_WIZARD_INSTALLER_WIZARDS_DIR")
+    return os.path.abspath(os.path.expanduser(wizards_dir)) if wizards_dir else None
+
+
+def get_index_file(wizards_dir: str) -> str:
+    from pymol_wizard_installer.cache import get_cache_dir, get_key_digest
+
+    digest = get_key_digest({"wizards_dir": os.path.normcase(wizards_dir)})[:16]
+    return os.path.join(get_cache_dir("registry", create=False), f"{digest}.json")
+
+
+def _get_stamp(wizard_root: str) -> list:
+    """Modification times and sizes of the files an index entry is derived from."""
+
+    paths = [
+        os.path.join(wizard_root, "metadata.yaml"),
+        os.path.join(wizard_root, "pyproject.toml"),
+    ]
+    envs_dir = os.path.join(wizard_root, "envs")
+    if os.path.isdir(envs_dir):
+        paths.extend(sorted(entry.path for entry in os.scandir(envs_dir)))
+
+    stamp = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            stamp.append([os.path.basename(path), stat.st_mtime_ns, stat.st_size])
+        except FileNotFoundError:
+            stamp.append(None)
+    return stamp
+
+
+def index_wizard(wizard_root: str) -> dict:
+    """Build the index entry of a wizard, recording why it is invalid if it is."""
+
+    from pymol_wizard_installer.cache import get_file_digest
+    from pymol_wizard_installer.installer import get_installer
+
+    entry = {"path": wizard_root, "stamp": _get_stamp(wizard_root)}
+    try:
+        metadata = parse_wizard_metadata(os.path.join(wizard_root, "metadata.yaml"))
+        env_file = get_installer().get_env_file(wizard_root)
+    except (MetadataError, FileNotFoundError) as e:
+        entry["error"] = str(e)
+        return entry
+
+    entry["metadata"] = list(metadata.as_tuple())
+    entry["env_file"] = env_file
+    entry["env_file_digest"] = get_file_digest(env_file)
+    entry["package_name"] = read_package_name(wizard_root)
+    return entry
+
+
+def load_index(wizards_dir: str) -> dict:
+    import json
+
+    try:
+        with open(get_index_file(wizards_dir), "r") as f:
+            index = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        index = None
+
+    if index is None or index.get("version") != INDEX_VERSION:
+        index = {"version": INDEX_VERSION, "wizards": {}, "names": {}}
+    return index
+
+
+def save_index(wizards_dir: str, index: dict) -> None:
+    """Atomically write the index, so that concurrent readers never see a partial one."""
+
+    import json
+
+    index_file = get_index_file(wizards_dir)
+    os.makedirs(os.path.dirname(index_file), exist_ok=True)
+    tmp_file = f"{index_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(index, f, separators=(",", ":"))
+    os.replace(tmp_file, index_file)
+
+
+def _update_names(index: dict) -> None:
+    names = {}
+    for directory, entry in sorted(index["wizards"].items()):
+        if "metadata" not in entry:
+            continue
+
+        name = entry["metadata"][0]
+        if name in names:
+            entry["error"] = (
+                f"the name '{name}' is already used by {index['wizards'][names[name]]['path']}"
+            )
+        else:
+            entry.pop("error", None)
+            names[name] = directory
+    index["names"] = names
+
+
+def refresh_index(wizards_dir: str, save: bool = True) -> dict:
+    """Scan the directory of wizards, re-indexing only those that changed since the last scan.
+
+    The updated index is saved unless save is False.
+    """
+
+    index = load_index(wizards_dir)
+    previous = index["wizards"]
+    wizards = {}
+    changed = False
+    for entry in os.scandir(wizards_dir):
+        if not entry.is_dir() or not os.path.exists(
+            os.path.join(entry.path, "metadata.yaml")
+        ):
+            continue
+
+        record = previous.get(entry.name)
+        if record is None or record["stamp"] != _get_stamp(entry.path):
+            record = index_wizard(entry.path)
+            changed = True
+        wizards[entry.name] = record
+
+    if changed or wizards.keys() != previous.keys():
+        index["wizards"] = wizards
+        _update_names(index)
+        if save:
+            save_index(wizards_dir, index)
+    return index
+
+
+def lookup(name: str, wizards_dir: str, update_index: bool = True) -> dict | None:
+    """Find a wizard by name, scanning the directory only if the index cannot answer."""
+
+    index = load_index(wizards_dir)
+    directory = index["names"].get(name)
+    if directory is not None:
+        record = index["wizards"][directory]
+        if record["stamp"] == _get_stamp(record["path"]):
+            return record
+
+    index = refresh_index(wizards_dir, save=update_index)
+    directory = index["names"].get(name)
+    return None if directory is None else index["wizards"][directory]
+
+
+def is_wizard_path(spec: str) -> bool:
+    return os.path.isdir(spec) or os.sep in spec or "/" in spec or spec.startswith(".")
+
+
+def resolve_wizards(
+    specs: list[str], wizards_dir: str | None = None, update_index: bool = True
+) -> list[tuple[str, WizardMetadata]]:
+    """Resolve wizard paths or names to their root directory and metadata, exiting on errors.
+
+    The index of the wizards directory is only read, not updated, if
+    update_index is False.
+    """
+
+    wizards_dir = get_wizards_dir(wizards_dir)
+    wizards = {}
+    for spec in specs:
+        if is_wizard_path(spec):
+            wizard_root = os.path.abspath(spec)
+            if wizard_root not in wizards:
+                wizards[wizard_root] = load_wizard_metadata(wizard_root)
+            continue
+
+        if wizards_dir is None:
+            print(
+                f"{spec} is not a directory. To install wizards by name, pass --wizards-dir or set PYMOL_WIZARD_INSTALLER_WIZARDS_DIR."
+            )
+            exit(1)
+
+        record = lookup(spec, wizards_dir, update_index)
+        if record is None:
+            print(f"No valid wizard named {spec} in {wizards_dir}.")
+            exit(1)
+        wizards.setdefault(record["path"], WizardMetadata(*record["metadata"]))
+
+    return list(wizards.items())
+
+
+def parse_args():
+    """Parse and return command line arguments."""
+
+    parser = argparse.ArgumentParser(
+        prog="wizard_registry",
+        description="Index a directory of wizards, so that they can be installed by name.",
+    )
+    parser.add_argument(
+        "--wizards-dir",
+        type=str,
+        help="Directory containing one wizard per subdirectory. Defaults to PYMOL_WIZARD_INSTALLER_WIZARDS_DIR.",
+    )
+
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser(
+        "list", help="Refresh the index and list the wizards, including invalid ones."
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    wizards_dir = get_wizards_dir(args.wizards_dir)
+    if wizards_dir is None or not os.path.isdir(wizards_dir):
+        print(
+            "Pass an existing --wizards-dir or set PYMOL_WIZARD_INSTALLER_WIZARDS_DIR."
+        )
+        exit(1)
+
+    if args.command == "list":
+        index = refresh_index(wizards_dir)
+        invalid = 0
+        for directory, record in sorted(index["wizards"].items()):
+            if "error" in record:
+                print(f"{directory}: invalid, {record['error']}")
+                invalid += 1
+                continue
+
+            metadata = WizardMetadata(*record["metadata"])
+            print(
+                f"{metadata.name}: '{metadata.menu_entry}', package {record['package_name']}, "
+                f"python {metadata.python_version}, pymol {metadata.pymol_version}, "
+                f"env file {os.path.relpath(record['env_file'], wizards_dir)} ({record['env_file_digest'][:12]})"
+            )
+
+        if invalid:
+            exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import os
+import re
+import csv
+import io
+import glob
+import base64
+import shutil
+import hashlib
+import zipfile
+import sysconfig
+import subprocess
+
+from pymol_wizard_installer.cache import (
+    get_cache_dir,
+    get_key_digest,
+    get_tree_digest,
+    list_entries as list_cache_entries,
+    prune_entries,
+)
+from pymol_wizard_installer.env_runner import run_in_env
+from pymol_wizard_installer.file_locks import file_lock
+from pymol_wizard_installer.wheel_cache import find_cached_wheel, store_wheel
+
+
+def get_wheelhouse_dir() -> str:
+    return get_cache_dir("wheels", "wizards")
+
+
+def get_wheel_key(wizard_root: str, python_version: str, source_digest=None) -> dict:
+    """Compute the key identifying the wheel of a wizard's current sources."""
+
+    return {
+        "wizard": os.path.basename(os.path.normpath(wizard_root)),
+        "source": source_digest or get_tree_digest(wizard_root),
+        "python_version": str(python_version),
+        "platform": sysconfig.get_platform(),
+    }
+
+
+def add_local_version(wheel: str, label: str) -> str:
+    """Rewrite a wheel next to the original so that its version carries a local label.
+
+    pip keeps an installed wheel of the same version, so labelling the wheels
+    with their source digest makes pip replace exactly the wizards whose
+    sources changed, without --force-reinstall, which would reinstall their
+    dependencies too.
+    """
+
+    name, version, tags = os.path.basename(wheel).split("-", 2)
+    local_version = f"{version}{'.' if '+' in version else '+'}{label}"
+    old_info = f"{name}-{version}.dist-info/"
+    new_info = f"{name}-{local_version}.dist-info/"
+    labelled_wheel = os.path.join(
+        os.path.dirname(wheel), f"{name}-{local_version}-{tags}"
+    )
+
+    records = io.StringIO()
+    writer = csv.writer(records, lineterminator="\n")
+    with zipfile.ZipFile(wheel) as source, zipfile.ZipFile(
+        labelled_wheel, "w", zipfile.ZIP_DEFLATED
+    ) as labelled:
+        for item in source.infolist():
+            filename = item.filename
+            data = source.read(item)
+            if filename.startswith(old_info):
+                filename = new_info + filename[len(old_info) :]
+            if filename == f"{new_info}RECORD":
+                continue
+            if filename == f"{new_info}METADATA":
+                data = re.sub(
+                    rb"^Version: .*$",
+                    f"Version: {local_version}".encode("utf-8"),
+                    data,
+                    count=1,
+                    flags=re.MULTILINE,
+                )
+
+            labelled_item = zipfile.ZipInfo(filename, item.date_time)
+            labelled_item.external_attr = item.external_attr
+            labelled.writestr(labelled_item, data, zipfile.ZIP_DEFLATED)
+            digest = base64.urlsafe_b64encode(hashlib.sha256(data).digest())
+            writer.writerow(
+                [filename, f"sha256={digest.rstrip(b'=').decode()}", len(data)]
+            )
+
+        writer.writerow([f"{new_info}RECORD", "", ""])
+        labelled.writestr(f"{new_info}RECORD", records.getvalue())
+
+    return labelled_wheel
+
+
+def build_wheel(env_name: str, wizard_root: str, key: dict) -> str:
+    """Build a wizard's wheel in the environment and store it in the wheelhouse."""
+
+    wheel_dir = os.path.join(get_wheelhouse_dir(), f"build.{os.getpid()}.tmp")
+    shutil.rmtree(wheel_dir, ignore_errors=True)
+    try:
+        run_in_env(
+            env_name,
+            ["pip", "wheel", "--no-deps", "--wheel-dir", wheel_dir, wizard_root],
+            check=True,
+        )
+        wheels = glob.glob(os.path.join(wheel_dir, "*.whl"))
+        if not wheels:
+            raise FileNotFoundError(f"No wheel was produced in {wheel_dir}.")
+
+        wheel = add_local_version(wheels[0], f"src{key['source'][:12]}")
+        return store_wheel(key, wheel, get_wheelhouse_dir())
+    finally:
+        shutil.rmtree(wheel_dir, ignore_errors=True)
+
+
+def get_wheel(
+    env_name: str, wizard_root: str, python_version: str, source_digest=None
+) -> str:
+    """Get the wheel of a wizard's current sources, building it only if they changed."""
+
+    key = get_wheel_key(wizard_root, python_version, source_digest)
+    with file_lock(
+        f"wizard-wheel {get_key_digest(key)}", f"the wheel of {wizard_root}"
+    ):
+        wheel = find_cached_wheel(key, get_wheelhouse_dir())
+        if wheel is None:
+            print(f"Building the wheel of {wizard_root}...")
+            wheel = build_wheel(env_name, wizard_root, key)
+        else:
+            print(f"Using cached wheel {os.path.basename(wheel)}...")
+
+    return wheel
+
+
+def install_wheels(env_name: str, wheels: list[str]) -> None:
+    """Install wizard wheels in an environment with a single pip call, without querying the index.
+
+    The versions of the wheels carry the digest of their sources, so pip only
+    replaces the wizards whose sources changed. Their dependencies are
+    resolved against the environment, and fetched from the index only if
+    some are missing.
+    """
+
+    find_links = []
+    for wheel in wheels:
+        find_links.extend(["--find-links", os.path.dirname(wheel)])
+
+    try:
+        run_in_env(
+            env_name,
+            ["pip", "install", "--no-index", *find_links, *wheels],
+            check=True,
+            stderr=subprocess.DEVNULL,
+        )
+    except subprocess.CalledProcessError:
+        print("Fetching the missing dependencies of the wizards...")
+        run_in_env(env_name, ["pip", "install", *find_links, *wheels], check=True)
+
+
+def list_entries() -> list[dict]:
+    """List the wizard wheels, most recently used first."""
+
+    return list_cache_entries(get_wheelhouse_dir())
+
+
+def prune(max_age_days: float | None = None, max_size: int | None = None) -> list[dict]:
+    """Remove wizard wheels that are broken, unused or over the size budget."""
+
+    return prune_entries(get_wheelhouse_dir(), max_age_days, max_size)
+
+
+def describe_entry(entry: dict) -> str:
+    key = entry["key"]
+    if not key:
+        return "(incomplete entry)"
+
+    return f"{entry['wheel']}, sources {key['source'][:12]}, python {key['python_version']}, {key['platform']}"
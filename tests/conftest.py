@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    """Keep every test out of the user's cache directory."""
+
+    monkeypatch.setenv("PYMOL_WIZARD_INSTALLER_CACHE", str(tmp_path / "cache"))
+    return tmp_path / "cache"
@@ -0,0 +1,108 @@
+import pytest
+
+from pymol_wizard_installer import build_jobs
+
+
+@pytest.fixture
+def cgroup_tree(tmp_path, monkeypatch):
+    """Point the cgroup lookups at a fixture /proc and /sys tree."""
+
+    proc_cgroup = tmp_path / "proc" / "self" / "cgroup"
+    cgroup_root = tmp_path / "sys" / "fs" / "cgroup"
+    proc_cgroup.parent.mkdir(parents=True)
+    cgroup_root.mkdir(parents=True)
+    monkeypatch.setattr(build_jobs, "PROC_CGROUP", str(proc_cgroup))
+    monkeypatch.setattr(build_jobs, "CGROUP_ROOT", str(cgroup_root))
+
+    def write(cgroups, files):
+        proc_cgroup.write_text(cgroups)
+        for path, content in files.items():
+            file = cgroup_root / path
+            file.parent.mkdir(parents=True, exist_ok=True)
+            file.write_text(content)
+
+    return write
+
+
+def test_v2_quota(cgroup_tree):
+    cgroup_tree("0::/user.slice/job\n", {"user.slice/job/cpu.max": "150000 100000\n"})
+
+    assert build_jobs.get_cgroup_cpu_limit() == 1.5
+
+
+def test_v2_quota_of_an_ancestor_applies(cgroup_tree):
+    cgroup_tree(
+        "0::/user.slice/job\n",
+        {
+            "user.slice/job/cpu.max": "max 100000\n",
+            "user.slice/cpu.max": "200000 100000\n",
+            "cpu.max": "400000 100000\n",
+        },
+    )
+
+    assert build_jobs.get_cgroup_cpu_limit() == 2
+
+
+def test_v2_without_quota(cgroup_tree):
+    cgroup_tree("0::/\n", {"cpu.max": "max 100000\n"})
+
+    assert build_jobs.get_cgroup_cpu_limit() is None
+
+
+def test_v1_quota(cgroup_tree):
+    cgroup_tree(
+        "4:cpu,cpuacct:/docker/abc\n2:memory:/docker/abc\n",
+        {
+            "cpu,cpuacct/docker/abc/cpu.cfs_quota_us": "300000\n",
+            "cpu,cpuacct/docker/abc/cpu.cfs_period_us": "100000\n",
+        },
+    )
+
+    assert build_jobs.get_cgroup_cpu_limit() == 3
+
+
+def test_v1_quota_mounted_at_own_cgroup(cgroup_tree):
+    cgroup_tree(
+        "4:cpu,cpuacct:/docker/abc\n",
+        {"cpu/cpu.cfs_quota_us": "50000\n", "cpu/cpu.cfs_period_us": "100000\n"},
+    )
+
+    assert build_jobs.get_cgroup_cpu_limit() == 0.5
+
+
+def test_v1_without_quota(cgroup_tree):
+    cgroup_tree(
+        "4:cpu,cpuacct:/\n",
+        {
+            "cpu,cpuacct/cpu.cfs_quota_us": "-1\n",
+            "cpu,cpuacct/cpu.cfs_period_us": "100000\n",
+        },
+    )
+
+    assert build_jobs.get_cgroup_cpu_limit() is None
+
+
+def test_hybrid_hierarchy_reads_v1_quota(cgroup_tree):
+    cgroup_tree(
+        "5:cpu,cpuacct:/docker/abc\n1:name=systemd:/docker/abc\n0::/docker/abc\n",
+        {
+            "cpu,cpuacct/docker/abc/cpu.cfs_quota_us": "200000\n",
+            "cpu,cpuacct/docker/abc/cpu.cfs_period_us": "100000\n",
+            "unified/docker/abc/cgroup.procs": "",
+        },
+    )
+
+    assert build_jobs.get_cgroup_cpu_limit() == 2
+
+
+def test_no_cgroups(cgroup_tree, monkeypatch):
+    monkeypatch.setattr(build_jobs, "PROC_CGROUP", "/nonexistent/cgroup")
+
+    assert build_jobs.get_cgroup_cpu_limit() is None
+
+
+def test_available_cpus_are_rounded_up_to_the_quota(monkeypatch):
+    monkeypatch.setattr(build_jobs, "get_cgroup_cpu_limit", lambda: 1.5)
+    monkeypatch.setattr(build_jobs.os, "sched_getaffinity", lambda _: {0, 1, 2, 3})
+
+    assert build_jobs.get_available_cpus() == 2
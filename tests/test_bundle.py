@@ -0,0 +1,100 @@
+import io
+import os
+import tarfile
+
+import pytest
+
+from pymol_wizard_installer import bundle
+from pymol_wizard_installer.install_manifest import InstallManifest
+
+
+def test_text_prefix_is_replaced(tmp_path):
+    script = tmp_path / "script"
+    script.write_bytes(b"#!/opt/envs/old/bin/python\nprint('/opt/envs/old/lib')\n")
+    script.chmod(0o755)
+
+    bundle.replace_text_prefix(str(script), "/opt/envs/old", "/home/user/new-env")
+
+    assert script.read_bytes() == (
+        b"#!/home/user/new-env/bin/python\nprint('/home/user/new-env/lib')\n"
+    )
+    assert os.access(script, os.X_OK)
+
+
+def test_binary_prefix_is_padded(tmp_path):
+    library = tmp_path / "library.so"
+    library.write_bytes(b"\x7fELF\0/opt/envs/old/lib:/opt/envs/old/bin\0tail\0")
+
+    assert bundle.replace_binary_prefix(str(library), "/opt/envs/old", "/x/new")
+
+    contents = library.read_bytes()
+    assert contents == b"\x7fELF\0/x/new/lib:/x/new/bin\0" + b"\0" * 14 + b"tail\0"
+
+
+def test_binary_prefix_cannot_grow(tmp_path):
+    library = tmp_path / "library.so"
+    original = b"\x7fELF\0/opt/old/lib\0"
+    library.write_bytes(original)
+
+    assert not bundle.replace_binary_prefix(str(library), "/opt/old", "/opt/longer")
+
+
+def test_links_into_the_old_prefix_are_retargeted(tmp_path):
+    member = tarfile.TarInfo("bin/python")
+    member.type = tarfile.SYMTYPE
+    member.linkname = "/opt/envs/old/bin/python3.12"
+
+    extract_filter = bundle.get_extract_filter("/opt/envs/old", "/x/new")
+
+    assert extract_filter(member, str(tmp_path)).linkname == "/x/new/bin/python3.12"
+
+
+@pytest.mark.skipif(os.name == "nt", reason="uses POSIX symlinks and paths")
+def test_bundle_round_trip_relocates_the_prefix(tmp_path):
+    old_prefix = str(tmp_path / "a-rather-long-environment-prefix")
+    os.makedirs(os.path.join(old_prefix, "bin"))
+    os.makedirs(os.path.join(old_prefix, "lib"))
+    with open(os.path.join(old_prefix, "bin", "tool"), "w") as f:
+        f.write(f"#!{old_prefix}/bin/python\n")
+    with open(os.path.join(old_prefix, "lib", "native.so"), "wb") as f:
+        f.write(b"\0rpath=" + old_prefix.encode() + b"/lib\0")
+    with open(os.path.join(old_prefix, "lib", "plain.txt"), "w") as f:
+        f.write("nothing to relocate\n")
+    os.symlink(
+        os.path.join(old_prefix, "bin", "tool"),
+        os.path.join(old_prefix, "bin", "alias"),
+    )
+    manifest = InstallManifest.load(old_prefix)
+    manifest.set_info("env_name", "wizard-env")
+    manifest.mark_done("example", "package", "fingerprint")
+
+    out = io.BytesIO()
+    stats = bundle.write_bundle(old_prefix, out)
+    assert stats["prefixed"] == 2
+
+    new_prefix = str(tmp_path / "new")
+    out.seek(0)
+    with tarfile.open(fileobj=out, mode="r|*") as tar:
+        header = bundle.read_header(tar)
+        assert header["env_name"] == "wizard-env"
+        assert header["wizards"] == ["example"]
+        bundle.extract_bundle(tar, header, new_prefix)
+
+    with open(os.path.join(new_prefix, "bin", "tool")) as f:
+        assert f.read() == f"#!{new_prefix}/bin/python\n"
+    with open(os.path.join(new_prefix, "lib", "native.so"), "rb") as f:
+        contents = f.read()
+    assert contents.startswith(b"\0rpath=" + new_prefix.encode() + b"/lib\0")
+    assert len(contents) == len(old_prefix) + len("\0rpath=/lib\0")
+    assert os.readlink(os.path.join(new_prefix, "bin", "alias")) == os.path.join(
+        new_prefix, "bin", "tool"
+    )
+    assert not os.path.exists(os.path.join(new_prefix, bundle.BUNDLE_DIR))
+
+
+def test_linked_installations_cannot_be_exported(tmp_path):
+    manifest = InstallManifest.load(str(tmp_path))
+    manifest.mark_done("example", "wizard-file", {"link": "/src/example.py"})
+
+    with pytest.raises(bundle.BundleError, match="--link"):
+        bundle.check_exportable(manifest)
@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+from pymol_wizard_installer.env_discovery import (
+    find_env_prefix,
+    get_conda_base,
+    list_env_prefixes,
+    read_condarc,
+)
+
+
+@pytest.fixture
+def conda_base(tmp_path, monkeypatch):
+    for var in [
+        "CONDA_EXE",
+        "CONDA_ROOT",
+        "CONDA_PREFIX",
+        "CONDA_ENVS_DIRS",
+        "CONDA_ENVS_PATH",
+        "CONDARC",
+    ]:
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+
+    conda_base = tmp_path / "conda"
+    (conda_base / "conda-meta").mkdir(parents=True)
+    (conda_base / "condabin").mkdir()
+    (conda_base / "envs" / "in-base" / "conda-meta").mkdir(parents=True)
+    return conda_base
+
+
+def test_base_from_conda_exe(conda_base, monkeypatch):
+    monkeypatch.setenv("CONDA_EXE", str(conda_base / "bin" / "conda"))
+
+    assert get_conda_base() == str(conda_base)
+
+
+def test_base_from_an_active_environment(conda_base, monkeypatch):
+    monkeypatch.setenv("CONDA_PREFIX", str(conda_base / "envs" / "in-base"))
+
+    assert get_conda_base() == str(conda_base)
+
+
+def test_envs_are_found_in_every_envs_dir(conda_base, tmp_path, monkeypatch):
+    other_dir = tmp_path / "other-envs"
+    (other_dir / "elsewhere" / "conda-meta").mkdir(parents=True)
+    (conda_base / ".condarc").write_text(f"envs_dirs:\n  - {other_dir}\n")
+    registered = tmp_path / "registered"
+    (registered / "conda-meta").mkdir(parents=True)
+    (tmp_path / "home" / ".conda").mkdir(parents=True)
+    (tmp_path / "home" / ".conda" / "environments.txt").write_text(f"{registered}\n")
+
+    base = str(conda_base)
+    assert find_env_prefix("base", base) == base
+    assert find_env_prefix("in-base", base) == str(conda_base / "envs" / "in-base")
+    assert find_env_prefix("elsewhere", base) == str(other_dir / "elsewhere")
+    assert find_env_prefix("registered", base) == str(registered)
+    assert find_env_prefix(str(registered), base) == str(registered)
+    assert find_env_prefix("missing", base) is None
+    assert list_env_prefixes(base) == [
+        base,
+        str(other_dir / "elsewhere"),
+        str(conda_base / "envs" / "in-base"),
+        str(registered),
+    ]
+
+
+def test_condarc_files_are_merged(conda_base, tmp_path, monkeypatch):
+    (conda_base / ".condarc").write_text(
+        "channels:\n  - defaults\nauto_update: false\n"
+    )
+    user_condarc = tmp_path / "home" / ".condarc"
+    user_condarc.parent.mkdir(parents=True)
+    user_condarc.write_text("channels:\n  - conda-forge\n  - defaults\n")
+
+    assert read_condarc(str(conda_base)) == {
+        "channels": ["conda-forge", "defaults"],
+        "auto_update": False,
+    }
+
+
+def test_directories_without_conda_meta_are_not_envs(conda_base):
+    os.makedirs(conda_base / "envs" / "not-an-env")
+
+    assert find_env_prefix("not-an-env", str(conda_base)) is None
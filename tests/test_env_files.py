@@ -0,0 +1,71 @@
+import yaml
+
+from pymol_wizard_installer.env_files import (
+    get_env_fingerprint,
+    get_merged_env_file,
+    merge_env_files,
+    merge_envs,
+)
+
+
+def write_env(path, env):
+    path.write_text(yaml.safe_dump(env, sort_keys=False))
+    return str(path)
+
+
+def test_merge_envs(tmp_path):
+    first = write_env(
+        tmp_path / "first.yaml",
+        {
+            "channels": ["conda-forge"],
+            "dependencies": ["python=3.12", "numpy", {"pip": ["requests"]}],
+            "variables": {"A": "1", "B": "1"},
+        },
+    )
+    second = write_env(
+        tmp_path / "second.yaml",
+        {
+            "channels": ["bioconda", "conda-forge"],
+            "dependencies": ["python=3.12", "scipy", {"pip": ["requests", "rich"]}],
+            "variables": {"B": "2"},
+        },
+    )
+
+    assert merge_envs([first, second]) == {
+        "channels": ["conda-forge", "bioconda"],
+        "dependencies": [
+            "python=3.12",
+            "numpy",
+            "scipy",
+            "pip",
+            {"pip": ["requests", "rich"]},
+        ],
+        "variables": {"A": "1", "B": "2"},
+    }
+
+
+def test_merged_file_is_written_once_to_the_cache(tmp_path, cache):
+    first = write_env(tmp_path / "first.yaml", {"dependencies": ["numpy"]})
+    second = write_env(tmp_path / "second.yaml", {"dependencies": ["scipy"]})
+
+    merged = merge_envs([first, second])
+    merged_file = get_merged_env_file(merged)
+    assert not cache.exists()
+
+    assert merge_env_files([first, second]) == merged_file
+    with open(merged_file) as f:
+        assert yaml.safe_load(f) == merged
+    assert merge_env_files([first]) == first
+
+
+def test_fingerprint_of_parsed_contents_matches_the_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.delenv("CONDARC", raising=False)
+    env = {"channels": ["conda-forge"], "dependencies": ["numpy"]}
+    env_file = write_env(tmp_path / "environment.yaml", env)
+
+    fingerprint = get_env_fingerprint(env_file, str(tmp_path))
+    assert get_env_fingerprint("missing.yaml", str(tmp_path), env) == fingerprint
+
+    (tmp_path / ".condarc").write_text("channels:\n  - bioconda\n")
+    assert get_env_fingerprint(env_file, str(tmp_path)) != fingerprint
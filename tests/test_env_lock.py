@@ -0,0 +1,106 @@
+import pytest
+
+from pymol_wizard_installer import env_lock
+
+ENV_FILE = """\
+channels:
+  - conda-forge
+dependencies:
+  - python=3.12
+  - numpy
+  - pip
+  - pip:
+      - requests
+variables:
+  EXAMPLE: "1"
+"""
+
+PACKAGES = """\
+@EXPLICIT
+https://conda.anaconda.org/conda-forge/linux-64/python-3.12.1-h0.conda#0123
+https://conda.anaconda.org/conda-forge/linux-64/numpy-1.26.4-h0.conda#4567
+"""
+
+
+class FakePackageManager:
+    def __init__(self):
+        self.calls = []
+
+    def list_explicit(self, env_name=None, prefix=None):
+        self.calls.append(("list_explicit", env_name, prefix))
+        return PACKAGES
+
+    def create_from_explicit(self, env_name, lock_file):
+        with open(lock_file, "r") as f:
+            self.calls.append(("create_from_explicit", env_name, f.read()))
+
+    def set_variables(self, env_name, variables):
+        self.calls.append(("set_variables", env_name, variables))
+
+
+@pytest.fixture
+def package_manager(monkeypatch):
+    package_manager = FakePackageManager()
+    monkeypatch.setattr(env_lock, "get_package_manager", lambda: package_manager)
+    return package_manager
+
+
+@pytest.fixture
+def env_file(tmp_path):
+    env_file = tmp_path / "environment.yaml"
+    env_file.write_text(ENV_FILE)
+    return str(env_file)
+
+
+def test_lock_file_is_named_after_the_platform(tmp_path):
+    env_file = str(tmp_path / "environment.yaml")
+
+    assert env_lock.get_lock_file(env_file, "linux-64") == str(
+        tmp_path / "environment.linux-64.lock"
+    )
+
+
+def test_lock_round_trip(env_file, package_manager, monkeypatch):
+    pip_installs = []
+    monkeypatch.setattr(
+        env_lock,
+        "run_in_env",
+        lambda env_name, args, **kwargs: pip_installs.append(args),
+    )
+
+    lock_file = env_lock.write_lock(env_file, env_name="solved")
+    assert lock_file == env_lock.get_lock_file(env_file)
+    assert env_lock.find_lock(env_file) == lock_file
+
+    env_lock.create_env_from_lock("locked", env_file, lock_file)
+
+    _, env_name, contents = package_manager.calls[1]
+    assert env_name == "locked"
+    assert contents.endswith(PACKAGES)
+    assert pip_installs == [["python", "-m", "pip", "install", "requests"]]
+    assert package_manager.calls[2] == ("set_variables", "locked", {"EXAMPLE": "1"})
+
+
+def test_lock_is_outdated_when_the_env_file_changes(env_file, package_manager, capsys):
+    lock_file = env_lock.write_lock(env_file, env_name="solved")
+
+    with open(env_file, "w") as f:
+        f.write(ENV_FILE.replace("numpy", "scipy"))
+
+    assert not env_lock.is_lock_up_to_date(env_file, lock_file)
+    assert env_lock.find_lock(env_file) is None
+    assert "out of date" in capsys.readouterr().out
+
+
+def test_formatting_changes_keep_the_lock(env_file, package_manager):
+    lock_file = env_lock.write_lock(env_file, env_name="solved")
+
+    with open(env_file, "a") as f:
+        f.write("# A comment does not change the environment\n")
+
+    assert env_lock.is_lock_up_to_date(env_file, lock_file)
+
+
+def test_missing_lock(env_file):
+    assert env_lock.read_source_digest(env_lock.get_lock_file(env_file)) is None
+    assert env_lock.find_lock(env_file) is None
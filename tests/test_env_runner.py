@@ -0,0 +1,175 @@
+import os
+import sys
+
+import pytest
+
+from pymol_wizard_installer import env_runner, package_manager
+
+FAKE_CONDA = """#!{python}
+import os, sys
+
+args = sys.argv[1:]
+with open(os.environ["FAKE_CONDA_LOG"], "a") as f:
+    f.write(args[0] + "\\n")
+name = args[args.index("--name") + 1]
+command = args[args.index("--name") + 2 :]
+prefix = os.path.join(os.environ["FAKE_CONDA_ENVS"], name)
+os.environ["CONDA_PREFIX"] = prefix
+os.environ["PATH"] = os.path.join(prefix, "bin") + os.pathsep + os.environ["PATH"]
+os.environ["ACTIVATED"] = name
+os.execvp(command[0], command)
+"""
+
+PRINT_ACTIVATED = "import os; print(os.environ.get('ACTIVATED'))"
+
+
+@pytest.fixture
+def conda(tmp_path, monkeypatch):
+    """A stand-in conda whose `run` activates environments living in tmp_path/envs."""
+
+    (tmp_path / "conda-meta").mkdir()
+    (tmp_path / "bin").mkdir()
+    conda = tmp_path / "bin" / "conda"
+    conda.write_text(FAKE_CONDA.format(python=sys.executable))
+    conda.chmod(0o755)
+    prefix = tmp_path / "envs" / "wizard-env"
+    (prefix / "conda-meta").mkdir(parents=True)
+    (prefix / "bin").mkdir()
+    (prefix / "bin" / "python").symlink_to(sys.executable)
+
+    monkeypatch.setenv("FAKE_CONDA_LOG", str(tmp_path / "conda.log"))
+    monkeypatch.setenv("FAKE_CONDA_ENVS", str(tmp_path / "envs"))
+    monkeypatch.setenv("CONDA_EXE", str(conda))
+    monkeypatch.setenv("HOME", str(tmp_path))
+    for var in ["CONDA_ENVS_DIRS", "CONDA_ENVS_PATH", "CONDARC"]:
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setattr(env_runner, "_activations", {})
+    monkeypatch.setattr(env_runner, "_direct_exec", False)
+    monkeypatch.setattr(
+        package_manager, "_package_manager", package_manager.PackageManager(str(conda))
+    )
+    return tmp_path
+
+
+def run_activated():
+    return env_runner.run_in_env(
+        "wizard-env",
+        ["python", "-c", PRINT_ACTIVATED],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+
+
+def get_conda_calls(conda):
+    log = conda / "conda.log"
+    return len(log.read_text().splitlines()) if log.exists() else 0
+
+
+@pytest.mark.skipif(os.name == "nt", reason="the stand-in conda is a script")
+def test_commands_go_through_conda_run(conda):
+    assert run_activated() == "wizard-env"
+    assert run_activated() == "wizard-env"
+
+    assert get_conda_calls(conda) == 2
+
+
+@pytest.mark.skipif(os.name == "nt", reason="the stand-in conda is a script")
+def test_direct_exec_reuses_the_captured_activation(conda, monkeypatch):
+    env_runner.set_direct_exec(True)
+
+    assert run_activated() == "wizard-env"
+    assert run_activated() == "wizard-env"
+    assert get_conda_calls(conda) == 1
+
+    # A new run reads the activation back from the cache
+    monkeypatch.setattr(env_runner, "_activations", {})
+    command, environ = env_runner.get_env_command("wizard-env", ["python"])
+    assert command == [str(conda / "envs" / "wizard-env" / "bin" / "python")]
+    assert environ["ACTIVATED"] == "wizard-env"
+    assert get_conda_calls(conda) == 1
+
+
+@pytest.mark.skipif(os.name == "nt", reason="the stand-in conda is a script")
+def test_activation_is_captured_again_when_the_env_changes(conda):
+    env_runner.set_direct_exec(True)
+    run_activated()
+
+    os.utime(conda / "envs" / "wizard-env" / "conda-meta", ns=(0, 0))
+    run_activated()
+
+    assert get_conda_calls(conda) == 2
+
+
+@pytest.mark.skipif(os.name == "nt", reason="the stand-in conda is a script")
+def test_extra_variables_are_added_to_the_activation(conda):
+    env_runner.set_direct_exec(True)
+
+    result = env_runner.run_in_env(
+        "wizard-env",
+        [
+            "python",
+            "-c",
+            "import os; print(os.environ['ACTIVATED'], os.environ['JOBS'])",
+        ],
+        env={"JOBS": "4"},
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.stdout.strip() == "wizard-env 4"
+
+
+@pytest.mark.skipif(os.name == "nt", reason="the stand-in conda is a script")
+def test_only_the_activation_changes_are_cached(conda, monkeypatch, cache):
+    monkeypatch.setenv("WIZARD_TOKEN", "secret")
+    env_runner.set_direct_exec(True)
+    run_activated()
+
+    (cache_file,) = (cache / "activation").iterdir()
+    contents = cache_file.read_text()
+    assert "ACTIVATED" in contents
+    assert "secret" not in contents
+
+    # Variables set after the capture still reach the child
+    monkeypatch.setattr(env_runner, "_activations", {})
+    monkeypatch.setenv("WIZARD_TOKEN", "renewed")
+    monkeypatch.setenv("LATER", "set")
+    result = env_runner.run_in_env(
+        "wizard-env",
+        [
+            "python",
+            "-c",
+            "import os; print(os.environ['WIZARD_TOKEN'], os.environ['LATER'])",
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.stdout.strip() == "renewed set"
+    assert get_conda_calls(conda) == 1
+
+
+def test_activation_delta_prepends_to_the_current_path():
+    before = {"PATH": "/usr/bin", "HOME": "/home/user", "OLD_ENV": "1"}
+    after = {
+        "PATH": os.pathsep.join(["/envs/wizard/bin", "/usr/bin"]),
+        "HOME": "/home/user",
+        "CONDA_PREFIX": "/envs/wizard",
+    }
+    delta = env_runner.get_activation_delta(before, after)
+
+    assert delta == {
+        "set": {"CONDA_PREFIX": "/envs/wizard"},
+        "prepend": {"PATH": "/envs/wizard/bin" + os.pathsep},
+        "unset": ["OLD_ENV"],
+    }
+    assert env_runner.apply_activation_delta(
+        delta, {"PATH": "/opt/bin", "OLD_ENV": "1", "NEW": "1"}
+    ) == {
+        "PATH": os.pathsep.join(["/envs/wizard/bin", "/opt/bin"]),
+        "CONDA_PREFIX": "/envs/wizard",
+        "NEW": "1",
+    }
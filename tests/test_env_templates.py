@@ -0,0 +1,96 @@
+import time
+
+import pytest
+
+from pymol_wizard_installer.env_files import get_env_file_digest
+from pymol_wizard_installer.env_templates import TEMPLATE_MAX_AGE_DAYS, EnvTemplate
+from pymol_wizard_installer.install_manifest import InstallManifest
+
+ENV_DIGEST = "0123abcd" * 8
+
+
+@pytest.fixture
+def conda_base(tmp_path, monkeypatch):
+    for var in ["CONDA_ENVS_DIRS", "CONDA_ENVS_PATH", "CONDARC", "CONDA_SUBDIR"]:
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    conda_base = tmp_path / "conda"
+    (conda_base / "conda-meta").mkdir(parents=True)
+    return conda_base
+
+
+@pytest.fixture
+def template(conda_base):
+    template = EnvTemplate("3.12", "v3.1.0", True, ENV_DIGEST)
+    prefix = conda_base / "envs" / template.name
+    (prefix / "conda-meta").mkdir(parents=True)
+    (prefix / "conda-meta" / "history").write_text("==> create <==\n")
+    return template
+
+
+def test_name_is_a_valid_env_name():
+    template = EnvTemplate(3.12, "v3.1.0+dev/1", False, ENV_DIGEST)
+
+    assert template.name == "pymol-template-py3.12-pymolv3.1.0_dev_1-no-openvr-0123abcd"
+
+
+def test_missing_template(conda_base):
+    template = EnvTemplate("3.12", "v3.1.0", False, ENV_DIGEST)
+
+    assert template.get_stale_reason(str(conda_base)) == "it does not exist"
+
+
+def test_built_template_is_usable(conda_base, template):
+    assert template.get_stale_reason(str(conda_base)) == "it was not completely built"
+
+    template.mark_built(str(conda_base))
+
+    assert template.get_stale_reason(str(conda_base)) is None
+
+
+def test_modified_template_is_stale(conda_base, template):
+    template.mark_built(str(conda_base))
+
+    history = conda_base / "envs" / template.name / "conda-meta" / "history"
+    with open(history, "a") as f:
+        f.write("==> install <==\n")
+
+    assert template.get_stale_reason(str(conda_base)) == (
+        "it was modified since it was built"
+    )
+
+
+def test_channel_changes_make_the_template_stale(conda_base, template):
+    template.mark_built(str(conda_base))
+
+    (conda_base / ".condarc").write_text("channels:\n  - conda-forge\n")
+
+    assert template.get_stale_reason(str(conda_base)) == "its configuration changed"
+
+
+def test_old_template_is_stale(conda_base, template):
+    template.mark_built(str(conda_base))
+    manifest = InstallManifest.load(str(conda_base / "envs" / template.name))
+    info = manifest.get_info("template")
+    info["created"] = time.time() - (TEMPLATE_MAX_AGE_DAYS + 1) * 24 * 60 * 60
+    manifest.set_info("template", info)
+
+    assert template.get_stale_reason(str(conda_base)) == (
+        f"it is older than {TEMPLATE_MAX_AGE_DAYS} days"
+    )
+
+
+def test_templates_are_not_shared_across_env_files(conda_base, tmp_path):
+    first = tmp_path / "first.yaml"
+    first.write_text("dependencies:\n  - python=3.12\n  - numpy\n")
+    second = tmp_path / "second.yaml"
+    second.write_text("dependencies:\n  - python=3.12\n  - scipy\n")
+    templates = [
+        EnvTemplate("3.12", "v3.1.0", True, get_env_file_digest(str(env_file)))
+        for env_file in [first, second]
+    ]
+
+    assert templates[0].name != templates[1].name
+    assert templates[0].get_key(str(conda_base)) != templates[1].get_key(
+        str(conda_base)
+    )
@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+import subprocess
+
+from pymol_wizard_installer.file_locks import environment_lock, file_lock, path_lock
+
+HOLD_LOCK = """
+import sys, time
+from pymol_wizard_installer.file_locks import file_lock
+
+with file_lock(sys.argv[1]):
+    print("locked", flush=True)
+    time.sleep(float(sys.argv[2]))
+"""
+
+
+def test_lock_waits_for_another_process(capsys):
+    src = os.path.join(os.path.dirname(__file__), os.pardir, "src")
+    holder = subprocess.Popen(
+        [sys.executable, "-c", HOLD_LOCK, "shared resource", "0.5"],
+        stdout=subprocess.PIPE,
+        text=True,
+        env={**os.environ, "PYTHONPATH": os.path.abspath(src)},
+    )
+    try:
+        assert holder.stdout.readline().strip() == "locked"
+        start = time.perf_counter()
+        with file_lock("shared resource", "the shared resource"):
+            waited = time.perf_counter() - start
+    finally:
+        holder.wait(10)
+
+    assert waited > 0.2
+    assert "Waiting for another installation to release the shared resource" in (
+        capsys.readouterr().out
+    )
+
+
+def test_lock_is_released(capsys):
+    with file_lock("resource"):
+        pass
+    with file_lock("resource"):
+        pass
+
+    assert capsys.readouterr().out == ""
+
+
+def test_paths_are_locked_by_absolute_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with path_lock("checkout"):
+        pass
+    with path_lock(str(tmp_path / "checkout")):
+        pass
+    with environment_lock("wizard-env", "conda"):
+        pass
+
+    assert len(os.listdir(tmp_path / "cache" / "locks")) == 2
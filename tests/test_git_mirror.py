@@ -0,0 +1,74 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from pymol_wizard_installer import git_mirror
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+
+
+def git(*args, cwd=None):
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+@pytest.fixture
+def upstream(tmp_path, monkeypatch):
+    for var in ["GIT_AUTHOR_NAME", "GIT_COMMITTER_NAME"]:
+        monkeypatch.setenv(var, "Tester")
+    for var in ["GIT_AUTHOR_EMAIL", "GIT_COMMITTER_EMAIL"]:
+        monkeypatch.setenv(var, "tester@example.com")
+
+    repo = tmp_path / "upstream"
+    git("init", "--quiet", "--initial-branch", "main", str(repo))
+    (repo / "version.txt").write_text("1\n")
+    git("add", "version.txt", cwd=repo)
+    git("commit", "--quiet", "-m", "First", cwd=repo)
+    git("tag", "v1", cwd=repo)
+    return repo
+
+
+def test_checkouts_share_one_mirror(upstream, tmp_path):
+    url = upstream.as_uri()
+    git_mirror.checkout(url, "v1", str(tmp_path / "first"))
+    git_mirror.checkout(url, "v1", str(tmp_path / "second"))
+
+    assert (tmp_path / "second" / "version.txt").read_text() == "1\n"
+    (entry,) = git_mirror.list_entries()
+    assert git_mirror.describe_entry(entry) == f"mirror of {url}"
+
+    # The checkouts borrow the objects of the mirror
+    for checkout in ["first", "second"]:
+        assert (tmp_path / checkout / ".git").is_file()
+        common_dir = git("rev-parse", "--git-common-dir", cwd=tmp_path / checkout)
+        assert os.path.samefile(common_dir, entry["path"])
+    assert git("log", "-1", "--format=%s", cwd=tmp_path / "second") == "First"
+
+
+def test_deleted_checkouts_can_be_checked_out_again(upstream, tmp_path):
+    url = upstream.as_uri()
+    git_mirror.checkout(url, "v1", str(tmp_path / "checkout"))
+    shutil.rmtree(tmp_path / "checkout")
+
+    git_mirror.checkout(url, "v1", str(tmp_path / "checkout"))
+
+    assert (tmp_path / "checkout" / "version.txt").read_text() == "1\n"
+
+
+def test_branches_are_refreshed(upstream, tmp_path):
+    url = upstream.as_uri()
+    git_mirror.checkout(url, "main", str(tmp_path / "first"))
+    (upstream / "version.txt").write_text("2\n")
+    git("commit", "--quiet", "-am", "Second", cwd=upstream)
+
+    git_mirror.checkout(url, "main", str(tmp_path / "second"))
+
+    assert (tmp_path / "second" / "version.txt").read_text() == "2\n"
+
+
+def test_unknown_version(upstream, tmp_path):
+    with pytest.raises(subprocess.CalledProcessError):
+        git_mirror.checkout(upstream.as_uri(), "v9", str(tmp_path / "checkout"))
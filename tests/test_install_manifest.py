@@ -0,0 +1,81 @@
+import os
+
+from pymol_wizard_installer.cache import get_tree_digest
+from pymol_wizard_installer.install_manifest import (
+    ENVIRONMENT,
+    InstallManifest,
+    find_recorded_envs,
+)
+
+
+def test_fingerprint_is_reused_across_runs(tmp_path):
+    InstallManifest.load(str(tmp_path)).mark_done("example", "package", "abc")
+
+    manifest = InstallManifest.load(str(tmp_path))
+    assert manifest.is_done("example", "package", "abc")
+    assert not manifest.is_done("example", "package", "def")
+    assert not manifest.is_done("other", "package", "abc")
+    assert not manifest.is_done(ENVIRONMENT, "package", "abc")
+
+
+def test_modified_or_missing_files_invalidate_a_step(tmp_path):
+    written = tmp_path / "example.py"
+    written.write_text("version 1")
+    manifest = InstallManifest.load(str(tmp_path))
+    manifest.mark_done("example", "wizard-file", "abc", [str(written)])
+    assert manifest.is_done("example", "wizard-file", "abc")
+
+    written.write_text("version 2")
+    assert not manifest.is_done("example", "wizard-file", "abc")
+
+    manifest.mark_done("example", "wizard-file", "abc", [str(written)])
+    os.remove(written)
+    assert not manifest.is_done("example", "wizard-file", "abc")
+
+
+def test_forget(tmp_path):
+    manifest = InstallManifest.load(str(tmp_path))
+    manifest.mark_done("example", "package", "abc")
+    manifest.mark_done("example", "wizard-file", "def")
+    manifest.mark_done(ENVIRONMENT, "env", "ghi")
+
+    manifest.forget("example", "package")
+    assert not manifest.is_done("example", "package", "abc")
+    assert manifest.is_done("example", "wizard-file", "def")
+
+    manifest.forget("example")
+    assert InstallManifest.load(str(tmp_path)).get_wizards() == []
+    assert manifest.is_done(ENVIRONMENT, "env", "ghi")
+
+
+def test_tree_digest_ignores_build_leftovers(tmp_path):
+    (tmp_path / "example.py").write_text("print('example')")
+    digest = get_tree_digest(str(tmp_path))
+
+    (tmp_path / "tmp").mkdir()
+    (tmp_path / "tmp" / "clone").write_text("")
+    (tmp_path / "example.cpython-312.pyc").write_bytes(b"")
+    (tmp_path / "example.egg-info").mkdir()
+    assert get_tree_digest(str(tmp_path)) == digest
+
+    (tmp_path / "example.py").write_text("print('changed')")
+    assert get_tree_digest(str(tmp_path)) != digest
+
+
+def test_recorded_envs(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    for var in ["CONDA_ENVS_DIRS", "CONDA_ENVS_PATH", "CONDARC"]:
+        monkeypatch.delenv(var, raising=False)
+    conda_base = tmp_path / "conda"
+    for env_name in ["first", "second", "third"]:
+        (conda_base / "envs" / env_name / "conda-meta").mkdir(parents=True)
+    (conda_base / "conda-meta").mkdir()
+    InstallManifest.load(str(conda_base / "envs" / "first")).mark_done(
+        "example", "package", "abc"
+    )
+    manifest = InstallManifest.load(str(conda_base / "envs" / "third"))
+    manifest.set_info("env_name", "renamed")
+    manifest.mark_done("example", "package", "abc")
+
+    assert find_recorded_envs(str(conda_base), ["example"]) == ["first", "renamed"]
+    assert find_recorded_envs(str(conda_base), ["other"]) == []
@@ -0,0 +1,127 @@
+import os
+import argparse
+
+import pytest
+
+from pymol_wizard_installer.install_plan import InstallPlan, format_duration, make_plan
+
+METADATA = """\
+name: {name}
+menu_entry: "{name} menu entry"
+default_env: wizard-env
+python_version: 3.12
+pymol_version: v3.1.0
+openvr_version: 1.0.17
+"""
+
+
+def write_wizard(wizards_dir, name, dependency):
+    wizard_root = wizards_dir / name
+    (wizard_root / "envs").mkdir(parents=True)
+    (wizard_root / "metadata.yaml").write_text(METADATA.format(name=name))
+    (wizard_root / f"{name}.py").write_text("")
+    (wizard_root / "envs" / "environment.yaml").write_text(
+        f"channels:\n  - conda-forge\ndependencies:\n  - python=3.12\n  - {dependency}\n"
+    )
+
+
+def snapshot(root):
+    return sorted(
+        os.path.join(directory, name)
+        for directory, dirs, files in os.walk(root)
+        for name in dirs + files
+    )
+
+
+@pytest.fixture
+def installation(tmp_path, monkeypatch):
+    """A conda base with an existing environment, two wizards and an empty cache."""
+
+    conda_base = tmp_path / "conda"
+    (conda_base / "conda-meta").mkdir(parents=True)
+    (conda_base / "bin").mkdir()
+    prefix = conda_base / "envs" / "wizard-env"
+    (prefix / "conda-meta").mkdir(parents=True)
+    (prefix / "conda-meta" / "history").write_text("")
+    write_wizard(tmp_path / "wizards", "first", "numpy")
+    write_wizard(tmp_path / "wizards", "second", "scipy")
+
+    for var in ["CONDA_ENVS_DIRS", "CONDA_ENVS_PATH", "CONDARC", "CONDA_ROOT"]:
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    monkeypatch.setenv("CONDA_EXE", str(conda_base / "bin" / "conda"))
+    monkeypatch.setenv("CONDA_DEFAULT_ENV", "base")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def get_args(**kwargs):
+    args = {
+        "wizard_roots": ["first", "second"],
+        "wizards_dir": "wizards",
+        "env_name": "wizard-env",
+        "package_manager": "conda",
+        "answers": None,
+        "manifest": None,
+        "fast": False,
+        "link": False,
+        "template": False,
+        "rebuild_template": False,
+        "force_env_update": False,
+        "plan_json": None,
+    }
+    args.update(kwargs)
+    return argparse.Namespace(**args)
+
+
+def test_plan_changes_nothing(installation):
+    before = snapshot(installation)
+
+    plan = make_plan(get_args())
+
+    assert snapshot(installation) == before
+    assert not (installation / "cache").exists()
+    assert plan.wizards == ["first", "second"]
+    assert plan.prefix == str(installation / "conda" / "envs" / "wizard-env")
+
+
+def test_plan_lists_the_steps(installation):
+    steps = {step.name: step for step in make_plan(get_args()).steps}
+
+    assert steps["environment"].run
+    assert "environment file changed" in steps["environment"].reason
+    assert steps["openvr"].reason == "cloned and built"
+    assert steps["fetch-pymol"].run
+    assert steps["pymol"].reason == "built from source"
+    assert steps["packages"].reason == "changed: first, second"
+    assert steps["external-gui-entries"].reason == "missing: first, second"
+
+
+def test_plan_follows_the_answers(installation):
+    (installation / "answers.yaml").write_text("answers:\n  install_pymol: n\n")
+
+    steps = make_plan(get_args(answers="answers.yaml")).steps
+
+    assert [step.reason for step in steps if step.name == "pymol"] == [
+        "PyMOL installation declined"
+    ]
+
+
+def test_plan_estimates_from_the_recorded_timings():
+    plan = InstallPlan(["first"], "wizard-env", None, {"pymol-build": [30, 90, 60]})
+    plan.add("pymol", True, "built from source", ["pymol-build"])
+    plan.add("packages", True, "changed: first", ["packages"])
+    plan.add("wizard-files", False, "the wizard files are unchanged", ["wizard-file"])
+
+    assert plan.get_estimate() == (60, 1)
+    data = plan.as_dict()
+    assert data["steps"][0]["estimate"] == 60
+    assert data["steps"][1]["estimate"] is None
+    assert data["steps"][2]["action"] == "skip"
+    assert "Estimated time: 1m 00s, plus 1 step(s) never timed" in plan.format()
+
+
+def test_format_duration():
+    assert format_duration(None) == "?"
+    assert format_duration(12.34) == "12.3 s"
+    assert format_duration(125) == "2m 05s"
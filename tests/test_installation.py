@@ -0,0 +1,310 @@
+import os
+import subprocess
+
+import pytest
+
+from pymol_wizard_installer import env_discovery, installation, uninstall_wizard
+from pymol_wizard_installer.install_manifest import InstallManifest
+from pymol_wizard_installer.wizard_metadata import WizardMetadata
+
+
+def get_metadata(name="example"):
+    return WizardMetadata(
+        name, "Example", "example-env", "3.12", "3.1.0", "1.16.8", "pre.py", ""
+    )
+
+
+@pytest.fixture
+def steps(monkeypatch):
+    """Replace the installation steps with ones that record their calls."""
+
+    calls = []
+    monkeypatch.setattr(installation, "is_pymol_installed", lambda env_name: True)
+
+    def run_aux_scripts(manifest, target_env, wizards, kind):
+        calls.append(f"{kind}-scripts")
+        if kind == "pre":
+            raise subprocess.CalledProcessError(1, ["python", "pre.py"])
+
+    monkeypatch.setattr(installation, "run_aux_scripts", run_aux_scripts)
+    monkeypatch.setattr(
+        installation,
+        "install_packages",
+        lambda *args: calls.append("packages"),
+    )
+    monkeypatch.setattr(
+        installation,
+        "copy_wizard_files",
+        lambda *args: calls.append("wizard-files"),
+    )
+    monkeypatch.setattr(
+        installation,
+        "add_menu_entries",
+        lambda manifest, menu_file, wizards, add_entries, step: calls.append(step),
+    )
+    return calls
+
+
+def test_failed_pre_script_leaves_nothing_behind(steps, tmp_path):
+    wizards = [(str(tmp_path / "example"), get_metadata())]
+
+    with pytest.raises(subprocess.CalledProcessError):
+        installation.full_installation("example-env", str(tmp_path), wizards, jobs=4)
+
+    assert steps == ["pre-scripts"]
+
+
+def test_files_and_menu_entries_follow_the_package(steps, monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        installation,
+        "run_aux_scripts",
+        lambda manifest, target_env, wizards, kind: steps.append(f"{kind}-scripts"),
+    )
+    wizards = [(str(tmp_path / "example"), get_metadata())]
+
+    installation.full_installation("example-env", str(tmp_path), wizards, jobs=4)
+
+    assert steps[:3] == ["pre-scripts", "packages", "wizard-files"]
+    assert sorted(steps[3:5]) == ["external-gui-entry", "internal-gui-entry"]
+    assert steps[5:] == ["post-scripts"]
+
+
+@pytest.fixture
+def pymol_dir(tmp_path):
+    """A PyMOL installation with empty Wizard menus, and the sources of a wizard."""
+
+    pymol_dir = tmp_path / "env" / "pymol"
+    (pymol_dir / "wizard").mkdir(parents=True)
+    (pymol_dir / "_gui.py").write_text(
+        'def get_menus():\n    return [\n        ("menu", "Wizard", [\n        ]),\n    ]\n'
+    )
+    (pymol_dir / "wizard" / "openvr.py").write_text(
+        "def get_menu():\n    return [\n        [2, 'Wizard Menu', ''],\n    ]\n"
+    )
+    (tmp_path / "example").mkdir()
+    (tmp_path / "example" / "example.py").write_text("# example wizard\n")
+    return pymol_dir
+
+
+def test_link_file_replaces_the_destination(tmp_path):
+    source = tmp_path / "source.py"
+    source.write_text("# source\n")
+    destination = tmp_path / "destination.py"
+    destination.write_text("# copy\n")
+
+    assert installation.link_file(str(source), str(destination)) == "symlink"
+
+    assert destination.is_symlink()
+    assert os.readlink(destination) == str(source)
+
+
+def test_link_file_falls_back_to_a_hardlink(tmp_path, monkeypatch):
+    source = tmp_path / "source.py"
+    source.write_text("# source\n")
+    destination = tmp_path / "destination.py"
+
+    def symlink(source, destination):
+        raise OSError("symlinks need privileges")
+
+    monkeypatch.setattr(os, "symlink", symlink)
+
+    assert installation.link_file(str(source), str(destination)) == "hardlink"
+    assert os.path.samefile(source, destination)
+
+
+def test_linked_wizard_is_kept_on_later_runs(pymol_dir, tmp_path, capsys):
+    manifest = InstallManifest.load(str(tmp_path / "env"))
+    wizards = [(str(tmp_path / "example"), get_metadata())]
+    destination = pymol_dir / "wizard" / "example.py"
+
+    installation.link_wizard_files(manifest, str(pymol_dir / "wizard"), wizards)
+    inode = os.lstat(destination).st_ino
+    installation.link_wizard_files(manifest, str(pymol_dir / "wizard"), wizards)
+
+    assert os.readlink(destination) == str(tmp_path / "example" / "example.py")
+    assert os.lstat(destination).st_ino == inode
+    assert "already linked" in capsys.readouterr().out
+    assert manifest.is_done(
+        "example", "wizard-file", {"link": str(tmp_path / "example" / "example.py")}
+    )
+
+
+@pytest.mark.parametrize("kind", ["symlink", "hardlink"])
+def test_copy_replaces_the_link(pymol_dir, tmp_path, kind):
+    source = tmp_path / "example" / "example.py"
+    destination = pymol_dir / "wizard" / "example.py"
+    if kind == "symlink":
+        destination.symlink_to(source)
+    else:
+        os.link(source, destination)
+
+    installation.copy_files(
+        str(pymol_dir / "wizard"), str(tmp_path / "example"), "example"
+    )
+    destination.write_text("# edited in PyMOL\n")
+
+    assert not destination.is_symlink()
+    assert not os.path.samefile(source, destination)
+    assert source.read_text() == "# example wizard\n"
+
+
+def test_uninstall_removes_the_link_only(pymol_dir, tmp_path, monkeypatch):
+    source = tmp_path / "example" / "example.py"
+    destination = pymol_dir / "wizard" / "example.py"
+    destination.symlink_to(source)
+    monkeypatch.setattr(
+        uninstall_wizard, "get_pymol_dir", lambda prefix, versions: str(pymol_dir)
+    )
+    monkeypatch.setattr(
+        env_discovery, "find_env_prefix", lambda env_name, conda_base: str(tmp_path)
+    )
+
+    uninstall_wizard.uninstall_from_env(
+        "example-env", str(tmp_path), [get_metadata()], []
+    )
+
+    assert not os.path.lexists(destination)
+    assert source.read_text() == "# example wizard\n"
+
+
+class RecordingManager:
+    def __init__(self):
+        self.updates = []
+
+    def update(self, env_name, env_file):
+        self.updates.append(env_name)
+
+
+@pytest.fixture
+def conda_base(tmp_path, monkeypatch):
+    """A conda installation with an existing wizard-env environment."""
+
+    for var in ["CONDA_ENVS_DIRS", "CONDA_ENVS_PATH", "CONDARC", "CONDA_SUBDIR"]:
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    conda_base = tmp_path / "conda"
+    (conda_base / "conda-meta").mkdir(parents=True)
+    prefix = conda_base / "envs" / "wizard-env"
+    (prefix / "conda-meta").mkdir(parents=True)
+    (prefix / "conda-meta" / "history").write_text("==> create <==\n")
+    return conda_base
+
+
+@pytest.fixture
+def package_manager(monkeypatch):
+    manager = RecordingManager()
+    monkeypatch.setattr(installation, "get_package_manager", lambda: manager)
+    return manager
+
+
+def test_unchanged_env_file_skips_the_update(conda_base, package_manager, tmp_path):
+    env_file = tmp_path / "environment.yaml"
+    env_file.write_text("dependencies:\n  - numpy\n")
+    assert not installation.is_env_up_to_date(
+        "wizard-env", str(env_file), str(conda_base)
+    )
+
+    installation.reuse_env("wizard-env", str(env_file), str(conda_base))
+    assert installation.is_env_up_to_date("wizard-env", str(env_file), str(conda_base))
+    installation.reuse_env("wizard-env", str(env_file), str(conda_base))
+
+    assert package_manager.updates == ["wizard-env"]
+
+
+def test_changed_env_file_is_applied(conda_base, package_manager, tmp_path):
+    env_file = tmp_path / "environment.yaml"
+    env_file.write_text("dependencies:\n  - numpy\n")
+    installation.reuse_env("wizard-env", str(env_file), str(conda_base))
+
+    env_file.write_text("dependencies:\n  - scipy\n")
+    installation.reuse_env("wizard-env", str(env_file), str(conda_base))
+
+    assert package_manager.updates == ["wizard-env", "wizard-env"]
+
+
+def test_changes_made_outside_the_installer_are_applied_again(
+    conda_base, package_manager, tmp_path
+):
+    env_file = tmp_path / "environment.yaml"
+    env_file.write_text("dependencies:\n  - numpy\n")
+    installation.reuse_env("wizard-env", str(env_file), str(conda_base))
+
+    history = conda_base / "envs" / "wizard-env" / "conda-meta" / "history"
+    with open(history, "a") as f:
+        f.write("==> remove numpy <==\n")
+
+    assert not installation.is_env_up_to_date(
+        "wizard-env", str(env_file), str(conda_base)
+    )
+
+
+def test_forced_update_always_runs(conda_base, package_manager, tmp_path):
+    env_file = tmp_path / "environment.yaml"
+    env_file.write_text("dependencies:\n  - numpy\n")
+
+    for _ in range(2):
+        installation.create_env(
+            "wizard-env",
+            str(env_file),
+            "base",
+            str(conda_base),
+            answer="u",
+            force_update=True,
+        )
+
+    assert package_manager.updates == ["wizard-env", "wizard-env"]
+
+
+def test_manifest_paths_are_resolved(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    manifest_file = tmp_path / "wizards.yaml"
+    manifest_file.write_text("wizards:\n  - example\n  - ~/other\n")
+
+    assert installation.parse_manifest(str(manifest_file)) == [
+        str(tmp_path / "example"),
+        str(tmp_path / "home" / "other"),
+    ]
+
+    manifest_file.write_text("- example\n")
+    assert installation.parse_manifest(str(manifest_file)) == [
+        str(tmp_path / "example")
+    ]
+
+
+@pytest.mark.parametrize(
+    "contents, error",
+    [
+        ("wizards: example\n", "must contain a list of wizard paths"),
+        ("- example\n- {path: other}\n", "must contain a list of wizard paths"),
+        ("wizards: [example\n", "is not valid YAML"),
+    ],
+)
+def test_malformed_manifest_is_rejected(tmp_path, capsys, contents, error):
+    manifest_file = tmp_path / "wizards.yaml"
+    manifest_file.write_text(contents)
+
+    with pytest.raises(SystemExit):
+        installation.parse_manifest(str(manifest_file))
+
+    assert error in capsys.readouterr().out
+
+
+def test_compatible_wizards(capsys):
+    installation.check_compatibility([get_metadata("first"), get_metadata("second")])
+
+    assert capsys.readouterr().out == ""
+
+
+def test_incompatible_wizards_are_rejected(capsys):
+    other = get_metadata("other")
+    other.python_version = "3.11"
+
+    with pytest.raises(SystemExit):
+        installation.check_compatibility(
+            [get_metadata("first"), get_metadata("second"), other]
+        )
+
+    assert capsys.readouterr().out == (
+        "The wizards require conflicting values of python_version: "
+        "3.12 (first, second); 3.11 (other)\n"
+    )
@@ -0,0 +1,123 @@
+import pytest
+
+from pymol_wizard_installer.menu_patcher import (
+    EXTERNAL_GUI,
+    INTERNAL_GUI,
+    patch_menu,
+    read_entries,
+)
+
+EXTERNAL_MENU = """\
+def get_menus():
+    return [
+        ('menu', 'File', [
+            ('command', 'Run wizard', 'wizard example'),  # not a Wizard menu entry
+        ]),
+        ("menu", "Wizard", [
+            ("command", "Appearance", "wizard appearance"),
+            ('command', "Measurement", 'wizard measurement'),
+            ('menu', 'Other', [('command', 'Nested', 'wizard nested')]),
+        ]),
+        ('menu', 'Plugin', [
+            ('command', 'Example again', 'wizard example'),
+        ]),
+    ]
+"""
+
+INTERNAL_MENU = """\
+def get_menu():
+    return [
+        [2, 'Wizard Menu', ''],
+        [1, 'Mutagenesis', 'wizard mutagenesis'],
+        [1, "Density", "wizard density"],
+    ]
+
+
+def get_other_menu():
+    return [
+        [1, 'Example', 'wizard example'],
+    ]
+"""
+
+
+@pytest.fixture
+def external_gui(tmp_path):
+    file = tmp_path / "_gui.py"
+    file.write_text(EXTERNAL_MENU)
+    return file
+
+
+@pytest.fixture
+def internal_gui(tmp_path):
+    file = tmp_path / "openvr.py"
+    file.write_text(INTERNAL_MENU)
+    return file
+
+
+def test_entries_are_read_in_both_quote_styles(external_gui, internal_gui):
+    assert read_entries(external_gui, EXTERNAL_GUI) == {
+        "appearance": "Appearance",
+        "measurement": "Measurement",
+    }
+    assert read_entries(internal_gui, INTERNAL_GUI) == {
+        "mutagenesis": "Mutagenesis",
+        "density": "Density",
+    }
+
+
+def test_add_is_idempotent(external_gui):
+    assert patch_menu(external_gui, EXTERNAL_GUI, add=[("My example", "example")])
+    patched = external_gui.read_text()
+
+    assert not patch_menu(external_gui, EXTERNAL_GUI, add=[("My example", "example")])
+    assert external_gui.read_text() == patched
+    assert read_entries(external_gui, EXTERNAL_GUI)["example"] == "My example"
+
+
+def test_entries_of_other_menus_are_left_alone(external_gui):
+    patch_menu(external_gui, EXTERNAL_GUI, add=[("My example", "example")])
+    patched = external_gui.read_text()
+
+    assert "('command', 'Run wizard', 'wizard example')," in patched
+    assert "('command', 'Example again', 'wizard example')," in patched
+
+    assert patch_menu(external_gui, EXTERNAL_GUI, remove=["example"])
+    assert external_gui.read_text() == EXTERNAL_MENU
+
+
+def test_remove_in_both_quote_styles(external_gui):
+    assert patch_menu(
+        external_gui, EXTERNAL_GUI, remove=["appearance", "measurement", "nested"]
+    )
+
+    assert read_entries(external_gui, EXTERNAL_GUI) == {}
+    assert "wizard nested" in external_gui.read_text()
+    assert not patch_menu(external_gui, EXTERNAL_GUI, remove=["appearance"])
+
+
+def test_outdated_entry_is_replaced(internal_gui):
+    assert patch_menu(internal_gui, INTERNAL_GUI, add=[("Density maps", "density")])
+
+    assert read_entries(internal_gui, INTERNAL_GUI) == {
+        "density": "Density maps",
+        "mutagenesis": "Mutagenesis",
+    }
+    assert internal_gui.read_text().count("wizard density") == 1
+
+
+def test_internal_menu_ends_at_its_list(internal_gui):
+    assert patch_menu(internal_gui, INTERNAL_GUI, add=[("Example", "example")])
+    assert not patch_menu(internal_gui, INTERNAL_GUI, add=[("Example", "example")])
+
+    assert internal_gui.read_text().count("wizard example") == 2
+    assert patch_menu(internal_gui, INTERNAL_GUI, remove=["example"])
+    assert internal_gui.read_text() == INTERNAL_MENU
+
+
+def test_missing_target(tmp_path, capsys):
+    file = tmp_path / "_gui.py"
+    file.write_text("('command', 'Example', 'wizard example'),\n")
+
+    assert not patch_menu(file, EXTERNAL_GUI, add=[("Example", "example")])
+    assert not patch_menu(file, EXTERNAL_GUI, remove=["example"])
+    assert "Could not find target" in capsys.readouterr().out
@@ -0,0 +1,102 @@
+import os
+
+import pytest
+
+from pymol_wizard_installer import openvr_cache
+from pymol_wizard_installer.installer.base_installer import Installer
+
+KEY = openvr_cache.get_artifact_key("v1.0.17", "Release", False)
+
+
+def build(key=KEY):
+    with openvr_cache.building(key) as install_dir:
+        os.makedirs(os.path.join(install_dir, "include"))
+        with open(os.path.join(install_dir, "include", "openvr.h"), "w") as f:
+            f.write("// openvr")
+        os.makedirs(os.path.join(install_dir, "lib"))
+        with open(os.path.join(install_dir, "lib", "libopenvr_api.a"), "wb") as f:
+            f.write(b"\0archive")
+
+
+def test_build_is_cached_and_installed_by_hardlink(tmp_path):
+    assert not openvr_cache.is_cached(KEY)
+    build()
+    assert openvr_cache.is_cached(KEY)
+
+    install_tree = openvr_cache.find_artifacts(KEY)
+    prefix = tmp_path / "env"
+    openvr_cache.install_artifacts(install_tree, str(prefix))
+
+    header = prefix / "include" / "openvr.h"
+    assert header.read_text() == "// openvr"
+    assert os.path.samefile(header, os.path.join(install_tree, "include", "openvr.h"))
+    assert (prefix / "lib" / "libopenvr_api.a").exists()
+
+
+def test_corrupt_build_is_discarded(capsys):
+    build()
+    install_tree = openvr_cache.find_artifacts(KEY)
+    with open(os.path.join(install_tree, "include", "openvr.h"), "w") as f:
+        f.write("// tampered")
+
+    assert openvr_cache.find_artifacts(KEY) is None
+    assert "corrupt" in capsys.readouterr().out
+    assert not openvr_cache.is_cached(KEY)
+
+
+def test_failed_build_is_not_cached():
+    with pytest.raises(RuntimeError):
+        with openvr_cache.building(KEY):
+            raise RuntimeError("build failed")
+
+    assert not openvr_cache.is_cached(KEY)
+    assert openvr_cache.list_entries() == []
+
+
+def test_empty_build_is_rejected():
+    with pytest.raises(FileNotFoundError):
+        with openvr_cache.building(KEY):
+            pass
+
+    assert not openvr_cache.is_cached(KEY)
+
+
+def test_builds_are_cached_per_key():
+    build()
+    shared_key = openvr_cache.get_artifact_key("v1.0.17", "Release", True)
+
+    assert not openvr_cache.is_cached(shared_key)
+    (entry,) = openvr_cache.list_entries()
+    assert openvr_cache.describe_entry(entry).startswith(
+        "openvr v1.0.17, Release, static"
+    )
+
+
+class StandInInstaller(Installer):
+    builds = 0
+
+    @staticmethod
+    def get_openvr_key():
+        return KEY
+
+    @staticmethod
+    def build_openvr(clone_dir, env_name, install_dir):
+        StandInInstaller.builds += 1
+        os.makedirs(os.path.join(install_dir, "include"))
+        with open(os.path.join(install_dir, "include", "openvr.h"), "w") as f:
+            f.write(f"// built for {env_name}")
+
+
+def test_openvr_is_built_once_for_every_environment(tmp_path, monkeypatch):
+    monkeypatch.setattr(StandInInstaller, "builds", 0)
+    # An existing checkout is not cloned again
+    (tmp_path / "clone" / "openvr").mkdir(parents=True)
+
+    for env_name in ["first-env", "second-env"]:
+        StandInInstaller.install_openvr(
+            str(tmp_path / "clone"), str(tmp_path / env_name), env_name
+        )
+
+    assert StandInInstaller.builds == 1
+    header = tmp_path / "second-env" / "include" / "openvr.h"
+    assert header.read_text() == "// built for first-env"
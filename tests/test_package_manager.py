@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+from pymol_wizard_installer import installation
+from pymol_wizard_installer.package_manager import (
+    MambaManager,
+    MicromambaManager,
+    PackageManager,
+    create_package_manager,
+)
+
+
+def test_package_manager_by_name():
+    assert type(create_package_manager("mamba")) is MambaManager
+    assert create_package_manager("mamba").executable == "mamba"
+
+
+def test_package_manager_kind_is_guessed_from_path():
+    manager = create_package_manager("tools/micromamba.exe")
+
+    assert type(manager) is MicromambaManager
+    assert manager.executable == os.path.abspath("tools/micromamba.exe")
+    assert type(create_package_manager("tools/fake_tool.py")) is PackageManager
+
+
+def test_templates_are_rejected_under_micromamba(monkeypatch, capsys):
+    monkeypatch.setattr(installation, "get_package_manager", MicromambaManager)
+
+    with pytest.raises(SystemExit):
+        installation.check_can_clone()
+
+    assert "micromamba cannot clone environments" in capsys.readouterr().out
+
+
+def test_templates_are_allowed_under_conda(monkeypatch):
+    monkeypatch.setattr(installation, "get_package_manager", PackageManager)
+
+    installation.check_can_clone()
@@ -0,0 +1,88 @@
+import sys
+import time
+import subprocess
+
+import pytest
+
+from pymol_wizard_installer.process_runner import (
+    StepLog,
+    process_step,
+    run_concurrently,
+    run_process,
+)
+
+
+def python(code):
+    return [sys.executable, "-c", code]
+
+
+def test_output_is_captured():
+    result = run_process(
+        python("import sys; print('out'); print('err', file=sys.stderr)"),
+        capture_output=True,
+        text=True,
+    )
+
+    assert (result.returncode, result.stdout, result.stderr) == (0, "out\n", "err\n")
+
+
+def test_children_get_no_input():
+    result = run_process(
+        python("import sys; print(repr(sys.stdin.read()))"),
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.stdout == "''\n"
+
+
+def test_failure_is_raised_when_checked():
+    with pytest.raises(subprocess.CalledProcessError) as error:
+        run_process(python("import sys; sys.exit(3)"), check=True)
+
+    assert error.value.returncode == 3
+
+
+def test_step_timeout_stops_the_child():
+    start = time.perf_counter()
+    with pytest.raises(subprocess.TimeoutExpired):
+        with process_step("slow", timeout=0.3):
+            run_process(python("import time; time.sleep(10)"))
+
+    assert time.perf_counter() - start < 5
+
+
+def test_buffered_output_is_printed_as_one_block(capsys):
+    with process_step("step", buffered=True):
+        run_process(python("print('first'); print('second')"))
+        assert capsys.readouterr().out == ""
+
+    assert capsys.readouterr().out == "[step] first\n[step] second\n"
+
+
+def test_buffered_log_keeps_the_last_lines(capsys):
+    log = StepLog("step", buffered=True, max_lines=2)
+    log.write("one\ntwo\nprogress 10%\rprogress 100%\nlast")
+    log.flush()
+
+    assert capsys.readouterr().out == (
+        "[step] ... 2 earlier lines omitted\n[step] progress 100%\n[step] last\n"
+    )
+
+
+def test_concurrent_results_keep_the_order_of_the_commands():
+    results = run_concurrently(
+        [python("import time; time.sleep(0.2); print(1)"), python("print(2)")],
+        capture_output=True,
+        text=True,
+    )
+
+    assert [result.stdout for result in results] == ["1\n", "2\n"]
+
+
+def test_concurrent_failure_is_raised():
+    with pytest.raises(subprocess.CalledProcessError):
+        run_concurrently(
+            [python("import time; time.sleep(10)"), python("raise SystemExit(1)")],
+            check=True,
+        )
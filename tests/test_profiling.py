@@ -0,0 +1,67 @@
+import sys
+import json
+
+import pytest
+
+from pymol_wizard_installer import env_runner, package_manager, profiling
+
+
+@pytest.fixture
+def recording(monkeypatch):
+    """Record spans without registering the report at exit."""
+
+    monkeypatch.setattr(profiling, "_spans", [])
+    monkeypatch.setattr(profiling, "_origin", 0)
+
+
+def test_disabled_spans_are_shared_no_ops(monkeypatch):
+    monkeypatch.setattr(profiling, "_spans", None)
+
+    assert not profiling.is_profiling()
+    assert profiling.span("a") is profiling.span("b", "process")
+
+
+def test_spans_are_summarized(recording):
+    for _ in range(2):
+        with profiling.span("pip", "process", command=["pip"]):
+            pass
+    with profiling.span("packages"):
+        pass
+
+    summary = {
+        (total["cat"], total["name"]): total for total in profiling.get_summary()
+    }
+    assert summary.keys() == {("process", "pip"), ("step", "packages")}
+    assert summary["process", "pip"]["count"] == 2
+
+
+def test_report_is_a_chrome_trace(recording, tmp_path, capsys):
+    with profiling.span("pymol", "step", env="wizard-env"):
+        pass
+
+    trace_file = tmp_path / "trace.json"
+    profiling.write_report(str(trace_file))
+
+    with open(trace_file) as f:
+        (event,) = json.load(f)["traceEvents"]
+    assert event["name"] == "pymol"
+    assert event["ph"] == "X"
+    assert event["args"]["env"] == "wizard-env"
+    assert "children_cpu_s" in event["args"]
+    assert f"Trace written to {trace_file}" in capsys.readouterr().out
+
+
+class StandInManager(package_manager.PackageManager):
+    def get_run_command(self, env_name, args):
+        return [sys.executable, "-c", "pass"]
+
+
+def test_commands_in_env_are_named_after_the_tool(recording, monkeypatch):
+    monkeypatch.setattr(package_manager, "_package_manager", StandInManager())
+    monkeypatch.setattr(env_runner, "_direct_exec", False)
+
+    env_runner.run_in_env("wizard-env", ["cmake", "--build", "build"], check=True)
+    env_runner.run_in_env("wizard-env", ["pip", "install", "."], check=True)
+
+    names = [total["name"] for total in profiling.get_summary()]
+    assert sorted(names) == ["cmake", "pip"]
@@ -0,0 +1,63 @@
+import pytest
+
+from pymol_wizard_installer import prompts
+
+
+@pytest.fixture(autouse=True)
+def interactive(monkeypatch):
+    monkeypatch.setattr(prompts, "_answers", None)
+
+
+def test_prompts_are_answered_from_a_file(tmp_path, capsys):
+    answers_file = tmp_path / "answers.yaml"
+    answers_file.write_text(
+        "answers:\n"
+        "  existing_env: Overwrite\n"
+        "  openvr: false\n"
+        "  env_name: Wizard-Env\n"
+    )
+
+    prompts.set_answers(prompts.load_answers(str(answers_file)))
+
+    assert prompts.get_answer("Overwrite? (o/u/A)", "a", "existing_env") == "o"
+    assert prompts.get_answer("OpenVR? (Y/n)", "y", "openvr") == "n"
+    assert prompts.get_answer("Name?", "wizard-env", "env_name") == "Wizard-Env"
+    assert "OpenVR? (Y/n) n" in capsys.readouterr().out
+
+
+def test_missing_answers_get_the_default(tmp_path, monkeypatch):
+    answers_file = tmp_path / "answers.yaml"
+    answers_file.write_text("answers:\n  openvr: n\n")
+    prompts.set_answers(prompts.load_answers(str(answers_file)))
+
+    def input(prompt):
+        raise AssertionError("prompted while running non-interactively")
+
+    monkeypatch.setattr("builtins.input", input)
+
+    assert prompts.get_answer("Install PyMOL? (Y/n)", "y", "install_pymol") == "y"
+    assert prompts.get_preset_answer("existing_env", "u") == "u"
+
+
+def test_preset_answers_are_ignored_interactively(monkeypatch):
+    monkeypatch.setattr("builtins.input", lambda prompt: " N ")
+
+    assert prompts.get_preset_answer("existing_env", "u") == "u"
+    assert prompts.get_answer("Install PyMOL? (Y/n)", "y", "install_pymol") == "n"
+
+
+@pytest.mark.parametrize(
+    "answers, error",
+    [
+        ("answers:\n  colour: blue\n", "Unknown prompt colour"),
+        ("answers:\n  existing_env: replace\n", "Invalid answer replace"),
+    ],
+)
+def test_invalid_answers_are_rejected(tmp_path, capsys, answers, error):
+    answers_file = tmp_path / "answers.yaml"
+    answers_file.write_text(answers)
+
+    with pytest.raises(SystemExit):
+        prompts.load_answers(str(answers_file))
+
+    assert error in capsys.readouterr().out
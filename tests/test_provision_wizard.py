@@ -0,0 +1,91 @@
+import subprocess
+import sys
+
+import pytest
+
+from pymol_wizard_installer import process_runner, provision_wizard
+
+CONFIG = """\
+wizards:
+  - example
+  - ~/other
+environments:
+  - first-env
+  - second-env
+options:
+  - --fast
+answers:
+  install_pymol: y
+"""
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    config_file = tmp_path / "provision.yaml"
+    config_file.write_text(CONFIG)
+    return config_file
+
+
+def test_config_paths_are_resolved(config_file, tmp_path):
+    config = provision_wizard.load_config(str(config_file))
+
+    assert config["wizards"] == [
+        str(tmp_path / "example"),
+        str(tmp_path / "home" / "other"),
+    ]
+    assert config["environments"] == ["first-env", "second-env"]
+    assert config["options"] == ["--fast"]
+
+
+def test_config_with_invalid_answers_is_rejected(config_file, capsys):
+    config_file.write_text(CONFIG.replace("install_pymol: y", "install_pymol: maybe"))
+
+    with pytest.raises(SystemExit):
+        provision_wizard.load_config(str(config_file))
+
+    assert "Invalid answer maybe to install_pymol" in capsys.readouterr().out
+
+
+def test_config_with_repeated_environments_is_rejected(config_file, capsys):
+    config_file.write_text(CONFIG.replace("second-env", "first-env"))
+
+    with pytest.raises(SystemExit):
+        provision_wizard.load_config(str(config_file))
+
+    assert "same environment more than once" in capsys.readouterr().out
+
+
+def test_environment_is_provisioned_with_the_answers(
+    config_file, tmp_path, monkeypatch
+):
+    commands = []
+
+    def run_process(command, **kwargs):
+        commands.append(command)
+        kwargs["stdout"].write("installed\n")
+        return subprocess.CompletedProcess(command, 3)
+
+    monkeypatch.setattr(process_runner, "run_process", run_process)
+    config = provision_wizard.load_config(str(config_file))
+    log_file = tmp_path / "first-env.log"
+
+    result = provision_wizard.provision_env(
+        "first-env", config, str(config_file), str(log_file)
+    )
+
+    assert commands == [
+        [
+            sys.executable,
+            "-m",
+            "pymol_wizard_installer.install_wizard",
+            "--answers",
+            str(config_file),
+            "--env_name",
+            "first-env",
+            "--fast",
+            *config["wizards"],
+        ]
+    ]
+    assert (result["success"], result["exit_code"]) == (False, 3)
+    assert log_file.read_text() == "installed\n"
@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+
+from pymol_wizard_installer.scheduler import Step, get_dependencies, run_steps
+
+
+def noop():
+    pass
+
+
+def test_dependencies_follow_producers():
+    steps = [
+        Step("fetch", noop, outputs=["source"]),
+        Step("build", noop, inputs=["source", "compiler"], outputs=["binary"]),
+        Step("install", noop, inputs=["binary"]),
+    ]
+
+    assert get_dependencies(steps) == {
+        "fetch": set(),
+        "build": {"fetch"},
+        "install": {"build"},
+    }
+
+
+def test_dependencies_reject_cycles():
+    steps = [
+        Step("a", noop, inputs=["c"], outputs=["a"]),
+        Step("b", noop, inputs=["a"], outputs=["b"]),
+        Step("c", noop, inputs=["b"], outputs=["c"]),
+        Step("d", noop),
+    ]
+
+    with pytest.raises(ValueError, match="Circular dependency between steps: a, b, c"):
+        get_dependencies(steps)
+
+
+def test_dependencies_reject_duplicate_names():
+    with pytest.raises(ValueError, match="unique"):
+        get_dependencies([Step("a", noop), Step("a", noop)])
+
+
+def test_single_job_runs_in_list_order():
+    order = []
+    steps = [
+        Step("second", lambda: order.append("second"), inputs=["first"]),
+        Step("first", lambda: order.append("first"), outputs=["first"]),
+        Step("third", lambda: order.append("third")),
+    ]
+
+    run_steps(steps, jobs=1)
+
+    assert order == ["first", "second", "third"]
+
+
+def test_steps_sharing_a_lock_do_not_overlap():
+    active = 0
+    overlapped = False
+    guard = threading.Lock()
+
+    def action():
+        nonlocal active, overlapped
+        with guard:
+            active += 1
+            overlapped |= active > 1
+        threading.Event().wait(0.05)
+        with guard:
+            active -= 1
+
+    steps = [Step(f"step-{i}", action, locks=["site-packages"]) for i in range(3)]
+
+    run_steps(steps, jobs=3)
+
+    assert not overlapped
+
+
+def test_first_failure_in_list_order_is_raised(capsys):
+    started = []
+    second_failed = threading.Event()
+
+    def fail(name, wait_for=None):
+        def action():
+            started.append(name)
+            if wait_for is not None:
+                wait_for.wait(5)
+            else:
+                second_failed.set()
+            raise RuntimeError(name)
+
+        return action
+
+    steps = [
+        Step("slow", fail("slow", second_failed)),
+        Step("fast", fail("fast")),
+        Step("after", lambda: started.append("after")),
+    ]
+
+    with pytest.raises(RuntimeError, match="slow"):
+        run_steps(steps, jobs=2)
+
+    assert "after" not in started
+    assert "Step slow failed, skipping: after." in capsys.readouterr().out
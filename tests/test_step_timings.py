@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+from pymol_wizard_installer import step_timings
+
+
+def test_loading_does_not_create_the_cache(cache):
+    assert step_timings.load_timings() == {}
+    assert not os.path.exists(cache / "timings")
+
+
+def test_only_recent_durations_are_kept(monkeypatch):
+    monkeypatch.setattr(step_timings, "MAX_SAMPLES", 3)
+    for seconds in [1, 2, 3, 4]:
+        step_timings.record_duration("env", seconds)
+
+    assert step_timings.load_timings() == {"env": [2, 3, 4]}
+
+
+def test_estimate_is_the_median():
+    timings = {"odd": [5, 1, 3], "even": [4, 1, 3, 2], "empty": []}
+
+    assert step_timings.get_estimate(timings, "odd") == 3
+    assert step_timings.get_estimate(timings, "even") == 2.5
+    assert step_timings.get_estimate(timings, "empty") is None
+    assert step_timings.get_estimate(timings, "missing") is None
+
+
+def test_failed_blocks_are_not_recorded():
+    with pytest.raises(RuntimeError):
+        with step_timings.timed("env"):
+            raise RuntimeError
+
+    assert step_timings.load_timings() == {}
@@ -0,0 +1,137 @@
+import os
+import sys
+
+import pytest
+
+from pymol_wizard_installer import env_runner, package_manager, uninstall_wizard
+from pymol_wizard_installer.installer import get_installer
+from pymol_wizard_installer.menu_patcher import EXTERNAL_GUI, INTERNAL_GUI, read_entries
+from pymol_wizard_installer.uninstall_wizard import get_pymol_dir
+
+
+def test_pymol_dir_matches_the_installer(tmp_path):
+    assert get_pymol_dir(str(tmp_path), ["3.10"]) == get_installer().get_pymol_dir(
+        str(tmp_path), "3.10"
+    )
+
+
+@pytest.mark.skipif(os.name == "nt", reason="the PyMOL directory has no version")
+def test_pymol_dir_of_the_installed_python_version(tmp_path):
+    installed = get_installer().get_pymol_dir(str(tmp_path), "3.11")
+    os.makedirs(installed)
+
+    assert get_pymol_dir(str(tmp_path), ["3.10", "3.11"]) == installed
+
+
+EXTERNAL_MENU = """\
+def get_menus():
+    return [
+        ("menu", "Wizard", [
+            ("command", "Appearance", "wizard appearance"),
+            ("command", "Example", "wizard example"),
+        ]),
+    ]
+"""
+
+INTERNAL_MENU = """\
+def get_menu():
+    return [
+        [2, 'Wizard Menu', ''],
+        [1, 'Example', 'wizard example'],
+    ]
+"""
+
+METADATA = """\
+name: example
+menu_entry: Example
+default_env: wizard-env
+python_version: 3.12
+pymol_version: v3.1.0
+openvr_version: 1.0.17
+"""
+
+ENV_NAMES = ["first-env", "second-env"]
+
+
+class StandInManager:
+    def __init__(self, conda_base):
+        self.conda_base = conda_base
+
+    def get_base(self):
+        return self.conda_base
+
+
+@pytest.fixture
+def envs(tmp_path, monkeypatch):
+    """Two environments with the example wizard installed, and its sources."""
+
+    for var in ["CONDA_ENVS_DIRS", "CONDA_ENVS_PATH", "CONDARC"]:
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    conda_base = tmp_path / "conda"
+    (conda_base / "conda-meta").mkdir(parents=True)
+
+    pymol_dirs = {}
+    for env_name in ENV_NAMES:
+        prefix = conda_base / "envs" / env_name
+        (prefix / "conda-meta").mkdir(parents=True)
+        pymol_dir = get_installer().get_pymol_dir(str(prefix), "3.12")
+        os.makedirs(os.path.join(pymol_dir, "wizard"))
+        with open(os.path.join(pymol_dir, "_gui.py"), "w") as f:
+            f.write(EXTERNAL_MENU)
+        with open(os.path.join(pymol_dir, "wizard", "openvr.py"), "w") as f:
+            f.write(INTERNAL_MENU)
+        with open(os.path.join(pymol_dir, "wizard", "example.py"), "w") as f:
+            f.write("# example wizard\n")
+        pymol_dirs[env_name] = pymol_dir
+
+    wizard_root = tmp_path / "example"
+    wizard_root.mkdir()
+    (wizard_root / "metadata.yaml").write_text(METADATA)
+    (wizard_root / "pyproject.toml").write_text('[project]\nname = "example-pkg"\n')
+
+    manager = StandInManager(str(conda_base))
+    monkeypatch.setattr(package_manager, "get_package_manager", lambda: manager)
+    monkeypatch.setattr(package_manager, "set_package_manager", lambda name: None)
+    return wizard_root, pymol_dirs
+
+
+def test_uninstall_from_several_envs(envs, monkeypatch):
+    wizard_root, pymol_dirs = envs
+    pip_calls = []
+    uninstalled = []
+    uninstall_from_env = uninstall_wizard.uninstall_from_env
+
+    def run_in_env(env_name, args, **kwargs):
+        pip_calls.append((env_name, args))
+
+    def record_uninstall(env_name, *args):
+        uninstalled.append(env_name)
+        uninstall_from_env(env_name, *args)
+
+    monkeypatch.setattr(env_runner, "run_in_env", run_in_env)
+    monkeypatch.setattr(uninstall_wizard, "uninstall_from_env", record_uninstall)
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "uninstall_wizard",
+            str(wizard_root),
+            *[arg for env_name in ENV_NAMES for arg in ["--env_name", env_name]],
+            "--jobs",
+            "2",
+        ],
+    )
+
+    uninstall_wizard.main()
+
+    assert sorted(uninstalled) == ENV_NAMES
+    assert sorted(pip_calls) == [
+        (env_name, ["pip", "uninstall", "-y", "example-pkg"]) for env_name in ENV_NAMES
+    ]
+    for pymol_dir in pymol_dirs.values():
+        assert not os.path.exists(os.path.join(pymol_dir, "wizard", "example.py"))
+        gui = os.path.join(pymol_dir, "_gui.py")
+        assert read_entries(gui, EXTERNAL_GUI) == {"appearance": "Appearance"}
+        openvr = os.path.join(pymol_dir, "wizard", "openvr.py")
+        assert read_entries(openvr, INTERNAL_GUI) == {}
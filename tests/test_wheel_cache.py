@@ -0,0 +1,66 @@
+import os
+import sysconfig
+
+import pytest
+
+from pymol_wizard_installer import wheel_cache
+
+
+def get_key(pymol_version="v3.1.0", openvr=True):
+    return {
+        "pymol_version": pymol_version,
+        "openvr": openvr,
+        "python_version": "3.12.1",
+        "platform": sysconfig.get_platform(),
+        "abi": "cpython-312-x86_64-linux-gnu",
+        "compiler": "c++ 13",
+    }
+
+
+@pytest.fixture
+def wheel(tmp_path):
+    wheel = tmp_path / "pymol-3.1.0-cp312-cp312-linux_x86_64.whl"
+    wheel.write_bytes(b"wheel contents")
+    return str(wheel)
+
+
+def test_stored_wheel_is_found(wheel):
+    cached = wheel_cache.store_wheel(get_key(), wheel)
+
+    assert wheel_cache.find_cached_wheel(get_key()) == cached
+    assert os.path.basename(cached) == os.path.basename(wheel)
+    assert wheel_cache.find_cached_wheel(get_key(openvr=False)) is None
+
+
+def test_corrupt_wheel_is_discarded(wheel, capsys):
+    cached = wheel_cache.store_wheel(get_key(), wheel)
+    with open(cached, "wb") as f:
+        f.write(b"truncated")
+
+    assert wheel_cache.find_cached_wheel(get_key()) is None
+    assert "corrupt" in capsys.readouterr().out
+    assert wheel_cache.list_entries() == []
+
+
+def test_compatible_entries_ignore_the_abi(wheel, tmp_path):
+    assert wheel_cache.find_compatible_entries("v3.1.0", True) == []
+    assert not (tmp_path / "cache").exists()
+
+    wheel_cache.store_wheel({**get_key(), "abi": "other"}, wheel)
+    wheel_cache.store_wheel(get_key(pymol_version="v3.0.0"), wheel)
+
+    (entry,) = wheel_cache.find_compatible_entries("v3.1.0", True)
+    assert entry["key"]["abi"] == "other"
+    assert wheel_cache.find_compatible_entries("v3.1.0", False) == []
+
+
+def test_prune_removes_the_least_recently_used(wheel):
+    wheel_cache.store_wheel(get_key(pymol_version="v3.0.0"), wheel)
+    wheel_cache.store_wheel(get_key(), wheel)
+    wheel_cache.find_cached_wheel(get_key())
+
+    size = wheel_cache.list_entries()[0]["size"]
+    (removed,) = wheel_cache.prune(max_size=size)
+
+    assert removed["key"]["pymol_version"] == "v3.0.0"
+    assert wheel_cache.find_cached_wheel(get_key()) is not None
@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+from pymol_wizard_installer import wizard_registry
+
+METADATA = """\
+name: {name}
+menu_entry: "{name} menu entry"
+default_env: wizard-env
+python_version: 3.12
+pymol_version: v3.1.0
+openvr_version: 1.0.17
+"""
+
+
+def write_wizard(wizards_dir, directory, name):
+    wizard_root = wizards_dir / directory
+    (wizard_root / "envs").mkdir(parents=True)
+    (wizard_root / "metadata.yaml").write_text(METADATA.format(name=name))
+    (wizard_root / "envs" / "environment.yaml").write_text("dependencies: []\n")
+    (wizard_root / "pyproject.toml").write_text(f'[project]\nname = "{name}-pkg"\n')
+    return wizard_root
+
+
+@pytest.fixture
+def wizards_dir(tmp_path, monkeypatch):
+    wizards_dir = tmp_path / "wizards"
+    write_wizard(wizards_dir, "first-wizard", "first")
+    write_wizard(wizards_dir, "second-wizard", "second")
+    return wizards_dir
+
+
+def test_wizards_are_resolved_by_name_or_path(wizards_dir):
+    resolved = wizard_registry.resolve_wizards(
+        ["first", str(wizards_dir / "second-wizard"), "first"], str(wizards_dir)
+    )
+
+    assert [(root, metadata.name) for root, metadata in resolved] == [
+        (str(wizards_dir / "first-wizard"), "first"),
+        (str(wizards_dir / "second-wizard"), "second"),
+    ]
+
+
+def test_index_records_the_wizards(wizards_dir):
+    index = wizard_registry.refresh_index(str(wizards_dir))
+
+    assert index["names"] == {"first": "first-wizard", "second": "second-wizard"}
+    record = index["wizards"]["first-wizard"]
+    assert record["package_name"] == "first-pkg"
+    assert record["env_file"] == str(
+        wizards_dir / "first-wizard" / "envs" / "environment.yaml"
+    )
+
+
+def test_only_changed_wizards_are_indexed_again(wizards_dir, monkeypatch):
+    wizard_registry.refresh_index(str(wizards_dir))
+    indexed = []
+    index_wizard = wizard_registry.index_wizard
+    monkeypatch.setattr(
+        wizard_registry,
+        "index_wizard",
+        lambda wizard_root: indexed.append(wizard_root) or index_wizard(wizard_root),
+    )
+
+    metadata_file = wizards_dir / "second-wizard" / "metadata.yaml"
+    metadata_file.write_text(METADATA.format(name="renamed"))
+    os.utime(metadata_file, ns=(0, 0))
+    record = wizard_registry.lookup("renamed", str(wizards_dir))
+
+    assert record["path"] == str(wizards_dir / "second-wizard")
+    assert indexed == [str(wizards_dir / "second-wizard")]
+    assert wizard_registry.lookup("second", str(wizards_dir)) is None
+
+
+def test_index_is_only_read_when_not_updated(wizards_dir, tmp_path):
+    wizard_registry.resolve_wizards(["first"], str(wizards_dir), update_index=False)
+
+    assert not (tmp_path / "cache").exists()
+
+
+def test_duplicate_names_are_invalid(wizards_dir):
+    write_wizard(wizards_dir, "third-wizard", "first")
+
+    index = wizard_registry.refresh_index(str(wizards_dir))
+
+    assert index["names"]["first"] == "first-wizard"
+    assert "already used" in index["wizards"]["third-wizard"]["error"]
+
+
+def test_unknown_name_exits(wizards_dir, capsys):
+    with pytest.raises(SystemExit):
+        wizard_registry.resolve_wizards(["missing"], str(wizards_dir))
+
+    assert "No valid wizard named missing" in capsys.readouterr().out
@@ -0,0 +1,148 @@
+import os
+import sys
+import zipfile
+import subprocess
+
+import pytest
+
+from pymol_wizard_installer import wizard_wheelhouse
+
+
+def write_wheel(path, version="1.0"):
+    info = f"example-{version}.dist-info"
+    with zipfile.ZipFile(path, "w") as wheel:
+        wheel.writestr("example_package.py", "print('example')\n")
+        wheel.writestr(
+            f"{info}/METADATA",
+            f"Metadata-Version: 2.1\nName: example\nVersion: {version}\n",
+        )
+        wheel.writestr(
+            f"{info}/WHEEL",
+            "Wheel-Version: 1.0\nGenerator: test\nRoot-Is-Purelib: true\n"
+            "Tag: py3-none-any\n",
+        )
+        wheel.writestr(f"{info}/RECORD", "")
+
+
+@pytest.fixture
+def pip(monkeypatch):
+    """Record the pip commands, building a dummy wheel for `pip wheel`."""
+
+    commands = []
+
+    def run_in_env(env_name, args, **kwargs):
+        commands.append(args)
+        if args[1] == "wheel":
+            wheel_dir = args[args.index("--wheel-dir") + 1]
+            os.makedirs(wheel_dir, exist_ok=True)
+            write_wheel(os.path.join(wheel_dir, "example-1.0-py3-none-any.whl"))
+        return subprocess.CompletedProcess(args, 0)
+
+    monkeypatch.setattr(wizard_wheelhouse, "run_in_env", run_in_env)
+    return commands
+
+
+@pytest.fixture
+def wizard_root(tmp_path):
+    wizard_root = tmp_path / "example"
+    wizard_root.mkdir()
+    (wizard_root / "example.py").write_text("print('example')")
+    return str(wizard_root)
+
+
+def test_wheel_is_built_once_per_source(pip, wizard_root):
+    wheel = wizard_wheelhouse.get_wheel("wizard-env", wizard_root, "3.12")
+    assert wizard_wheelhouse.get_wheel("other-env", wizard_root, "3.12") == wheel
+    assert len(pip) == 1
+
+    with open(os.path.join(wizard_root, "example.py"), "w") as f:
+        f.write("print('changed')")
+    assert wizard_wheelhouse.get_wheel("wizard-env", wizard_root, "3.12") != wheel
+    assert len(pip) == 2
+
+    wizard_wheelhouse.get_wheel("wizard-env", wizard_root, "3.11")
+    assert len(pip) == 3
+
+
+def test_wheel_versions_carry_the_source_digest(pip, wizard_root):
+    wheel = wizard_wheelhouse.get_wheel("wizard-env", wizard_root, "3.12", "abc" * 20)
+
+    assert os.path.basename(wheel) == "example-1.0+srcabcabcabcabc-py3-none-any.whl"
+    with zipfile.ZipFile(wheel) as labelled:
+        info = "example-1.0+srcabcabcabcabc.dist-info"
+        metadata = labelled.read(f"{info}/METADATA").decode()
+        assert "Version: 1.0+srcabcabcabcabc" in metadata
+        assert f"{info}/WHEEL,sha256=" in labelled.read(f"{info}/RECORD").decode()
+
+
+def test_labelled_wheel_is_installable(tmp_path):
+    wheel = tmp_path / "example-1.0+local-py3-none-any.whl"
+    write_wheel(wheel, "1.0+local")
+
+    labelled = wizard_wheelhouse.add_local_version(str(wheel), "src0123")
+
+    assert os.path.basename(labelled) == "example-1.0+local.src0123-py3-none-any.whl"
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "pip",
+            "install",
+            "--quiet",
+            "--no-index",
+            "--no-deps",
+            "--target",
+            str(tmp_path / "target"),
+            labelled,
+        ],
+        check=True,
+    )
+    assert (tmp_path / "target" / "example_package.py").exists()
+    assert (tmp_path / "target" / "example-1.0+local.src0123.dist-info").is_dir()
+
+
+def test_wheels_are_installed_with_a_single_call(pip, tmp_path):
+    wheels = [
+        str(tmp_path / "first" / "example-1.0+src1-py3-none-any.whl"),
+        str(tmp_path / "second" / "other-2.0+src2-py3-none-any.whl"),
+    ]
+
+    wizard_wheelhouse.install_wheels("wizard-env", wheels)
+
+    assert pip == [
+        [
+            "pip",
+            "install",
+            "--no-index",
+            "--find-links",
+            str(tmp_path / "first"),
+            "--find-links",
+            str(tmp_path / "second"),
+            *wheels,
+        ]
+    ]
+
+
+def test_missing_dependencies_are_fetched(monkeypatch, tmp_path):
+    wheel = str(tmp_path / "wheels" / "example-1.0+src1-py3-none-any.whl")
+    commands = []
+
+    def run_in_env(env_name, args, **kwargs):
+        commands.append(args)
+        if "--no-index" in args:
+            raise subprocess.CalledProcessError(1, args)
+
+    monkeypatch.setattr(wizard_wheelhouse, "run_in_env", run_in_env)
+    wizard_wheelhouse.install_wheels("wizard-env", [wheel])
+
+    assert commands == [
+        [
+            "pip",
+            "install",
+            "--no-index",
+            "--find-links",
+            str(tmp_path / "wheels"),
+            wheel,
+        ],
+        ["pip", "install", "--find-links", str(tmp_path / "wheels"), wheel],
+    ]